@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API 監控指標
+記錄各路由的請求數、錯誤數與延遲直方圖，計時每個 SQL 查詢並記錄慢查詢的執行計畫，
+以 Prometheus 文字格式輸出
+"""
+import re
+import time
+import logging
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+
+# 延遲直方圖的分桶上限（秒）
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    """累積式延遲直方圖（Prometheus histogram 語意）"""
+
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # 最後一格為 +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, 累積次數) 清單，含 +Inf"""
+        result = []
+        running = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            result.append(('+Inf' if bound == float('inf') else repr(bound), running))
+        return result
+
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels) -> str:
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in labels.items()) + '}'
+
+
+class ApiMetrics:
+    """路由與 SQL 查詢的計數器 / 直方圖，以及慢查詢記錄"""
+
+    def __init__(self, slow_query_seconds: float = 0.2, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.slow_query_seconds = slow_query_seconds
+        self.buckets = tuple(buckets)
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._requests = {}             # (route, method, status) → 次數
+        self._errors = {}               # (route, method) → 次數（status >= 500）
+        self._request_latency = {}      # route → LatencyHistogram
+        self._query_latency = {}        # query 名稱 → LatencyHistogram
+        self._slow_queries = {}         # query 名稱 → 次數
+
+    def record_request(self, route: str, method: str, status: int, seconds: float):
+        """記錄一次請求"""
+        with self._lock:
+            key = (route, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if status >= 500:
+                self._errors[(route, method)] = self._errors.get((route, method), 0) + 1
+            histogram = self._request_latency.get(route)
+            if histogram is None:
+                histogram = self._request_latency[route] = LatencyHistogram(self.buckets)
+            histogram.observe(seconds)
+
+    def record_query(self, name: str, seconds: float):
+        """記錄一次 SQL 查詢耗時"""
+        with self._lock:
+            histogram = self._query_latency.get(name)
+            if histogram is None:
+                histogram = self._query_latency[name] = LatencyHistogram(self.buckets)
+            histogram.observe(seconds)
+            if seconds >= self.slow_query_seconds:
+                self._slow_queries[name] = self._slow_queries.get(name, 0) + 1
+
+    def timed_execute(self, cursor, name: str, sql: str, params: Sequence = ()):
+        """計時執行 SQL；超過門檻時連同 EXPLAIN QUERY PLAN 記錄為慢查詢"""
+        start = time.perf_counter()
+        result = cursor.execute(sql, params)
+        elapsed = time.perf_counter() - start
+        self.record_query(name, elapsed)
+
+        if elapsed >= self.slow_query_seconds:
+            self._log_slow_query(cursor.connection, name, sql, params, elapsed)
+        return result
+
+    def _log_slow_query(self, conn, name: str, sql: str, params: Sequence, elapsed: float):
+        try:
+            plan = conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+            plan_text = '\n'.join(f'      {row[-1]}' for row in plan)
+        except Exception as e:
+            plan_text = f'      (無法取得執行計畫: {e})'
+
+        compact_sql = re.sub(r'\s+', ' ', sql).strip()
+        self.logger.warning(
+            f"🐢 慢查詢 {name}: {elapsed * 1000:.1f} ms\n"
+            f"   SQL: {compact_sql}\n"
+            f"   參數: {list(params)}\n"
+            f"   執行計畫:\n{plan_text}"
+        )
+
+    def render_prometheus(self, gauges: Iterable[Tuple[str, str, Dict, float]] = ()) -> str:
+        """輸出 Prometheus 文字格式；gauges 為額外的 (名稱, 說明, 標籤, 數值)，名稱以 _total 結尾者為 counter"""
+        lines = []
+
+        with self._lock:
+            lines.append('# HELP radio_api_requests_total API 請求數')
+            lines.append('# TYPE radio_api_requests_total counter')
+            for (route, method, status), count in sorted(self._requests.items()):
+                lines.append(f'radio_api_requests_total{_labels(route=route, method=method, status=status)} {count}')
+
+            lines.append('# HELP radio_api_request_errors_total API 伺服器錯誤數（status >= 500）')
+            lines.append('# TYPE radio_api_request_errors_total counter')
+            for (route, method), count in sorted(self._errors.items()):
+                lines.append(f'radio_api_request_errors_total{_labels(route=route, method=method)} {count}')
+
+            self._render_histograms(lines, 'radio_api_request_duration_seconds', 'API 請求延遲（秒）',
+                                    'route', self._request_latency)
+            self._render_histograms(lines, 'radio_api_query_duration_seconds', 'SQL 查詢耗時（秒）',
+                                    'query', self._query_latency)
+
+            lines.append('# HELP radio_api_slow_queries_total 超過門檻的慢查詢數')
+            lines.append('# TYPE radio_api_slow_queries_total counter')
+            for name, count in sorted(self._slow_queries.items()):
+                lines.append(f'radio_api_slow_queries_total{_labels(query=name)} {count}')
+
+        described = set()
+        for name, help_text, labels, value in gauges:
+            if name not in described:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+                described.add(name)
+            label_text = _labels(**labels) if labels else ''
+            lines.append(f'{name}{label_text} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_histograms(lines: List[str], metric: str, help_text: str, label: str,
+                           histograms: Dict[str, LatencyHistogram]):
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} histogram')
+        for key, histogram in sorted(histograms.items()):
+            for bound, count in histogram.cumulative():
+                lines.append(f'{metric}_bucket{_labels(**{label: key, "le": bound})} {count}')
+            lines.append(f'{metric}_sum{_labels(**{label: key})} {histogram.total}')
+            lines.append(f'{metric}_count{_labels(**{label: key})} {histogram.count}')
@@ -0,0 +1,6 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+電台API基準測試
+generate_catalog 產生合成電台資料庫，run_benchmark 以不同查詢與併發數量測 API 延遲與吞吐量
+"""
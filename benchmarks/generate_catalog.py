@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成電台目錄產生器
+以 radio_stations.json 的實際分佈（來源、國家、語言、編碼、比特率、標籤）為樣本，
+產生指定筆數、結構與正式資料庫相同的 expanded_radio_stations.db 供基準測試使用
+
+用法:
+    python -m benchmarks.generate_catalog --size 100k
+    python -m benchmarks.generate_catalog --rows 250000 --output /tmp/catalog.db
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import logging
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from multi_source_radio_collector import MultiSourceRadioCollector, get_source_priority
+from station_dedup import canonical_stream_url
+
+# 預設規模
+SIZES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+DEFAULT_SAMPLE_PATH = os.path.join(PROJECT_ROOT, 'radio_stations.json')
+DEFAULT_OUTPUT_DIR = os.path.join(PROJECT_ROOT, 'benchmarks', 'data')
+
+# 中文電台名稱組字（簡體為主，台灣/香港樣本使用繁體）
+_CITIES_SIMPLIFIED = [
+    '北京', '上海', '广州', '深圳', '杭州', '南京', '成都', '重庆', '武汉', '西安', '长沙', '郑州',
+    '济南', '青岛', '沈阳', '大连', '哈尔滨', '长春', '福州', '厦门', '昆明', '贵阳', '南宁', '海口',
+    '兰州', '银川', '西宁', '乌鲁木齐', '呼和浩特', '太原', '石家庄', '合肥', '南昌', '温州', '宁波', '苏州',
+    '无锡', '常州', '徐州', '扬州', '绍兴', '台州', '金华', '龙游', '嘉兴', '湖州', '佛山', '东莞',
+]
+_CITIES_TRADITIONAL = [
+    '臺北', '新北', '桃園', '新竹', '臺中', '彰化', '雲林', '嘉義', '臺南', '高雄', '屏東', '宜蘭',
+    '花蓮', '臺東', '澎湖', '金門', '基隆', '苗栗', '南投', '香港', '九龍', '新界', '澳門',
+]
+_KINDS_SIMPLIFIED = [
+    '人民广播电台', '交通广播', '音乐广播', '新闻综合广播', '经济广播', '文艺广播', '故事广播',
+    '都市广播', '农村广播', '旅游广播', '生活广播', '私家车广播', '城市之声', '老年之声',
+]
+_KINDS_TRADITIONAL = [
+    '廣播電台', '之聲', '音樂網', '新聞網', '交通電台', '愛樂電台', '生活廣播', '客家電台',
+    '原住民電台', '教育電台', '流行網', '城市廣播',
+]
+_LATIN_WORDS = [
+    'Radio', 'FM', 'Stereo', 'Hits', 'Classic', 'Jazz', 'News', 'Talk', 'Latino', 'Estéreo',
+    'La', 'Mix', 'Pop', 'Rock', 'Oldies', 'Love', 'Country', 'Public', 'Sound', 'Wave',
+]
+_TRADITIONAL_COUNTRIES = ('Taiwan', 'Hong Kong', 'Macao')
+
+
+class CatalogProfile:
+    """由樣本電台取得的欄位分佈"""
+
+    def __init__(self, samples: List[Dict]):
+        if not samples:
+            raise ValueError('樣本電台清單為空')
+        # 以整筆樣本為範本，保留國家/語言/編碼等欄位之間的相關性
+        self.samples = samples
+
+    @classmethod
+    def from_json(cls, path: str = DEFAULT_SAMPLE_PATH) -> 'CatalogProfile':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def describe(self) -> Dict:
+        """樣本的來源分佈（寫入資料庫的 catalog_meta 供對照）"""
+        by_source = {}
+        for station in self.samples:
+            source = station.get('source_api') or ''
+            by_source[source] = by_source.get(source, 0) + 1
+        return {'samples': len(self.samples), 'by_source': by_source}
+
+
+class CatalogGenerator:
+    """依樣本分佈產生合成電台"""
+
+    def __init__(self, profile: CatalogProfile, seed: int = 42):
+        self.profile = profile
+        self.rng = random.Random(seed)
+        self.base_date = datetime(2025, 1, 1)
+
+    def _station_name(self, template: Dict, index: int) -> str:
+        rng = self.rng
+        country = template.get('country') or ''
+        language = (template.get('language') or '').lower()
+
+        if any(name in country for name in _TRADITIONAL_COUNTRIES):
+            name = rng.choice(_CITIES_TRADITIONAL) + rng.choice(_KINDS_TRADITIONAL)
+        elif 'chinese' in language or 'mandarin' in language or 'cantonese' in language:
+            name = rng.choice(_CITIES_SIMPLIFIED) + rng.choice(_KINDS_SIMPLIFIED)
+        else:
+            name = ' '.join(rng.sample(_LATIN_WORDS, rng.randint(2, 3)))
+
+        if rng.random() < 0.6:
+            name += f' FM{rng.randint(875, 1080) / 10:.1f}'
+        # 加上序號確保 (name, url, source_api) 唯一
+        return f'{name} #{index}'
+
+    def _tags(self, template: Dict) -> str:
+        tags = [tag for tag in (template.get('tags') or '').split(',') if tag]
+        other = self.rng.choice(self.profile.samples).get('tags') or ''
+        tags.extend(tag for tag in other.split(',')[:2] if tag and tag not in tags)
+        return ','.join(tags)
+
+    def stations(self, rows: int) -> Iterator[Tuple]:
+        """產生 rows 筆電台資料列（欄位順序同 INSERT_SQL）"""
+        rng = self.rng
+        samples = self.profile.samples
+
+        for index in range(rows):
+            template = rng.choice(samples)
+            source_api = template.get('source_api') or 'radio_browser'
+            station_uuid = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+            host = f'stream{rng.randint(1, 400)}.example-radio.net'
+            collected = self.base_date + timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+
+            url = f'https://{host}/live/{station_uuid[:8]}.mp3'
+            yield (
+                station_uuid,
+                self._station_name(template, index),
+                url,
+                f'https://www.example-radio.net/station/{index}',
+                f'https://www.example-radio.net/favicon/{index % 5000}.png',
+                self._tags(template),
+                template.get('country') or '',
+                template.get('language') or '',
+                template.get('codec') or '',
+                template.get('bitrate') or 0,
+                source_api,
+                template.get('source_type') or '',
+                collected.strftime('%Y-%m-%d %H:%M:%S'),
+                json.dumps({'synthetic': True}),
+                get_source_priority(source_api),
+                canonical_stream_url(url),
+            )
+
+
+INSERT_SQL = '''
+    INSERT INTO radio_stations
+    (uuid, name, url, homepage, favicon, tags, country, language, codec, bitrate,
+     source_api, source_type, collection_date, metadata, source_priority, canonical_url)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def generate_catalog(db_path: str, rows: int, seed: int = 42, sample_path: str = DEFAULT_SAMPLE_PATH,
+                     batch_size: int = 10_000) -> Dict:
+    """建立合成電台資料庫（覆寫既有檔案），回傳產生統計"""
+    logger = logging.getLogger(__name__)
+    start_time = time.perf_counter()
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+    profile = CatalogProfile.from_json(sample_path)
+    generator = CatalogGenerator(profile, seed=seed)
+
+    # 由收集器建立與正式環境相同的資料表、索引、觸發器
+    collector = MultiSourceRadioCollector(db_path)
+
+    with collector.db.writer() as conn:
+        batch = []
+        for row in generator.stations(rows):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                conn.executemany(INSERT_SQL, batch)
+                batch = []
+        if batch:
+            conn.executemany(INSERT_SQL, batch)
+
+        collector.search_index.rebuild(conn)
+        collector.entity_resolver.resolve(conn)
+        collector._bump_catalog_generation(conn.cursor())
+        conn.execute('''
+            INSERT INTO catalog_meta (key, value) VALUES ('synthetic_profile', ?)
+            ON CONFLICT (key) DO UPDATE SET value = excluded.value
+        ''', (json.dumps({'rows': rows, 'seed': seed, **profile.describe()}),))
+
+    with collector.db.writer() as conn:
+        conn.execute('ANALYZE')
+    collector.db.close()
+
+    elapsed = time.perf_counter() - start_time
+    logger.info(f"✅ 已產生 {rows} 個合成電台: {db_path} ({elapsed:.1f} 秒)")
+    return {
+        'db_path': db_path,
+        'rows': rows,
+        'seed': seed,
+        'seconds': round(elapsed, 2),
+        'size_bytes': os.path.getsize(db_path),
+    }
+
+
+def default_db_path(rows: int) -> str:
+    label = next((name for name, count in SIZES.items() if count == rows), str(rows))
+    return os.path.join(DEFAULT_OUTPUT_DIR, f'expanded_radio_stations_{label}.db')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='產生合成電台資料庫')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--size', choices=sorted(SIZES), default='10k', help='預設規模')
+    group.add_argument('--rows', type=int, help='自訂筆數')
+    parser.add_argument('--output', help='輸出資料庫路徑（預設 benchmarks/data/）')
+    parser.add_argument('--seed', type=int, default=42, help='亂數種子（相同種子產生相同資料）')
+    parser.add_argument('--sample', default=DEFAULT_SAMPLE_PATH, help='樣本電台 JSON')
+    args = parser.parse_args()
+
+    rows = args.rows or SIZES[args.size]
+    result = generate_catalog(args.output or default_db_path(rows), rows,
+                              seed=args.seed, sample_path=args.sample)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
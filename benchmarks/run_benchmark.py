@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+電台API負載基準測試
+以 Flask test client（僅應用程式本身）與實際 HTTP 伺服器（含 WSGI/網路開銷）兩種模式，
+對篩選、搜尋、分頁等查詢在不同併發數下量測吞吐量與 p50/p95/p99 延遲，輸出 JSON 報告
+
+用法:
+    python -m benchmarks.generate_catalog --size 100k
+    python -m benchmarks.run_benchmark --db benchmarks/data/expanded_radio_stations_100k.db \\
+        --output benchmarks/data/baseline.json
+    python -m benchmarks.run_benchmark --db ... --baseline benchmarks/data/baseline.json
+"""
+import os
+import sys
+import json
+import math
+import time
+import sqlite3
+import logging
+import platform
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import requests
+from werkzeug.serving import make_server
+
+from radio_api_server import RadioAPI
+
+# 查詢矩陣：(名稱, 路徑與參數)；cursor 情境由 walk_cursor 逐頁跟隨 next_cursor
+SCENARIOS = [
+    ('stations_first_page', '/api/stations?limit=50'),
+    ('stations_deep_page', '/api/stations?limit=50&page=200'),
+    ('stations_cursor_walk', None),
+    ('stations_count_none', '/api/stations?limit=50&count=none'),
+    ('stations_fields', '/api/stations?limit=200&fields=name,url'),
+    ('stations_collapsed', '/api/stations?limit=50&collapse=1'),
+    ('stations_country', '/api/stations?country=Taiwan&limit=50'),
+    ('stations_country_language', '/api/stations?country=China&language=chinese&limit=50'),
+    ('stations_filter_search', '/api/stations?country=China&search=交通&limit=50'),
+    ('search_cjk', '/api/stations/search?q=广播&limit=50'),
+    ('search_traditional', '/api/stations/search?q=臺灣&limit=50'),
+    ('search_latin_prefix', '/api/stations/search?q=jaz&limit=50'),
+    ('featured', '/api/stations/featured'),
+    ('stats', '/api/stats'),
+]
+
+DEFAULT_CONCURRENCY = (1, 4, 16)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """最近序位法百分位數（sorted_values 須已排序）"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class _TestClientTransport:
+    """以 Flask test client 發送請求（每個執行緒各自一個 client）"""
+
+    name = 'test_client'
+
+    def __init__(self, api: RadioAPI):
+        self.api = api
+        self._local = threading.local()
+
+    def get(self, path: str) -> Tuple[int, dict]:
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.api.app.test_client()
+        response = client.get(path)
+        return response.status_code, response.get_json(silent=True)
+
+    def close(self):
+        pass
+
+
+class _HttpTransport:
+    """對本機 werkzeug 多執行緒伺服器發送實際 HTTP 請求（每個執行緒各自一個連線）"""
+
+    name = 'http'
+
+    def __init__(self, api: RadioAPI):
+        # 關閉每個請求的存取日誌，避免輸出影響量測
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        self.server = make_server('127.0.0.1', 0, api.app, threaded=True)
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        self._local = threading.local()
+
+    def get(self, path: str) -> Tuple[int, dict]:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        response = session.get(self.base_url + path, timeout=60)
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = None
+        return response.status_code, payload
+
+    def close(self):
+        self.server.shutdown()
+
+
+TRANSPORTS = {
+    'test_client': _TestClientTransport,
+    'http': _HttpTransport,
+}
+
+
+class BenchmarkRunner:
+    """依情境 × 併發數執行請求並彙整延遲"""
+
+    def __init__(self, transport, requests_per_run: int = 200, warmup: int = 10, cursor_pages: int = 20):
+        self.transport = transport
+        self.requests_per_run = requests_per_run
+        self.warmup = warmup
+        self.cursor_pages = cursor_pages
+        self.logger = logging.getLogger(__name__)
+
+    def _request(self, path: str):
+        status, payload = self.transport.get(path)
+        if status >= 400:
+            raise RuntimeError(f'{path} → HTTP {status}')
+        return payload
+
+    def walk_cursor(self):
+        """以 keyset 游標連續取 cursor_pages 頁（一次操作）"""
+        path = '/api/stations?limit=50&count=none'
+        for _ in range(self.cursor_pages):
+            payload = self._request(path)
+            next_cursor = (payload or {}).get('pagination', {}).get('next_cursor')
+            if not next_cursor:
+                break
+            path = f'/api/stations?limit=50&count=none&cursor={next_cursor}'
+
+    def _operation(self, scenario: str, path: Optional[str]) -> Callable[[], None]:
+        if path is None:
+            return self.walk_cursor
+        return lambda: self._request(path)
+
+    def run(self, scenario: str, path: Optional[str], concurrency: int) -> Dict:
+        operation = self._operation(scenario, path)
+        for _ in range(self.warmup):
+            operation()
+
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker(count: int):
+            local_latencies = []
+            for _ in range(count):
+                start = time.perf_counter()
+                try:
+                    operation()
+                except Exception as e:
+                    with lock:
+                        errors.append(str(e))
+                    continue
+                local_latencies.append(time.perf_counter() - start)
+            with lock:
+                latencies.extend(local_latencies)
+
+        # 將總請求數平均分配給各工作執行緒
+        shares = [self.requests_per_run // concurrency] * concurrency
+        for index in range(self.requests_per_run % concurrency):
+            shares[index] += 1
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(worker, shares))
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        completed = len(latencies)
+        result = {
+            'scenario': scenario,
+            'transport': self.transport.name,
+            'concurrency': concurrency,
+            'requests': completed,
+            'errors': len(errors),
+            'duration_s': round(elapsed, 4),
+            'throughput_rps': round(completed / elapsed, 2) if elapsed > 0 else 0.0,
+            'mean_ms': round(sum(latencies) / completed * 1000, 3) if completed else 0.0,
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+            'max_ms': round(latencies[-1] * 1000, 3) if completed else 0.0,
+        }
+        if errors:
+            result['first_error'] = errors[0]
+
+        self.logger.info(
+            f"⏱️ {scenario:<28} {self.transport.name:<11} c={concurrency:<3} "
+            f"{result['throughput_rps']:>9.1f} req/s  p50 {result['p50_ms']:.2f} ms  "
+            f"p95 {result['p95_ms']:.2f} ms  p99 {result['p99_ms']:.2f} ms"
+        )
+        return result
+
+
+def _environment(db_path: str, api: RadioAPI) -> Dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    with api.db.reader() as conn:
+        rows = api.stats_tables.get_total(conn.cursor())
+
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'db_path': os.path.abspath(db_path),
+        'rows': rows,
+    }
+
+
+def compare_with_baseline(baseline: Dict, current: Dict) -> List[Dict]:
+    """以 (情境, 傳輸方式, 併發數) 對照基準，回傳 p50/p95/p99 與吞吐量的比值"""
+    index = {(r['scenario'], r['transport'], r['concurrency']): r for r in baseline.get('results', [])}
+    comparison = []
+    for result in current['results']:
+        before = index.get((result['scenario'], result['transport'], result['concurrency']))
+        if before is None:
+            continue
+        entry = {key: result[key] for key in ('scenario', 'transport', 'concurrency')}
+        for metric in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+            entry[f'{metric}_ratio'] = round(result[metric] / before[metric], 3) if before[metric] else None
+        comparison.append(entry)
+    return comparison
+
+
+def run_benchmark(db_path: str, transports=('test_client', 'http'), concurrency=DEFAULT_CONCURRENCY,
+                  scenarios: List[str] = None, requests_per_run: int = 200, warmup: int = 10,
+                  use_response_cache: bool = False) -> Dict:
+    """執行完整的基準測試矩陣"""
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f'找不到資料庫: {db_path}（請先執行 python -m benchmarks.generate_catalog）')
+
+    api = RadioAPI(db_path, enable_scheduler=False)
+    # 預設停用回應快取，量測的是查詢路徑本身而不是快取命中
+    if not use_response_cache:
+        api.response_cache.max_entries = 0
+    # 同步載入記憶體快照，避免前幾個請求落到 SQL 路徑
+    api.snapshots.refresh()
+
+    selected = [(name, path) for name, path in SCENARIOS if not scenarios or name in scenarios]
+    report = {
+        'environment': _environment(db_path, api),
+        'settings': {
+            'transports': list(transports),
+            'concurrency': list(concurrency),
+            'requests_per_run': requests_per_run,
+            'warmup': warmup,
+            'response_cache': use_response_cache,
+        },
+        'results': [],
+    }
+
+    for transport_name in transports:
+        transport = TRANSPORTS[transport_name](api)
+        try:
+            runner = BenchmarkRunner(transport, requests_per_run=requests_per_run, warmup=warmup)
+            for name, path in selected:
+                for level in concurrency:
+                    report['results'].append(runner.run(name, path, level))
+        finally:
+            transport.close()
+
+    api.db.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='電台API負載基準測試')
+    parser.add_argument('--db', required=True, help='電台資料庫（可由 benchmarks.generate_catalog 產生）')
+    parser.add_argument('--transport', choices=sorted(TRANSPORTS), action='append',
+                        help='傳輸方式，可重複指定（預設兩者皆測）')
+    parser.add_argument('--concurrency', default=','.join(str(c) for c in DEFAULT_CONCURRENCY),
+                        help='併發數清單，以逗號分隔')
+    parser.add_argument('--scenario', action='append', choices=[name for name, _ in SCENARIOS],
+                        help='只執行指定情境，可重複指定')
+    parser.add_argument('--requests', type=int, default=200, help='每個情境 × 併發數的請求數')
+    parser.add_argument('--warmup', type=int, default=10, help='每輪暖身請求數')
+    parser.add_argument('--response-cache', action='store_true', help='啟用 API 回應快取')
+    parser.add_argument('--output', help='輸出 JSON 報告路徑（預設輸出到標準輸出）')
+    parser.add_argument('--baseline', help='對照的基準報告 JSON')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    report = run_benchmark(
+        args.db,
+        transports=args.transport or ('test_client', 'http'),
+        concurrency=[int(c) for c in args.concurrency.split(',') if c.strip()],
+        scenarios=args.scenario,
+        requests_per_run=args.requests,
+        warmup=args.warmup,
+        use_response_cache=args.response_cache,
+    )
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            report['baseline_comparison'] = compare_with_baseline(json.load(f), report)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        logging.getLogger(__name__).info(f"📄 報告已寫入 {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
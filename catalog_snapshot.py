@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+記憶體目錄快照
+將整個電台目錄載入為不可變、以陣列儲存的快照（預先排序、字串駐留、倒排索引），
+同步後於背景重建並原子替換，篩選/分頁/統計不必在請求路徑上查詢 SQLite
+"""
+import sys
+import logging
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from station_serializer import (COLLAPSED_FIELDS, DEFAULT_FIELDS, RawJSON, decode_alternate_urls,
+                                decode_entity_metadata, dumps)
+
+
+def bitrate_bucket(bitrate) -> str:
+    """比特率分組（與 station_stats 的 SQL 分組一致）"""
+    bitrate = bitrate or 0
+    if bitrate <= 0:
+        return 'unknown'
+    if bitrate < 64:
+        return '<64'
+    if bitrate < 128:
+        return '64-127'
+    if bitrate < 192:
+        return '128-191'
+    if bitrate < 256:
+        return '192-255'
+    return '256+'
+
+
+class _InternedColumn:
+    """低基數字串欄位：每列只存代碼，字串只存一份，並附倒排索引"""
+
+    __slots__ = ('values', 'codes', 'postings', '_code_by_value')
+
+    def __init__(self):
+        self.values = []                 # 代碼 → 字串
+        self.codes = array('I')          # 列位置 → 代碼
+        self.postings = []               # 代碼 → 列位置陣列（遞增）
+        self._code_by_value = {}
+
+    def append(self, value: str, position: int):
+        value = value or ''
+        code = self._code_by_value.get(value)
+        if code is None:
+            code = len(self.values)
+            self._code_by_value[value] = code
+            self.values.append(sys.intern(value))
+            self.postings.append(array('I'))
+        self.codes.append(code)
+        self.postings[code].append(position)
+
+    def value_at(self, position: int) -> str:
+        return self.values[self.codes[position]]
+
+    def code_of(self, value: str) -> Optional[int]:
+        return self._code_by_value.get(value)
+
+    def positions_containing(self, needle: str) -> Sequence[int]:
+        """值包含 needle（不分大小寫，對應 SQL 的 LIKE '%needle%'）的列位置，已排序"""
+        needle = needle.lower()
+        matched = [self.postings[code] for code, value in enumerate(self.values)
+                   if needle in value.lower()]
+        if not matched:
+            return ()
+        if len(matched) == 1:
+            return matched[0]
+        return sorted(position for postings in matched for position in postings)
+
+    def counts(self) -> Dict[str, int]:
+        return {value: len(self.postings[code]) for code, value in enumerate(self.values)}
+
+
+class CatalogSnapshot:
+    """某個目錄世代的不可變快照，列依 (source_priority, name, id) 預先排序"""
+
+    # 公開欄位 → 取值方式
+    _FIELD_GETTERS = {
+        'uuid': lambda snapshot, position: snapshot.uuids[position],
+        'name': lambda snapshot, position: snapshot.names[position],
+        'url': lambda snapshot, position: snapshot.urls[position],
+        'homepage': lambda snapshot, position: snapshot.homepages[position],
+        'favicon': lambda snapshot, position: snapshot.favicons[position],
+        'tags': lambda snapshot, position: snapshot.tags[position],
+        'country': lambda snapshot, position: snapshot.countries.value_at(position),
+        'language': lambda snapshot, position: snapshot.languages.value_at(position),
+        'codec': lambda snapshot, position: snapshot.codecs.value_at(position),
+        'bitrate': lambda snapshot, position: snapshot.bitrates[position],
+        'source_api': lambda snapshot, position: snapshot.sources.value_at(position),
+        'source_type': lambda snapshot, position: snapshot.source_types.value_at(position),
+        'entity_id': lambda snapshot, position: snapshot.entity_ids[position],
+        'alternate_urls': lambda snapshot, position: decode_alternate_urls(snapshot.alternate_urls[position]),
+        'entity': lambda snapshot, position: decode_entity_metadata(snapshot.entity_metadata[position]),
+    }
+
+    # 預先編碼 JSON 片段的欄位組合（列表預設欄位與合併實體的預設欄位）
+    _ENCODED_FIELDS = (DEFAULT_FIELDS, COLLAPSED_FIELDS)
+
+    def __init__(self, generation: int):
+        self.generation = generation
+
+        self.ids = array('q')
+        self.priorities = array('b')
+        self.bitrates = array('i')
+        self.uuids = []
+        self.names = []
+        self.urls = []
+        self.homepages = []
+        self.favicons = []
+        self.tags = []
+
+        # 實體解析結果：每個實體只有主要電台列在 primary_positions
+        self.entity_ids = []
+        self.alternate_urls = []
+        self.entity_metadata = []
+        self.primary_positions = array('I')
+
+        self.countries = _InternedColumn()
+        self.languages = _InternedColumn()
+        self.codecs = _InternedColumn()
+        self.sources = _InternedColumn()
+        self.source_types = _InternedColumn()
+
+        self.last_update = None
+
+        # 各預設欄位組合的 JSON 片段（同一世代內內容不變，首次輸出時編碼後保留）
+        self._encoded = {fields: [] for fields in self._ENCODED_FIELDS}
+
+    @classmethod
+    def load(cls, conn) -> 'CatalogSnapshot':
+        """在同一個讀取交易中讀取世代與全部電台"""
+        conn.execute('BEGIN')
+        try:
+            row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'generation'").fetchone()
+            snapshot = cls(int(row[0]) if row else 0)
+
+            cursor = conn.execute('''
+                SELECT id, source_priority, uuid, name, url, homepage, favicon, tags,
+                       country, language, codec, bitrate, source_api, source_type, collection_date,
+                       entity_id, entity_primary, alternate_urls, entity_metadata
+                FROM radio_stations
+                ORDER BY source_priority, name, id
+            ''')
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                for row in rows:
+                    snapshot._append(row)
+        finally:
+            conn.rollback()
+
+        return snapshot
+
+    def _append(self, row: tuple):
+        position = len(self.ids)
+        (station_id, priority, uuid, name, url, homepage, favicon, tags,
+         country, language, codec, bitrate, source_api, source_type, collection_date,
+         entity_id, entity_primary, alternate_urls, entity_metadata) = row
+
+        self.ids.append(station_id)
+        self.priorities.append(priority)
+        self.bitrates.append(bitrate or 0)
+        self.uuids.append(uuid)
+        self.names.append(name)
+        self.urls.append(url)
+        self.homepages.append(homepage)
+        self.favicons.append(favicon)
+        self.tags.append(tuple(sys.intern(tag) for tag in tags.split(',')) if tags else ())
+
+        self.countries.append(country, position)
+        self.languages.append(language, position)
+        self.codecs.append(codec, position)
+        self.sources.append(source_api, position)
+        self.source_types.append(source_type, position)
+
+        self.entity_ids.append(entity_id)
+        self.alternate_urls.append(alternate_urls)
+        self.entity_metadata.append(entity_metadata)
+        if entity_primary:
+            self.primary_positions.append(position)
+
+        for encoded in self._encoded.values():
+            encoded.append(None)
+
+        if collection_date and (self.last_update is None or collection_date > self.last_update):
+            self.last_update = collection_date
+
+    def __len__(self):
+        return len(self.ids)
+
+    def sort_key(self, position: int) -> Tuple[int, str, int]:
+        return self.priorities[position], self.names[position], self.ids[position]
+
+    def station(self, position: int, fields: Sequence[str] = DEFAULT_FIELDS) -> Dict:
+        """組出與 SQL 路徑相同格式的電台資料（可只取部分欄位）"""
+        return {field: self._FIELD_GETTERS[field](self, position) for field in fields}
+
+    def station_json(self, position: int, fields: Tuple[str, ...] = DEFAULT_FIELDS) -> bytes:
+        """預設欄位組合的 JSON 片段（每列只編碼一次）"""
+        cache = self._encoded[fields]
+        encoded = cache[position]
+        if encoded is None:
+            encoded = dumps(self.station(position, fields))
+            cache[position] = encoded
+        return encoded
+
+    def render(self, positions: Sequence[int],
+               fields: Sequence[str] = DEFAULT_FIELDS) -> Union[RawJSON, List[Dict]]:
+        """輸出指定列：預設欄位直接拼接預先編碼的片段，欄位投影時組出精簡的電台資料"""
+        fields = tuple(fields)
+        if fields in self._encoded:
+            return RawJSON.array(self.station_json(position, fields) for position in positions)
+        return [self.station(position, fields) for position in positions]
+
+    def _first_position_after(self, sort_key: Tuple[int, str, int]) -> int:
+        """排序鍵大於 sort_key 的第一個列位置"""
+        low, high = 0, len(self.ids)
+        while low < high:
+            middle = (low + high) // 2
+            if self.sort_key(middle) <= tuple(sort_key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def filter_positions(self, country: str = '', language: str = '', collapse: bool = False) -> Sequence[int]:
+        """依國家/語言篩選（collapse 時每個實體只保留主要電台），回傳已排序的列位置"""
+        candidates = []
+        if country:
+            candidates.append(self.countries.positions_containing(country))
+        if language:
+            candidates.append(self.languages.positions_containing(language))
+        if collapse:
+            candidates.append(self.primary_positions)
+
+        if not candidates:
+            return range(len(self.ids))
+        if len(candidates) == 1:
+            return candidates[0]
+
+        candidates.sort(key=len)
+        smallest = candidates[0]
+        others = [set(positions) for positions in candidates[1:]]
+        return [position for position in smallest if all(position in other for other in others)]
+
+    def query(self, country: str = '', language: str = '', page: int = 1, limit: int = 50,
+              after: Tuple[int, str, int] = None,
+              collapse: bool = False) -> Tuple[Sequence[int], int, bool, Optional[tuple]]:
+        """篩選並分頁，回傳 (列位置, 總數, 是否還有下一頁, 下一頁排序鍵)"""
+        positions = self.filter_positions(country, language, collapse)
+
+        if after is not None:
+            start = bisect_left(positions, self._first_position_after(after))
+        else:
+            start = (page - 1) * limit
+
+        window = positions[start:start + limit + 1]
+        has_more = len(window) > limit
+        window = window[:limit]
+
+        next_key = self.sort_key(window[-1]) if has_more and len(window) else None
+
+        return window, len(positions), has_more, next_key
+
+    def featured(self, limit: int = 20) -> List[Dict]:
+        """手動精選電台（已依名稱排序）"""
+        code = self.sources.code_of('manual')
+        if code is None:
+            return []
+        return [self.station(position) for position in self.sources.postings[code][:limit]]
+
+    def get_stats(self) -> Dict:
+        """與 /api/stats 相同格式的統計"""
+        def ordered(counts: Dict[str, int], limit: int = None, skip_empty: bool = False):
+            items = sorted(((value, count) for value, count in counts.items()
+                            if count > 0 and not (skip_empty and value == '')),
+                           key=lambda item: (-item[1], item[0]))
+            return dict(items[:limit] if limit else items)
+
+        by_bitrate = {}
+        for bitrate in self.bitrates:
+            bucket = bitrate_bucket(bitrate)
+            by_bitrate[bucket] = by_bitrate.get(bucket, 0) + 1
+
+        return {
+            'total_stations': len(self.ids),
+            'by_source': ordered(self.sources.counts()),
+            'by_country': ordered(self.countries.counts(), limit=10, skip_empty=True),
+            'by_language': ordered(self.languages.counts(), skip_empty=True),
+            'by_codec': ordered(self.codecs.counts(), skip_empty=True),
+            'by_bitrate': ordered(by_bitrate),
+            'last_update': self.last_update
+        }
+
+
+class CatalogSnapshotManager:
+    """管理目前的快照：背景重建、原子替換，並只在世代相符時提供快照"""
+
+    def __init__(self, db):
+        self.db = db
+        self.logger = logging.getLogger(__name__)
+
+        self._snapshot = None
+        self._stats = None
+        self._rebuild_lock = threading.Lock()
+        self._rebuild_pending = False
+
+    @property
+    def current(self) -> Optional[CatalogSnapshot]:
+        """目前的快照（不論世代，尚未載入時為 None）"""
+        return self._snapshot
+
+    def get(self, generation: int) -> Optional[CatalogSnapshot]:
+        """取得與指定世代相符的快照；快照過期時觸發背景重建並回傳 None"""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.generation == generation:
+            return snapshot
+        self.refresh_async()
+        return None
+
+    def get_stats(self, generation: int) -> Optional[Dict]:
+        """快照的統計（每個快照只計算一次）"""
+        snapshot = self.get(generation)
+        if snapshot is None:
+            return None
+        stats = self._stats
+        if stats is None or stats[0] is not snapshot:
+            stats = (snapshot, snapshot.get_stats())
+            self._stats = stats
+        return stats[1]
+
+    def refresh_async(self):
+        """在背景執行緒重建快照（同時最多一個重建）"""
+        with self._rebuild_lock:
+            if self._rebuild_pending:
+                return
+            self._rebuild_pending = True
+        threading.Thread(target=self._rebuild, daemon=True).start()
+
+    def refresh(self):
+        """同步重建快照"""
+        with self.db.reader() as conn:
+            snapshot = CatalogSnapshot.load(conn)
+        # 單一屬性賦值即為原子替換，進行中的請求繼續使用舊快照
+        self._snapshot = snapshot
+        # 快照讀到的世代已提交，發布給其他連線（例如另一個程序寫入的同步）
+        self.db.publish_generation(snapshot.generation)
+        self.logger.info(f"📸 目錄快照已更新: 世代 {snapshot.generation}，{len(snapshot)} 個電台")
+        return snapshot
+
+    def _rebuild(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            self.logger.error(f"❌ 目錄快照重建失敗: {e}")
+        finally:
+            with self._rebuild_lock:
+                self._rebuild_pending = False
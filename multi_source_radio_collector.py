@@ -4,24 +4,164 @@
 多源電台收集器 - 簡化版
 整合多個公開API來源，大幅增加電台數量
 """
-import requests
+import os
 import json
 import sqlite3
 import time
 import logging
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Iterator
 import hashlib
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 # 導入各個收集器
 from tunein_collector import TuneInCollector
 from radio_browser_collector import RadioBrowserCollector
+from radio_database import RadioDatabase
+from station_search import StationSearchIndex
+from station_stats import StationStatsTables
+from station_dedup import StationDeduplicator, canonical_stream_url, station_name_key
+from station_entities import StationEntityResolver
+
+
+# 來源優先級 - 數字越小越優先（去重保留順序與 API 預設排序共用）
+SOURCE_PRIORITY = {
+    'manual': 1,          # 手動高品質電台 - 最高優先級
+    'tunein': 2,          # TuneIn 收集器 - 中等優先級
+    'radio_browser': 3,   # Radio Browser API - 較低優先級
+}
+DEFAULT_SOURCE_PRIORITY = 4
+
+
+def get_source_priority(source_api: str) -> int:
+    """取得來源的優先級數值"""
+    return SOURCE_PRIORITY.get(source_api or '', DEFAULT_SOURCE_PRIORITY)
+
+
+# 各來源收集的時限（秒），逾時即取消並保留資料庫中的資料
+SOURCE_DEADLINES = {
+    'manual': 60,
+    'radio_browser': 15 * 60,
+    'tunein': 6 * 60 * 60,
+}
+
+# 串流同步輪次（sync_runs）超過此時間沒有心跳即視為已中斷，清除其 sync_seen 紀錄
+# （須大於最長的來源時限：管線在時限到期時取消來源，存活的輪次不會超過）
+SYNC_RUN_STALE_SECONDS = max(SOURCE_DEADLINES.values()) + 60 * 60
+
+# 同一資料庫的同步工作（每日收集、每小時增量同步、啟動時更新、/api/update）在行程內依序執行，
+# 避免重疊的同步互相刪除對方寫入的電台；以資料庫檔案的絕對路徑為鍵，各收集器實例共用
+_sync_locks = {}
+_sync_locks_guard = threading.Lock()
+
+# 串流同步期間推進目錄世代的最短間隔（秒）：長時間爬取時不必每批都使回應快取失效、重建快照，
+# 來源完成時再推進一次，確保最後一批的變動可見
+GENERATION_BUMP_INTERVAL = 5 * 60
+
+# Radio Browser 增量同步（變更紀錄）：catalog_meta 中保存進度的鍵、
+# 定期完整校正的間隔（秒，補上變更紀錄無法表達的刪除與分類名次變化）、單次可套用的變更上限
+RADIO_BROWSER_CHANGES_KEY = 'radio_browser_changes'
+RADIO_BROWSER_FULL_SYNC_INTERVAL = 24 * 60 * 60
+RADIO_BROWSER_MAX_CHANGES = 20000
+
+# 需要完整同步（包括刪除）的同步分組：公共 API 全範圍同步、TuneIn 按子類別同步（前綴匹配）
+FULL_SYNC_SOURCE_PATTERNS = {
+    'radio_browser',
+    'tunein_',
+}
+
+# 每次檢查都會變動、不代表內容改變的 metadata 欄位（不納入內容指紋）
+VOLATILE_METADATA_KEYS = ('lastchecktime',)
+
+# 由 metadata 提升為獨立欄位（可建立索引）的屬性 → 欄位型別
+PROMOTED_COLUMNS = {
+    'category': 'TEXT',
+    'subcategory': 'TEXT',
+    'votes': 'INTEGER',
+    'clickcount': 'INTEGER',
+    'lastcheckok': 'INTEGER',
+    'countrycode': 'TEXT',
+}
+
+
+def station_promoted_fields(station: Dict) -> Dict:
+    """取得電台的提升欄位：收集器已提供的直接使用，否則才解析 metadata（相容舊資料）"""
+    fields = {column: station.get(column) for column in PROMOTED_COLUMNS}
+    
+    if any(value is None for value in fields.values()):
+        try:
+            metadata = json.loads(station.get('metadata') or '{}')
+        except (json.JSONDecodeError, TypeError):
+            metadata = {}
+        if isinstance(metadata, dict):
+            for column, value in fields.items():
+                if value is None and metadata.get(column) is not None:
+                    fields[column] = metadata[column]
+    
+    for column in ('votes', 'clickcount', 'lastcheckok'):
+        try:
+            fields[column] = int(fields[column]) if fields[column] is not None else None
+        except (ValueError, TypeError):
+            fields[column] = None
+    
+    # TuneIn 以 (category, subcategory) 作為同步分組，缺少時歸入 unknown
+    if station.get('source_api') == 'tunein':
+        fields['category'] = fields['category'] or 'unknown'
+        fields['subcategory'] = fields['subcategory'] or 'unknown'
+    
+    return fields
+
+
+def station_content_hash(station: Dict) -> str:
+    """同步時會寫入的欄位之內容指紋；指紋相同的電台不重寫、也不更新 collection_date"""
+    metadata = station.get('metadata', '{}')
+    try:
+        parsed = json.loads(metadata) if metadata else {}
+        if isinstance(parsed, dict):
+            for key in VOLATILE_METADATA_KEYS:
+                parsed.pop(key, None)
+            metadata = json.dumps(parsed, sort_keys=True, ensure_ascii=False)
+    except (json.JSONDecodeError, TypeError):
+        pass
+    
+    content = json.dumps([
+        station.get('homepage', ''),
+        station.get('favicon', ''),
+        station.get('tags', ''),
+        station.get('country', ''),
+        station.get('language', ''),
+        station.get('codec', ''),
+        station.get('bitrate', 0),
+        station.get('source_type', ''),
+        metadata,
+        *station_promoted_fields(station).values()
+    ], ensure_ascii=False, default=str)
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
 
 
 class MultiSourceRadioCollector:
-    def __init__(self, db_path: str = "expanded_radio_stations.db"):
+    def __init__(self, db_path: str = "expanded_radio_stations.db", db: RadioDatabase = None):
         self.db_path = db_path
         
+        # 資料庫連線管理（可與 RadioAPI 共用，以確保只有單一寫入連線）
+        self.db = db or RadioDatabase(db_path)
+        # 跨來源優先級比對在 SQL 中使用與 deduplicate_stations 相同的名稱鍵與 URL 正規化
+        self.db.register_function('station_name_key', 1, station_name_key)
+        self.db.register_function('canonical_stream_url', 1, canonical_stream_url)
+        
+        # 全文檢索索引（同步時一併維護）與統計摘要表（觸發器維護）
+        self.search_index = StationSearchIndex()
+        self.stats_tables = StationStatsTables()
+        
+        # 跨來源電台實體解析（同步後對整個目錄分群）
+        self.entity_resolver = StationEntityResolver()
+        
+        # 串流同步：已提交但尚未推進世代的變動，以及上次推進世代的時間（monotonic）
+        self._generation_dirty = False
+        self._last_generation_bump = None
+        
         # 設定日誌
         logging.basicConfig(
             level=logging.INFO,
@@ -34,32 +174,190 @@ class MultiSourceRadioCollector:
 
     def init_database(self):
         """初始化資料庫結構"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self.db.writer() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS radio_stations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    uuid TEXT UNIQUE,
+                    name TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    homepage TEXT,
+                    favicon TEXT,
+                    tags TEXT,
+                    country TEXT,
+                    language TEXT,
+                    codec TEXT,
+                    bitrate INTEGER,
+                    source_api TEXT,
+                    source_type TEXT,
+                    collection_date TEXT DEFAULT CURRENT_TIMESTAMP,
+                    metadata TEXT,
+                    source_priority INTEGER NOT NULL DEFAULT 4,
+                    content_hash TEXT,
+                    category TEXT,
+                    subcategory TEXT,
+                    votes INTEGER,
+                    clickcount INTEGER,
+                    lastcheckok INTEGER,
+                    countrycode TEXT,
+                    canonical_url TEXT,
+                    entity_id TEXT,
+                    entity_primary INTEGER NOT NULL DEFAULT 1,
+                    alternate_urls TEXT,
+                    entity_metadata TEXT,
+                    UNIQUE(name, url, source_api)
+                )
+            ''')
+            
+            # 既有資料庫升級：補上新欄位並回填
+            added_columns = self._ensure_columns(cursor, {
+                'source_priority': f'INTEGER NOT NULL DEFAULT {DEFAULT_SOURCE_PRIORITY}',
+                'content_hash': 'TEXT',
+                **PROMOTED_COLUMNS,
+                'canonical_url': 'TEXT',
+                'entity_id': 'TEXT',
+                'entity_primary': 'INTEGER NOT NULL DEFAULT 1',
+                'alternate_urls': 'TEXT',
+                'entity_metadata': 'TEXT',
+            })
+            if 'source_priority' in added_columns:
+                cursor.execute(f'''
+                    UPDATE radio_stations SET source_priority = CASE source_api
+                        {' '.join(f"WHEN '{source}' THEN {priority}" for source, priority in SOURCE_PRIORITY.items())}
+                        ELSE {DEFAULT_SOURCE_PRIORITY}
+                    END
+                ''')
+                self.logger.info("🔧 資料庫升級: 已回填 source_priority 欄位")
+            if 'category' in added_columns:
+                self._backfill_promoted_columns(cursor)
+            if 'canonical_url' in added_columns:
+                cursor.execute('UPDATE radio_stations SET canonical_url = canonical_stream_url(url)')
+                self.logger.info("🔧 資料庫升級: 已回填 canonical_url 欄位")
+            if 'entity_id' in added_columns:
+                entity_stats = self.entity_resolver.resolve(conn)
+                self.logger.info(f"🔧 資料庫升級: 已解析電台實體 ({entity_stats['entities']} 個實體)")
+            
+            # 同步時依 (來源, 分類, 子分類) 定位 TuneIn 分組；熱門度欄位供排序與篩選
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_radio_stations_source_category
+                ON radio_stations (source_api, category, subcategory)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_radio_stations_votes
+                ON radio_stations (votes DESC)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_radio_stations_clickcount
+                ON radio_stations (clickcount DESC)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_radio_stations_countrycode
+                ON radio_stations (countrycode, lastcheckok)
+            ''')
+            
+            # 跨來源優先級去重時依正規化 URL 找出其他來源的同一電台
+            cursor.execute('DROP INDEX IF EXISTS idx_radio_stations_url')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_radio_stations_canonical_url
+                ON radio_stations (canonical_url)
+            ''')
+            
+            # 預設排序 (來源優先級, 名稱, id) 的索引，支援 keyset 分頁
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_radio_stations_order
+                ON radio_stations (source_priority, name, id)
+            ''')
+            # 合併實體（每個實體只列主要電台）時使用的部分索引
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_radio_stations_entity_order
+                ON radio_stations (source_priority, name, id) WHERE entity_primary = 1
+            ''')
+            
+            # 目錄中繼資料（世代計數器等），API 以世代判斷快取是否失效
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS catalog_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+            cursor.execute('''
+                INSERT OR IGNORE INTO catalog_meta (key, value) VALUES ('generation', 0)
+            ''')
+            
+            # 串流同步時記錄本輪已寫入的電台，來源完成後據此刪除消失的電台（跨交易保存）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sync_seen (
+                    run_id TEXT NOT NULL,
+                    sync_key TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    PRIMARY KEY (run_id, sync_key, name, url)
+                ) WITHOUT ROWID
+            ''')
+            # 進行中的串流同步輪次與心跳：清理 sync_seen 時只刪除本輪與確定已中斷的輪次
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sync_runs (
+                    run_id TEXT PRIMARY KEY,
+                    started_at REAL NOT NULL,
+                    heartbeat_at REAL NOT NULL
+                ) WITHOUT ROWID
+            ''')
+            
+            # 全文檢索索引與統計摘要表（既有資料庫首次升級時自動回填）
+            self.search_index.ensure_schema(conn)
+            self.stats_tables.ensure_schema(conn)
+
+    def _backfill_promoted_columns(self, cursor):
+        """由 metadata JSON 回填提升欄位；舊的 TuneIn 資料由標籤中的分類路徑回填"""
+        cursor.execute('''
+            UPDATE radio_stations SET
+                category = json_extract(metadata, '$.category'),
+                subcategory = json_extract(metadata, '$.subcategory'),
+                votes = CAST(json_extract(metadata, '$.votes') AS INTEGER),
+                clickcount = CAST(json_extract(metadata, '$.clickcount') AS INTEGER),
+                lastcheckok = CAST(json_extract(metadata, '$.lastcheckok') AS INTEGER),
+                countrycode = json_extract(metadata, '$.countrycode')
+            WHERE json_valid(metadata)
+        ''')
         
+        # TuneIn 標籤為 "tunein,<分類路徑>"，與收集器相同以第一個底線切分主分類與子分類
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS radio_stations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                uuid TEXT UNIQUE,
-                name TEXT NOT NULL,
-                url TEXT NOT NULL,
-                homepage TEXT,
-                favicon TEXT,
-                tags TEXT,
-                country TEXT,
-                language TEXT,
-                codec TEXT,
-                bitrate INTEGER,
-                source_api TEXT,
-                source_type TEXT,
-                collection_date TEXT DEFAULT CURRENT_TIMESTAMP,
-                metadata TEXT,
-                UNIQUE(name, url, source_api)
+            WITH paths AS (
+                SELECT id,
+                       CASE WHEN tags LIKE 'tunein,%' THEN substr(tags, 8) ELSE '' END AS path
+                FROM radio_stations
+                WHERE source_api = 'tunein' AND category IS NULL
             )
+            UPDATE radio_stations SET
+                category = COALESCE(NULLIF(CASE WHEN instr(paths.path, '_') > 0
+                                                THEN substr(paths.path, 1, instr(paths.path, '_') - 1)
+                                                ELSE paths.path END, ''), 'unknown'),
+                subcategory = COALESCE(NULLIF(CASE WHEN instr(paths.path, '_') > 0
+                                                   THEN substr(paths.path, instr(paths.path, '_') + 1)
+                                                   ELSE '' END, ''), 'unknown')
+            FROM paths
+            WHERE radio_stations.id = paths.id
         ''')
+        cursor.execute('''
+            UPDATE radio_stations SET subcategory = 'unknown'
+            WHERE source_api = 'tunein' AND subcategory IS NULL
+        ''')
+        self.logger.info("🔧 資料庫升級: 已由 metadata 回填分類與熱門度欄位")
+
+    def _ensure_columns(self, cursor, columns: Dict[str, str]) -> List[str]:
+        """為既有的 radio_stations 表補上缺少的欄位，回傳本次新增的欄位名稱"""
+        cursor.execute('PRAGMA table_info(radio_stations)')
+        existing = {row[1] for row in cursor.fetchall()}
+        
+        added = []
+        for column, declaration in columns.items():
+            if column not in existing:
+                cursor.execute(f'ALTER TABLE radio_stations ADD COLUMN {column} {declaration}')
+                added.append(column)
         
-        conn.commit()
-        conn.close()
+        return added
 
     def add_manual_premium_stations(self) -> List[Dict]:
         """加入手動收集的高品質台灣電台"""
@@ -244,95 +542,49 @@ class MultiSourceRadioCollector:
         else:
             return "none"
 
-    def collect_all_stations(self) -> Dict:
-        """收集所有來源的電台"""
+    def sync_lock(self) -> threading.RLock:
+        """同一資料庫共用的同步鎖（行程內所有收集器實例共用）"""
+        with _sync_locks_guard:
+            return _sync_locks.setdefault(os.path.abspath(self.db_path), threading.RLock())
+
+    @contextmanager
+    def _serialized_sync(self, job: str):
+        """持有同步鎖執行同步工作；其他同步進行中時等待其完成"""
+        lock = self.sync_lock()
+        if not lock.acquire(blocking=False):
+            self.logger.info(f"⏳ 另一個同步工作進行中，{job}等待其完成後開始...")
+            lock.acquire()
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def collect_all_stations(self, commit_incrementally: bool = False,
+                             source_deadlines: Dict[str, float] = None) -> Dict:
+        """並行收集所有來源的電台（與同一資料庫的其他同步工作依序執行）
+        
+        各來源在獨立執行緒中執行，超過 source_deadlines 的時限即發出取消信號並視為失敗
+        （資料庫保留該來源原有資料）。commit_incrementally 為 True 時改用串流管線
+        （StationPipeline）：電台邊收集邊分批寫入資料庫，不在記憶體中保留整份清單，
+        各來源完成後才刪除其同步分組中消失的電台；跨來源的優先級去重由同步時對照資料庫保證。
+        """
+        with self._serialized_sync('多源電台收集'):
+            return self._collect_all_stations(commit_incrementally, source_deadlines)
+
+    def _collect_all_stations(self, commit_incrementally: bool, source_deadlines: Dict[str, float]) -> Dict:
         self.logger.info("🚀 開始多源電台收集...")
         
-        all_stations = []
+        deadlines = dict(SOURCE_DEADLINES, **(source_deadlines or {}))
         collection_stats = {}
+        stations_by_source = {}
         
         # 獲取今天的收集模式
         tunein_mode = self.get_tunein_collection_mode()
         
-        # 1. 手動高品質電台 - 每天都收集
-        try:
-            self.logger.info("👑 收集手動高品質電台...")
-            start_time = time.time()
-            manual_stations = self.add_manual_premium_stations()
-            all_stations.extend(manual_stations)
-            
-            collection_stats['manual'] = {
-                'stations_found': len(manual_stations),
-                'time_seconds': time.time() - start_time,
-                'success': True
-            }
-            
-        except Exception as e:
-            collection_stats['manual'] = {
-                'stations_found': 0,
-                'time_seconds': time.time() - start_time,
-                'success': False,
-                'error': str(e)
-            }
-            self.logger.error(f"❌ 手動電台收集失敗: {e}")
-        
-        # 2. Radio Browser 收集器 - 每天執行（電台數不多）
-        try:
-            self.logger.info("🌐 執行 Radio Browser 收集器...")
-            start_time = time.time()
-            
-            radio_browser_collector = RadioBrowserCollector()
-            radio_browser_stations = radio_browser_collector.collect_from_radio_browser()
-            all_stations.extend(radio_browser_stations)
-            
-            collection_stats['radio_browser'] = {
-                'stations_found': len(radio_browser_stations),
-                'time_seconds': time.time() - start_time,
-                'success': True
-            }
-            
-        except Exception as e:
-            collection_stats['radio_browser'] = {
-                'stations_found': 0,
-                'time_seconds': time.time() - start_time,
-                'success': False,
-                'error': str(e)
-            }
-            self.logger.error(f"❌ Radio Browser 收集失敗: {e}")
-        
-        # 3. TuneIn 收集器 - 根據排程執行
+        # 要執行的來源：手動與 Radio Browser 每天執行，TuneIn 依排程
+        sources = ['manual', 'radio_browser']
         if self.should_run_tunein_today():
-            try:
-                mode_description = {
-                    'specific_categories': '特定類別',
-                    'mega_categories': '超大分類',
-                    'none': '無'
-                }
-                
-                self.logger.info(f"📻 使用 TuneIn 收集器 ({mode_description.get(tunein_mode, tunein_mode)})...")
-                start_time = time.time()
-                
-                tunein_collector = TuneInCollector()
-                # 傳遞收集模式給 TuneIn 收集器
-                tunein_stations = tunein_collector.collect_from_tunein(mode=tunein_mode)
-                all_stations.extend(tunein_stations)
-                
-                collection_stats['tunein'] = {
-                    'stations_found': len(tunein_stations),
-                    'time_seconds': time.time() - start_time,
-                    'success': True,
-                    'mode': tunein_mode
-                }
-                
-            except Exception as e:
-                collection_stats['tunein'] = {
-                    'stations_found': 0,
-                    'time_seconds': 0,
-                    'success': False,
-                    'error': str(e),
-                    'mode': tunein_mode
-                }
-                self.logger.error(f"❌ TuneIn 收集失敗: {e}")
+            sources.append('tunein')
         else:
             self.logger.info("⏸️ TuneIn 今日不執行，跳過收集")
             collection_stats['tunein'] = {
@@ -343,7 +595,78 @@ class MultiSourceRadioCollector:
                 'reason': 'not_scheduled_today'
             }
         
+        if commit_incrementally:
+            from station_pipeline import StationPipeline
+            pipeline = StationPipeline(self, source_deadlines=deadlines)
+            return pipeline.run(sources, collection_stats, tunein_mode)
+        
+        executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix='collector')
+        cancel_events = {source: threading.Event() for source in sources}
+        start_times = {}
+        futures = {}
+        for source in sources:
+            start_times[source] = time.time()
+            futures[executor.submit(self._collect_source, source, cancel_events[source], tunein_mode)] = source
+        
+        try:
+            pending = set(futures)
+            while pending:
+                # 等到任一來源完成，或最近的時限到期
+                now = time.time()
+                next_deadline = min(start_times[futures[f]] + deadlines.get(futures[f], 3600) for f in pending)
+                done, pending = wait(pending, timeout=max(0.0, next_deadline - now),
+                                     return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    source = futures[future]
+                    elapsed = time.time() - start_times[source]
+                    try:
+                        source_stations = future.result()
+                    except Exception as e:
+                        collection_stats[source] = {
+                            'stations_found': 0,
+                            'time_seconds': elapsed,
+                            'success': False,
+                            'error': str(e)
+                        }
+                        self.logger.error(f"❌ {source} 收集失敗: {e}")
+                        continue
+                    
+                    stations_by_source[source] = source_stations
+                    collection_stats[source] = {
+                        'stations_found': len(source_stations),
+                        'time_seconds': elapsed,
+                        'success': True
+                    }
+                    self.logger.info(f"✅ {source} 收集完成: {len(source_stations)} 個電台 ({elapsed:.1f} 秒)")
+                
+                # 逾時的來源：發出取消信號並放棄等待
+                now = time.time()
+                for future in list(pending):
+                    source = futures[future]
+                    deadline = deadlines.get(source, 3600)
+                    if now - start_times[source] >= deadline:
+                        cancel_events[source].set()
+                        future.cancel()
+                        pending.discard(future)
+                        collection_stats[source] = {
+                            'stations_found': 0,
+                            'time_seconds': now - start_times[source],
+                            'success': False,
+                            'timed_out': True,
+                            'error': f'超過時限 {deadline:.0f} 秒'
+                        }
+                        self.logger.warning(f"⏰ {source} 超過時限 {deadline:.0f} 秒，已取消（保留資料庫中的資料）")
+        finally:
+            for event in cancel_events.values():
+                event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        if 'tunein' in collection_stats:
+            collection_stats['tunein']['mode'] = tunein_mode
+        
         # 按優先級去重處理
+        all_stations = [station for stations in stations_by_source.values() for station in stations]
         self.logger.info("🔄 開始按優先級去重處理...")
         self.logger.info("📋 去重優先級: 手動高品質電台 >> TuneIn >> Radio Browser API")
         unique_stations = self.deduplicate_stations(all_stations)
@@ -358,45 +681,61 @@ class MultiSourceRadioCollector:
             'collection_time': datetime.now().isoformat()
         }
 
-    def deduplicate_stations(self, stations: List[Dict]) -> List[Dict]:
-        """電台去重處理 - 按優先級保留：高品質電台 >> TuneIn >> 公共API"""
-        # 定義優先級
-        priority_map = {
-            'manual': 1,          # 手動高品質電台 - 最高優先級
-            'tunein': 2,          # TuneIn 收集器 - 中等優先級  
-            'radio_browser': 3,   # Radio Browser API - 較低優先級
-        }
+    def _collect_source(self, source: str, cancel_event: threading.Event, tunein_mode: str) -> List[Dict]:
+        """在工作執行緒中執行單一來源的收集器"""
+        return list(self.iter_source(source, cancel_event, tunein_mode))
+
+    def iter_source(self, source: str, cancel_event: threading.Event, tunein_mode: str) -> Iterator[Dict]:
+        """逐一產生單一來源的電台（cancel_event 被設定時收集器會提前結束）"""
+        if source == 'manual':
+            self.logger.info("👑 收集手動高品質電台...")
+            return iter(self.add_manual_premium_stations())
         
-        # 按優先級排序 - 優先級數字越小越優先
-        stations_sorted = sorted(stations, key=lambda x: priority_map.get(x.get('source_api', ''), 999))
+        if source == 'radio_browser':
+            self.logger.info("🌐 執行 Radio Browser 收集器...")
+            return RadioBrowserCollector().iter_radio_browser(cancel_event=cancel_event)
+        
+        if source == 'tunein':
+            mode_description = {
+                'specific_categories': '特定類別',
+                'mega_categories': '超大分類',
+                'none': '無'
+            }
+            self.logger.info(f"📻 使用 TuneIn 收集器 ({mode_description.get(tunein_mode, tunein_mode)})...")
+            return TuneInCollector().iter_tunein(mode=tunein_mode, cancel_event=cancel_event)
         
-        seen = set()
-        unique_stations = []
-        duplicate_count = 0
+        raise ValueError(f'未知的來源: {source}')
+
+    @staticmethod
+    def _merge_sync_results(results) -> Dict:
+        """合併各來源的同步結果（格式同 sync_stations_to_db 的回傳值）"""
+        merged = {'added': 0, 'updated': 0, 'deleted': 0, 'total_operations': 0,
+                  'executed_sync_groups': [], 'full_sync_groups': [], 'update_only_groups': []}
+        for result in results:
+            for key, value in result.items():
+                if key in merged:
+                    merged[key] += value
+        return merged
+
+    def deduplicate_stations(self, stations: List[Dict]) -> List[Dict]:
+        """電台去重處理 - 按優先級保留：高品質電台 >> TuneIn >> 公共API
         
-        for station in stations_sorted:
+        以 (名稱鍵, 正規化串流 URL) 為唯一標識，http/https、預設連接埠、追蹤參數
+        與 TuneIn Tune.ashx 的不同寫法視為同一電台。
+        """
+        deduplicator = StationDeduplicator(get_source_priority)
+        for station in stations:
             if not station.get('url'):
                 continue
-                
-            # 使用名稱和URL的組合作為唯一標識
-            name = station.get('name', '').lower().strip()
-            url = station.get('url', '').strip()
-            key = (name, url)
-            
-            # 如果是重複的電台
-            if key in seen:
-                duplicate_count += 1
-                source = station.get('source_api', 'unknown')
-                existing_station = next((s for s in unique_stations if (s.get('name', '').lower().strip(), s.get('url', '').strip()) == key), None)
-                existing_source = existing_station.get('source_api', 'unknown') if existing_station else 'unknown'
-                
-                self.logger.debug(f"🔄 重複電台已跳過: {name} ({source} -> 保留 {existing_source})")
-                continue
-            
-            seen.add(key)
-            unique_stations.append(station)
+            deduplicator.add(station)
+        
+        unique_stations = deduplicator.stations()
+        collisions = deduplicator.collision_stats()
         
-        self.logger.info(f"🎯 去重完成: 跳過 {duplicate_count} 個重複電台，保留 {len(unique_stations)} 個唯一電台")
+        self.logger.info(f"🎯 去重完成: 跳過 {collisions['duplicates']} 個重複電台，保留 {len(unique_stations)} 個唯一電台")
+        if collisions['duplicates']:
+            self.logger.info(f"🔄 各來源被略過的重複電台: {collisions['by_source']}")
+            self.logger.info(f"🔄 重複組合 (略過 -> 保留): {collisions['pairs']}")
         
         # 按來源統計去重後的結果
         source_count = {}
@@ -413,40 +752,62 @@ class MultiSourceRadioCollector:
         source_api = station.get('source_api', '')
         
         if source_api == 'tunein':
-            # TuneIn 根據 metadata 中的類別資訊生成同步 key
-            try:
-                metadata = json.loads(station.get('metadata', '{}'))
-                category = metadata.get('category', 'unknown')
-                subcategory = metadata.get('subcategory', 'unknown')
-                return f"tunein_{category}_{subcategory}"
-            except (json.JSONDecodeError, TypeError):
-                return f"tunein_unknown"
+            # TuneIn 根據類別資訊生成同步 key
+            fields = station_promoted_fields(station)
+            return f"tunein_{fields['category']}_{fields['subcategory']}"
         
         # 其他來源直接使用 source_api
         return source_api
 
+    @staticmethod
+    def _sync_group_belongs_to(source_api: str, sync_key: str) -> bool:
+        """同步分組是否屬於指定來源"""
+        return (source_api == 'radio_browser' and sync_key == 'radio_browser') or \
+               (source_api == 'tunein' and sync_key.startswith('tunein_')) or \
+               (source_api == 'manual' and sync_key == 'manual')
+
+    @staticmethod
+    def _needs_full_sync(sync_key: str) -> bool:
+        """同步分組是否需要完整同步（包括刪除）"""
+        return any(sync_key == pattern or sync_key.startswith(pattern) for pattern in FULL_SYNC_SOURCE_PATTERNS)
+
     def sync_stations_to_db(self, stations_data: Dict):
         """智能同步電台到資料庫 - 基於類別階層進行精確同步"""
-        conn = sqlite3.connect(self.db_path)
+        # 透過單一寫入連線執行，WAL 模式下 API 讀取不會被此交易阻塞
+        start_time = time.perf_counter()
+        with self._serialized_sync('資料庫同步'):
+            with self.db.writer() as conn:
+                result = self._sync_stations(conn, stations_data)
+                self._record_sync_stats(conn, result, time.perf_counter() - start_time)
+            # 實體解析在同步交易提交後進行，計算期間不佔用寫入連線
+            if result['total_operations']:
+                result['entity_stats'] = self.resolve_entities()
+        return result
+
+    def _record_sync_stats(self, conn: sqlite3.Connection, result: Dict, duration: float):
+        """將本次同步統計寫入 catalog_meta（與同步在同一交易），供 API 監控指標讀取"""
+        sync_stats = {
+            'finished_at': datetime.now().isoformat(),
+            'duration_seconds': round(duration, 3),
+            'added': result.get('added', 0),
+            'updated': result.get('updated', 0),
+            'deleted': result.get('deleted', 0)
+        }
+        conn.execute('''
+            INSERT INTO catalog_meta (key, value) VALUES ('last_sync', ?)
+            ON CONFLICT (key) DO UPDATE SET value = excluded.value
+        ''', (json.dumps(sync_stats),))
+
+    def _sync_stations(self, conn: sqlite3.Connection, stations_data: Dict):
+        """在指定的寫入連線上執行同步（由 sync_stations_to_db 負責提交）"""
         cursor = conn.cursor()
         
         stations = stations_data['stations']
         stats = stations_data['stats']
         
-        # 統計變數
-        added_count = 0
-        updated_count = 0
-        deleted_count = 0
-        
         self.logger.info("🔄 開始智能同步資料庫...")
         
-        # 1. 定義需要完整同步（包括刪除）的來源類型
-        FULL_SYNC_SOURCE_PATTERNS = {
-            'radio_browser',     # 公共 API - 全範圍同步
-            'tunein_',          # TuneIn 類別 - 按子類別同步 (前綴匹配)
-        }
-        
-        # 2. 按同步分組整理電台和統計
+        # 1. 按同步分組整理電台和統計（完整同步分組見 FULL_SYNC_SOURCE_PATTERNS）
         executed_sync_groups = {}      # 所有執行的同步分組
         full_sync_groups = set()       # 需要完整同步的分組
         
@@ -462,24 +823,13 @@ class MultiSourceRadioCollector:
         for source_api, source_stats in stats.items():
             if source_stats.get('success', False) and not source_stats.get('skipped', False):
                 # 根據 source_api 找到對應的同步分組
-                source_sync_groups = []
-                for sync_key in stations_by_sync_group.keys():
-                    if (source_api == 'radio_browser' and sync_key == 'radio_browser') or \
-                       (source_api == 'tunein' and sync_key.startswith('tunein_')) or \
-                       (source_api == 'manual' and sync_key == 'manual'):
-                        source_sync_groups.append(sync_key)
+                source_sync_groups = [sync_key for sync_key in stations_by_sync_group.keys()
+                                      if self._sync_group_belongs_to(source_api, sync_key)]
                 
                 for sync_key in source_sync_groups:
                     executed_sync_groups[sync_key] = source_stats
                     
-                    # 判斷是否需要完整同步
-                    needs_full_sync = False
-                    for pattern in FULL_SYNC_SOURCE_PATTERNS:
-                        if sync_key == pattern or sync_key.startswith(pattern):
-                            needs_full_sync = True
-                            break
-                    
-                    if needs_full_sync:
+                    if self._needs_full_sync(sync_key):
                         full_sync_groups.add(sync_key)
                         self.logger.info(f"✅ {sync_key} 本次執行，將進行完整同步（增刪改）")
                     else:
@@ -494,175 +844,35 @@ class MultiSourceRadioCollector:
             self.logger.warning("⚠️ 沒有成功執行的收集器，跳過資料庫同步")
             return {'added': 0, 'updated': 0, 'deleted': 0, 'total_operations': 0}
         
-        # 3. 獲取資料庫中需要完整同步分組的現有電台
-        current_db_stations = {}
-        for sync_key in full_sync_groups:
-            if sync_key == 'radio_browser':
-                # 公共 API - 直接查詢
-                cursor.execute('''
-                    SELECT uuid, name, url FROM radio_stations 
-                    WHERE source_api = ?
-                ''', ('radio_browser',))
-            elif sync_key.startswith('tunein_'):
-                # TuneIn 子類別 - 根據 metadata 查詢
-                parts = sync_key.split('_')
-                if len(parts) >= 3:
-                    category = parts[1]
-                    subcategory = parts[2]
-                    cursor.execute('''
-                        SELECT uuid, name, url FROM radio_stations 
-                        WHERE source_api = 'tunein' 
-                        AND metadata LIKE ? 
-                        AND metadata LIKE ?
-                    ''', (f'%"category": "{category}"%', f'%"subcategory": "{subcategory}"%'))
-                else:
-                    cursor.execute('''
-                        SELECT uuid, name, url FROM radio_stations 
-                        WHERE source_api = 'tunein'
-                    ''')
-            
-            current_db_stations[sync_key] = {
-                (row[1].lower().strip(), row[2].strip()): row[0]  # (name, url): uuid
-                for row in cursor.fetchall()
-            }
-            self.logger.debug(f"📊 資料庫中 {sync_key} 現有電台: {len(current_db_stations[sync_key])} 個（將參與刪除比對）")
+        # 2. 將本次執行分組的電台批次寫入暫存表，之後以集合運算比對
+        group_scopes = self._stage_stations(cursor, stations, executed_sync_groups)
         
-        # 4. 處理新收集的電台 - 新增或更新
-        new_station_keys = {}  # 按同步分組記錄新電台
-        for sync_key in executed_sync_groups.keys():
-            new_station_keys[sync_key] = set()
+        # 3. 新增或更新 - 只寫入新電台與內容指紋改變的電台
+        added_count, updated_count, changed_ids = self._upsert_staged_stations(cursor)
         
-        for station in stations:
-            sync_key = self.get_sync_key(station)
-            
-            # 只處理本次執行的同步分組
-            if sync_key not in executed_sync_groups:
-                continue
-                
-            name = station.get('name', '').lower().strip()
-            url = station.get('url', '').strip()
-            station_key = (name, url)
-            
-            # 記錄新電台的key（用於後續刪除比對）
-            if sync_key in full_sync_groups:
-                new_station_keys[sync_key].add(station_key)
-            
-            try:
-                # 檢查是否已存在（根據同步分組的查詢邏輯）
-                source_api = station.get('source_api', '')
-                if source_api == 'tunein':
-                    # TuneIn 需要檢查 metadata 匹配
-                    try:
-                        metadata = json.loads(station.get('metadata', '{}'))
-                        category = metadata.get('category', 'unknown')
-                        subcategory = metadata.get('subcategory', 'unknown')
-                        cursor.execute('''
-                            SELECT id FROM radio_stations 
-                            WHERE source_api = ? AND name = ? AND url = ?
-                            AND metadata LIKE ? AND metadata LIKE ?
-                        ''', (source_api, station.get('name', ''), url,
-                              f'%"category": "{category}"%', f'%"subcategory": "{subcategory}"%'))
-                    except (json.JSONDecodeError, TypeError):
-                        cursor.execute('''
-                            SELECT id FROM radio_stations 
-                            WHERE source_api = ? AND name = ? AND url = ?
-                        ''', (source_api, station.get('name', ''), url))
-                else:
-                    # 其他來源直接查詢
-                    cursor.execute('''
-                        SELECT id FROM radio_stations 
-                        WHERE source_api = ? AND name = ? AND url = ?
-                    ''', (source_api, station.get('name', ''), url))
-                
-                existing = cursor.fetchone()
-                
-                if existing:
-                    # 更新現有電台
-                    cursor.execute('''
-                        UPDATE radio_stations SET
-                        homepage = ?, favicon = ?, tags = ?, country = ?, language = ?,
-                        codec = ?, bitrate = ?, source_type = ?, metadata = ?,
-                        collection_date = CURRENT_TIMESTAMP
-                        WHERE id = ?
-                    ''', (
-                        station.get('homepage', ''),
-                        station.get('favicon', ''),
-                        station.get('tags', ''),
-                        station.get('country', ''),
-                        station.get('language', ''),
-                        station.get('codec', ''),
-                        station.get('bitrate', 0),
-                        station.get('source_type', ''),
-                        station.get('metadata', '{}'),
-                        existing[0]
-                    ))
-                    updated_count += 1
-                    self.logger.debug(f"🔄 更新電台: {station.get('name', '')} ({sync_key})")
-                else:
-                    # 新增電台
-                    cursor.execute('''
-                        INSERT INTO radio_stations 
-                        (uuid, name, url, homepage, favicon, tags, country, language, 
-                         codec, bitrate, source_api, source_type, metadata)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        station.get('uuid', ''),
-                        station.get('name', ''),
-                        station.get('url', ''),
-                        station.get('homepage', ''),
-                        station.get('favicon', ''),
-                        station.get('tags', ''),
-                        station.get('country', ''),
-                        station.get('language', ''),
-                        station.get('codec', ''),
-                        station.get('bitrate', 0),
-                        station.get('source_api', ''),
-                        station.get('source_type', ''),
-                        station.get('metadata', '{}')
-                    ))
-                    added_count += 1
-                    self.logger.debug(f"➕ 新增電台: {station.get('name', '')} ({sync_key})")
-                    
-            except sqlite3.Error as e:
-                self.logger.warning(f"⚠️ 處理電台失敗: {station.get('name', '')} - {e}")
-        
-        # 5. 刪除消失的電台（只針對需要完整同步的分組）
-        for sync_key, db_stations in current_db_stations.items():
-            for station_key, uuid in db_stations.items():
-                # 如果資料庫中的電台在本次收集中沒有出現，就刪除
-                if station_key not in new_station_keys.get(sync_key, set()):
-                    try:
-                        if sync_key == 'radio_browser':
-                            cursor.execute('''
-                                DELETE FROM radio_stations 
-                                WHERE source_api = ? AND name = ? AND url = ?
-                            ''', ('radio_browser', station_key[0], station_key[1]))
-                        elif sync_key.startswith('tunein_'):
-                            parts = sync_key.split('_')
-                            if len(parts) >= 3:
-                                category = parts[1]
-                                subcategory = parts[2]
-                                cursor.execute('''
-                                    DELETE FROM radio_stations 
-                                    WHERE source_api = 'tunein' AND name = ? AND url = ?
-                                    AND metadata LIKE ? AND metadata LIKE ?
-                                ''', (station_key[0], station_key[1],
-                                      f'%"category": "{category}"%', f'%"subcategory": "{subcategory}"%'))
-                            else:
-                                cursor.execute('''
-                                    DELETE FROM radio_stations 
-                                    WHERE source_api = 'tunein' AND name = ? AND url = ?
-                                ''', (station_key[0], station_key[1]))
-                        
-                        deleted_count += 1
-                        self.logger.info(f"🗑️ 刪除消失的電台: {station_key[0]} ({sync_key})")
-                    except sqlite3.Error as e:
-                        self.logger.warning(f"⚠️ 刪除電台失敗: {station_key[0]} - {e}")
-        
-        conn.commit()
-        conn.close()
-        
-        # 6. 記錄同步統計
+        # 4. 刪除消失的電台（只針對需要完整同步的分組）
+        deleted_ids = self._delete_missing_stations(cursor, full_sync_groups, group_scopes)
+        
+        # 5. 移除被較高優先級來源取代的電台（各來源分別同步時仍維持優先級去重）
+        deleted_ids += self._delete_superseded_stations(cursor)
+        deleted_count = len(deleted_ids)
+        
+        cursor.execute('DROP TABLE IF EXISTS temp.sync_stage')
+        cursor.execute('DROP TABLE IF EXISTS temp.sync_deleted')
+        
+        # 更新全文檢索索引（與資料變更在同一交易中提交）
+        self.search_index.remove_stations(conn, deleted_ids)
+        self.search_index.index_stations(conn, changed_ids)
+        
+        # Radio Browser 完整同步後，以目錄中最新的變更紀錄作為之後增量同步的起點
+        if 'radio_browser' in full_sync_groups:
+            self._record_radio_browser_full_sync(cursor)
+        
+        # 6. 目錄有變動時推進世代讓 API 回應快取失效（跨來源實體由 sync_stations_to_db 在提交後重新解析）
+        if added_count or updated_count or deleted_count:
+            self._bump_catalog_generation(cursor)
+        
+        # 7. 記錄同步統計
         self.logger.info("📊 資料庫同步完成:")
         self.logger.info(f"   🎯 執行分組: {', '.join(executed_sync_groups.keys())}")
         self.logger.info(f"   🔄 完整同步分組: {', '.join(full_sync_groups)} (包含刪除)")
@@ -681,46 +891,606 @@ class MultiSourceRadioCollector:
             'update_only_groups': list(set(executed_sync_groups.keys()) - full_sync_groups)
         }
 
-    def save_stations_to_db(self, stations_data: Dict):
-        """保存電台到資料庫 - 保留舊方法以兼容性，但建議使用 sync_stations_to_db"""
-        self.logger.info("⚠️ 使用舊版保存方法，建議使用 sync_stations_to_db 進行智能同步")
-        return self.sync_stations_to_db(stations_data)
+    def _stage_stations(self, cursor, stations: List[Dict], executed_sync_groups: Dict = None) -> Dict:
+        """以 executemany 將本次執行分組的電台寫入暫存表 sync_stage，回傳各分組的 (來源, 分類, 子分類)
+        
+        executed_sync_groups 為 None 時暫存全部電台（串流同步的單一批次）。
+        """
+        cursor.execute('DROP TABLE IF EXISTS temp.sync_stage')
+        cursor.execute('''
+            CREATE TEMP TABLE sync_stage (
+                seq INTEGER PRIMARY KEY,
+                sync_key TEXT NOT NULL,
+                uuid TEXT,
+                name TEXT,
+                url TEXT,
+                homepage TEXT,
+                favicon TEXT,
+                tags TEXT,
+                country TEXT,
+                language TEXT,
+                codec TEXT,
+                bitrate INTEGER,
+                source_api TEXT,
+                source_type TEXT,
+                metadata TEXT,
+                source_priority INTEGER,
+                content_hash TEXT,
+                category TEXT,
+                subcategory TEXT,
+                votes INTEGER,
+                clickcount INTEGER,
+                lastcheckok INTEGER,
+                countrycode TEXT,
+                existing_id INTEGER,
+                existing_hash TEXT,
+                name_key TEXT,
+                canonical_url TEXT,
+                skip INTEGER NOT NULL DEFAULT 0   -- 1: 批次內重複（保留最後一筆）、2: uuid 衝突、3: 已有較高優先級來源
+            )
+        ''')
+        
+        rows = []
+        group_scopes = {}
+        for station in stations:
+            sync_key = self.get_sync_key(station)
+            if executed_sync_groups is not None and sync_key not in executed_sync_groups:
+                continue
+            promoted = station_promoted_fields(station)
+            group_scopes.setdefault(sync_key, (station.get('source_api', ''),
+                                               promoted['category'], promoted['subcategory']))
+            rows.append((
+                sync_key,
+                station.get('uuid', ''),
+                station.get('name', ''),
+                station.get('url', ''),
+                station.get('homepage', ''),
+                station.get('favicon', ''),
+                station.get('tags', ''),
+                station.get('country', ''),
+                station.get('language', ''),
+                station.get('codec', ''),
+                station.get('bitrate', 0),
+                station.get('source_api', ''),
+                station.get('source_type', ''),
+                station.get('metadata', '{}'),
+                get_source_priority(station.get('source_api', '')),
+                station_content_hash(station),
+                *promoted.values(),
+                station_name_key(station.get('name', '')),
+                canonical_stream_url(station.get('url', ''))
+            ))
+        
+        cursor.executemany(f'''
+            INSERT INTO sync_stage
+            (sync_key, uuid, name, url, homepage, favicon, tags, country, language,
+             codec, bitrate, source_api, source_type, metadata, source_priority, content_hash,
+             {', '.join(PROMOTED_COLUMNS)}, name_key, canonical_url)
+            VALUES ({', '.join('?' * (18 + len(PROMOTED_COLUMNS)))})
+        ''', rows)
+        
+        cursor.execute('CREATE INDEX temp.idx_sync_stage_key ON sync_stage (name, url, source_api)')
+        cursor.execute('CREATE INDEX temp.idx_sync_stage_group ON sync_stage (sync_key, name, url)')
+        cursor.execute('CREATE INDEX temp.idx_sync_stage_uuid ON sync_stage (uuid)')
+        cursor.execute('CREATE INDEX temp.idx_sync_stage_canonical_url ON sync_stage (canonical_url)')
+        
+        self.logger.info(f"📥 已暫存 {len(rows)} 個電台進行比對")
+        return group_scopes
 
-    def get_stations_summary(self) -> Dict:
-        """獲取電台統計摘要"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def _upsert_staged_stations(self, cursor):
+        """以集合運算比對暫存表與資料庫並寫入變更，回傳 (新增數, 更新數, 變更的電台 id)"""
+        # 批次內相同 (name, url, source_api) 只保留最後一筆
+        cursor.execute('''
+            UPDATE sync_stage SET skip = 1
+            WHERE seq NOT IN (SELECT MAX(seq) FROM sync_stage GROUP BY name, url, source_api)
+        ''')
         
-        # 總數統計
-        cursor.execute('SELECT COUNT(*) FROM radio_stations')
-        total_count = cursor.fetchone()[0]
+        # 對照現有電台（走 UNIQUE(name, url, source_api) 索引）
+        cursor.execute('''
+            UPDATE sync_stage SET (existing_id, existing_hash) = (
+                SELECT id, content_hash FROM radio_stations r
+                WHERE r.name = sync_stage.name AND r.url = sync_stage.url
+                AND r.source_api = sync_stage.source_api
+            )
+            WHERE skip = 0
+        ''')
         
-        # 按來源統計
+        # 資料庫已有較高優先級來源的同一電台（名稱鍵 + 正規化 URL）時略過
         cursor.execute('''
-            SELECT source_api, COUNT(*) 
-            FROM radio_stations 
-            GROUP BY source_api 
-            ORDER BY COUNT(*) DESC
+            UPDATE sync_stage SET skip = 3
+            WHERE skip = 0 AND EXISTS (
+                SELECT 1 FROM radio_stations r
+                WHERE r.canonical_url = sync_stage.canonical_url
+                AND r.source_priority < sync_stage.source_priority
+                AND station_name_key(r.name) = sync_stage.name_key
+            )
         ''')
-        by_source = cursor.fetchall()
+        if cursor.rowcount:
+            self.logger.info(f"🔄 {cursor.rowcount} 個電台已由較高優先級來源提供，已略過")
+        
+        # 新電台的 uuid 已被其他電台使用（或批次內較早的新電台已使用）時略過
+        cursor.execute('''
+            UPDATE sync_stage SET skip = 2
+            WHERE skip = 0 AND existing_id IS NULL AND (
+                EXISTS (SELECT 1 FROM radio_stations r WHERE r.uuid = sync_stage.uuid)
+                OR EXISTS (
+                    SELECT 1 FROM sync_stage earlier
+                    WHERE earlier.uuid = sync_stage.uuid AND earlier.seq < sync_stage.seq
+                    AND earlier.skip != 1 AND earlier.existing_id IS NULL
+                )
+            )
+        ''')
+        conflicts = cursor.execute('SELECT COUNT(*) FROM sync_stage WHERE skip = 2').fetchone()[0]
+        if conflicts:
+            self.logger.warning(f"⚠️ {conflicts} 個電台的 uuid 與其他電台衝突，已略過")
+        
+        cursor.execute('''
+            SELECT
+                COALESCE(SUM(existing_id IS NULL), 0),
+                COALESCE(SUM(existing_id IS NOT NULL AND existing_hash IS NOT content_hash), 0),
+                COALESCE(SUM(existing_id IS NOT NULL AND existing_hash IS content_hash), 0)
+            FROM sync_stage WHERE skip = 0
+        ''')
+        added_count, updated_count, unchanged_count = cursor.fetchone()
+        
+        if added_count or updated_count:
+            promoted = ', '.join(PROMOTED_COLUMNS)
+            promoted_updates = ''.join(f'{column} = excluded.{column},\n' for column in PROMOTED_COLUMNS)
+            # WHERE true 避免 SQLite 將 ON CONFLICT 誤認為 JOIN 條件
+            cursor.execute(f'''
+                INSERT INTO radio_stations
+                (uuid, name, url, homepage, favicon, tags, country, language, codec, bitrate,
+                 source_api, source_type, metadata, source_priority, content_hash, canonical_url, {promoted})
+                SELECT uuid, name, url, homepage, favicon, tags, country, language, codec, bitrate,
+                       source_api, source_type, metadata, source_priority, content_hash, canonical_url, {promoted}
+                FROM sync_stage
+                WHERE true AND skip = 0
+                AND (existing_id IS NULL OR existing_hash IS NOT content_hash)
+                ORDER BY seq
+                ON CONFLICT (name, url, source_api) DO UPDATE SET
+                    homepage = excluded.homepage,
+                    favicon = excluded.favicon,
+                    tags = excluded.tags,
+                    country = excluded.country,
+                    language = excluded.language,
+                    codec = excluded.codec,
+                    bitrate = excluded.bitrate,
+                    source_type = excluded.source_type,
+                    metadata = excluded.metadata,
+                    content_hash = excluded.content_hash,
+                    {promoted_updates}
+                    collection_date = CURRENT_TIMESTAMP
+                WHERE radio_stations.content_hash IS NOT excluded.content_hash
+            ''')
+        
+        cursor.execute('''
+            SELECT r.id FROM sync_stage s
+            JOIN radio_stations r
+              ON r.name = s.name AND r.url = s.url AND r.source_api = s.source_api
+            WHERE s.skip = 0 AND (s.existing_id IS NULL OR s.existing_hash IS NOT s.content_hash)
+        ''')
+        changed_ids = [row[0] for row in cursor.fetchall()]
+        
+        self.logger.info(f"📝 比對結果: 新增 {added_count}、更新 {updated_count}、未變動 {unchanged_count}")
+        return added_count, updated_count, changed_ids
+
+    def _sync_group_condition(self, sync_key: str, group_scopes: Dict):
+        """同步分組在 radio_stations 上的篩選條件 (SQL, 參數)，TuneIn 分組走 (來源, 分類, 子分類) 索引"""
+        if sync_key.startswith('tunein_'):
+            _, category, subcategory = group_scopes[sync_key]
+            return ("source_api = 'tunein' AND category = ? AND subcategory = ?",
+                    [category, subcategory])
+        return 'source_api = ?', [sync_key]
+
+    def _reset_deleted_table(self, cursor):
+        """建立（清空）暫存表 sync_deleted，記錄本交易刪除的電台 id"""
+        cursor.execute('DROP TABLE IF EXISTS temp.sync_deleted')
+        cursor.execute('CREATE TEMP TABLE sync_deleted (id INTEGER PRIMARY KEY, sync_key TEXT)')
+
+    def _delete_missing_stations(self, cursor, full_sync_groups, group_scopes: Dict, run_id: str = None) -> List[int]:
+        """刪除完整同步分組中、本次收集沒有出現的電台，回傳被刪除的 id
+        
+        一般同步比對暫存表 sync_stage；串流同步（指定 run_id）比對 sync_seen 中本輪的紀錄。
+        """
+        self._reset_deleted_table(cursor)
+        
+        if run_id is None:
+            seen_sql = 'SELECT 1 FROM sync_stage s WHERE s.sync_key = ?'
+            seen_params = []
+        else:
+            seen_sql = 'SELECT 1 FROM sync_seen s WHERE s.run_id = ? AND s.sync_key = ?'
+            seen_params = [run_id]
+        
+        for sync_key in full_sync_groups:
+            condition, params = self._sync_group_condition(sync_key, group_scopes)
+            cursor.execute(f'''
+                INSERT INTO sync_deleted (id, sync_key)
+                SELECT id, ? FROM radio_stations
+                WHERE {condition}
+                AND NOT EXISTS (
+                    {seen_sql} AND s.name = radio_stations.name AND s.url = radio_stations.url
+                )
+            ''', [sync_key] + params + seen_params + [sync_key])
+            if cursor.rowcount:
+                self.logger.info(f"🗑️ {sync_key}: 刪除 {cursor.rowcount} 個消失的電台")
+        
+        cursor.execute('SELECT id FROM sync_deleted')
+        deleted_ids = [row[0] for row in cursor.fetchall()]
+        if deleted_ids:
+            cursor.execute('DELETE FROM radio_stations WHERE id IN (SELECT id FROM sync_deleted)')
+        return deleted_ids
+
+    def _delete_superseded_stations(self, cursor) -> List[int]:
+        """刪除與本次暫存電台同一電台（名稱鍵 + 正規化 URL）、但來源優先級較低的既有電台，回傳被刪除的 id"""
+        cursor.execute('''
+            INSERT OR IGNORE INTO sync_deleted (id, sync_key)
+            SELECT r.id, 'superseded' FROM radio_stations r
+            WHERE r.canonical_url IN (SELECT canonical_url FROM sync_stage)
+            AND EXISTS (
+                SELECT 1 FROM radio_stations w
+                WHERE w.canonical_url = r.canonical_url AND w.source_priority < r.source_priority
+                AND station_name_key(w.name) = station_name_key(r.name)
+            )
+        ''')
+        if not cursor.rowcount:
+            return []
+        
+        self.logger.info(f"🗑️ 刪除 {cursor.rowcount} 個已由較高優先級來源取代的電台")
+        cursor.execute("SELECT id FROM sync_deleted WHERE sync_key = 'superseded'")
+        superseded_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute("DELETE FROM radio_stations WHERE id IN (SELECT id FROM sync_deleted WHERE sync_key = 'superseded')")
+        return superseded_ids
+
+    def begin_sync_run(self, run_id: str):
+        """串流同步開始：登記本輪，並清除已中斷輪次（心跳過期或未登記）留下的 sync_seen 紀錄
+        
+        其他進行中的輪次（例如另一個程序的同步）心跳未過期，其紀錄保留不動。
+        """
+        now = time.time()
+        with self.db.writer() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM sync_runs WHERE heartbeat_at < ?', (now - SYNC_RUN_STALE_SECONDS,))
+            cursor.execute('DELETE FROM sync_seen WHERE run_id NOT IN (SELECT run_id FROM sync_runs)')
+            if cursor.rowcount:
+                self.logger.info(f"🧹 清除已中斷的同步輪次留下的 {cursor.rowcount} 筆紀錄")
+            cursor.execute('INSERT OR REPLACE INTO sync_runs (run_id, started_at, heartbeat_at) VALUES (?, ?, ?)',
+                           (run_id, now, now))
+
+    def end_sync_run(self, run_id: str):
+        """串流同步結束（含失敗）：清除本輪剩餘的 sync_seen 紀錄並取消登記"""
+        with self.db.writer() as conn:
+            conn.execute('DELETE FROM sync_seen WHERE run_id = ?', (run_id,))
+            conn.execute('DELETE FROM sync_runs WHERE run_id = ?', (run_id,))
+
+    def sync_station_batch(self, run_id: str, stations: List[Dict]) -> Dict:
+        """串流同步：寫入一批電台並提交（只新增/更新與跨來源優先級處理，不刪除消失的電台）
+        
+        已寫入的電台記錄在 sync_seen，待來源完成後由 finish_source_sync 進行刪除；
+        中途失敗時已提交的批次會保留下來。
+        """
+        with self.db.writer() as conn:
+            cursor = conn.cursor()
+            group_scopes = self._stage_stations(cursor, stations)
+            added_count, updated_count, changed_ids = self._upsert_staged_stations(cursor)
+            
+            self._reset_deleted_table(cursor)
+            deleted_ids = self._delete_superseded_stations(cursor)
+            
+            cursor.execute('''
+                INSERT OR IGNORE INTO sync_seen (run_id, sync_key, name, url)
+                SELECT ?, sync_key, name, url FROM sync_stage
+            ''', (run_id,))
+            cursor.execute('UPDATE sync_runs SET heartbeat_at = ? WHERE run_id = ?', (time.time(), run_id))
+            
+            cursor.execute('DROP TABLE IF EXISTS temp.sync_stage')
+            cursor.execute('DROP TABLE IF EXISTS temp.sync_deleted')
+            
+            self.search_index.remove_stations(conn, deleted_ids)
+            self.search_index.index_stations(conn, changed_ids)
+            if added_count or updated_count or deleted_ids:
+                self._generation_dirty = True
+            # 每批都推進世代會讓長時間爬取期間的快取與快照不斷失效，限制為每 GENERATION_BUMP_INTERVAL 秒一次
+            if self._generation_dirty and (self._last_generation_bump is None or
+                                           time.monotonic() - self._last_generation_bump >= GENERATION_BUMP_INTERVAL):
+                self._bump_catalog_generation(cursor)
+        
+        return {
+            'added': added_count,
+            'updated': updated_count,
+            'deleted': len(deleted_ids),
+            'group_scopes': group_scopes
+        }
+
+    def finish_source_sync(self, run_id: str, source_api: str, group_scopes: Dict, totals: Dict,
+                           duration: float, delete_missing: bool = True) -> Dict:
+        """串流同步：來源完成後刪除其完整同步分組中本輪沒有出現的電台，並記錄同步統計
+        
+        totals 為該來源各批次累計的新增/更新/刪除數；delete_missing 為 False 時
+        （來源逾時、失敗或有批次寫入失敗）只清理本輪紀錄，保留資料庫中的電台。
+        """
+        source_groups = {sync_key: scope for sync_key, scope in group_scopes.items()
+                         if self._sync_group_belongs_to(source_api, sync_key)}
+        full_sync_groups = {sync_key for sync_key in source_groups if self._needs_full_sync(sync_key)}
+        
+        with self.db.writer() as conn:
+            cursor = conn.cursor()
+            deleted_ids = []
+            if delete_missing and full_sync_groups:
+                deleted_ids = self._delete_missing_stations(cursor, full_sync_groups, source_groups, run_id=run_id)
+                cursor.execute('DROP TABLE IF EXISTS temp.sync_deleted')
+                self.search_index.remove_stations(conn, deleted_ids)
+                if 'radio_browser' in full_sync_groups:
+                    self._record_radio_browser_full_sync(cursor)
+            
+            # 清理本輪該來源的紀錄（其他輪次的紀錄由 begin_sync_run 依心跳清理）
+            cursor.executemany('DELETE FROM sync_seen WHERE run_id = ? AND sync_key = ?',
+                               [(run_id, sync_key) for sync_key in source_groups])
+            
+            # 來源完成時推進一次世代，涵蓋刪除與批次寫入後尚未推進的變動
+            if deleted_ids or self._generation_dirty:
+                self._bump_catalog_generation(cursor)
+            
+            result = {
+                'added': totals.get('added', 0),
+                'updated': totals.get('updated', 0),
+                'deleted': totals.get('deleted', 0) + len(deleted_ids),
+                'executed_sync_groups': list(source_groups),
+                'full_sync_groups': list(full_sync_groups) if delete_missing else [],
+                'update_only_groups': list(set(source_groups) - full_sync_groups) if delete_missing else list(source_groups)
+            }
+            result['total_operations'] = result['added'] + result['updated'] + result['deleted']
+            self._record_sync_stats(conn, result, duration)
+        
+        if deleted_ids:
+            self.logger.info(f"🗑️ {source_api}: 刪除 {len(deleted_ids)} 個消失的電台")
+        return result
+
+    def resolve_entities(self, max_attempts: int = 3) -> Dict:
+        """對整個目錄重新解析跨來源實體，有變動時推進世代
+
+        分群在唯讀連線上計算，只有寫回變動時才取得寫入連線；計算期間目錄世代被其他行程推進時
+        （分群可能已過時）重新計算，超過 max_attempts 次則放棄本次寫回，由下一次同步補上。
+        """
+        with self._serialized_sync('實體解析'):
+            for _ in range(max_attempts):
+                with self.db.reader() as conn:
+                    generation = self._stored_generation(conn)
+                    changes, entity_stats = self.entity_resolver.plan(conn)
+                if not changes:
+                    break
+                with self.db.writer() as conn:
+                    if self._stored_generation(conn) == generation:
+                        self.entity_resolver.apply(conn, changes)
+                        self._bump_catalog_generation(conn.cursor())
+                        break
+                self.logger.info("⏳ 實體解析期間目錄已變動，重新計算...")
+            else:
+                self.logger.warning(f"⚠️ 目錄持續變動，略過本次實體解析寫回（已嘗試 {max_attempts} 次）")
+                entity_stats['changed'] = 0
+        self.logger.info(f"🔗 實體解析完成: {entity_stats['stations']} 個電台 → {entity_stats['entities']} 個實體"
+                         f"（候選配對 {entity_stats['candidate_pairs']}，略過 {entity_stats['skipped_pairs']}，"
+                         f"更新 {entity_stats['changed']} 個電台）")
+        return entity_stats
+
+    @staticmethod
+    def _stored_generation(conn: sqlite3.Connection) -> int:
+        """資料庫中的目錄世代"""
+        row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'generation'").fetchone()
+        return int(row[0]) if row else 0
+
+    def sync_radio_browser_changes(self, full_sync_interval: float = RADIO_BROWSER_FULL_SYNC_INTERVAL,
+                                   page_size: int = 1000, max_changes: int = RADIO_BROWSER_MAX_CHANGES) -> Dict:
+        """Radio Browser 增量同步：只套用上次同步後的變更紀錄（/json/stations/changed）
+        
+        沒有變更進度、距上次完整同步超過 full_sync_interval，或變更超過 max_changes 筆時，
+        改以串流管線完整同步 Radio Browser（包括刪除消失的電台）。
+        其他同步工作進行中時略過本次（mode 為 skipped），由下一次排程補上。
+        """
+        lock = self.sync_lock()
+        if not lock.acquire(blocking=False):
+            self.logger.info("⏭️ 另一個同步工作進行中，略過本次 Radio Browser 增量同步")
+            return {'mode': 'skipped', 'success': True, 'reason': 'sync_in_progress', 'total_operations': 0}
+        try:
+            return self._sync_radio_browser_changes(full_sync_interval, page_size, max_changes)
+        finally:
+            lock.release()
+
+    def _sync_radio_browser_changes(self, full_sync_interval: float, page_size: int, max_changes: int) -> Dict:
+        start_time = time.perf_counter()
+        with self.db.reader() as conn:
+            state = self._load_radio_browser_state(conn)
+        
+        lastchangeuuid = state.get('lastchangeuuid')
+        if not lastchangeuuid:
+            return self._full_radio_browser_sync('尚無變更進度')
+        last_full_sync = state.get('last_full_sync')
+        if not last_full_sync or \
+                (datetime.now() - datetime.fromisoformat(last_full_sync)).total_seconds() >= full_sync_interval:
+            return self._full_radio_browser_sync('定期完整校正')
+        
+        # 同一電台的多筆變更只保留最新的一筆
+        collector = RadioBrowserCollector()
+        latest_changes = {}
+        change_count = 0
+        try:
+            for change in collector.iter_changes(lastchangeuuid, page_size=page_size, max_changes=max_changes + 1):
+                change_count += 1
+                if change.get('stationuuid'):
+                    latest_changes.pop(change['stationuuid'], None)
+                    latest_changes[change['stationuuid']] = change
+                lastchangeuuid = change.get('changeuuid') or lastchangeuuid
+        except Exception as e:
+            self.logger.error(f"❌ Radio Browser 變更紀錄取得失敗，保留資料庫中的資料: {e}")
+            return {'mode': 'incremental', 'success': False, 'error': str(e)}
+        
+        if change_count > max_changes:
+            return self._full_radio_browser_sync(f'變更超過 {max_changes} 筆')
+        
+        upserts, deleted_uuids = self._classify_radio_browser_changes(collector, latest_changes)
+        
+        with self.db.writer() as conn:
+            added_count, updated_count, deleted_count = self._apply_station_deltas(conn, upserts, deleted_uuids)
+            state.update(lastchangeuuid=lastchangeuuid, updated_at=datetime.now().isoformat())
+            self._save_radio_browser_state(conn.cursor(), state)
+            
+            result = {
+                'added': added_count,
+                'updated': updated_count,
+                'deleted': deleted_count,
+                'total_operations': added_count + updated_count + deleted_count,
+                'executed_sync_groups': ['radio_browser'],
+                'full_sync_groups': [],
+                'update_only_groups': ['radio_browser']
+            }
+            self._record_sync_stats(conn, result, time.perf_counter() - start_time)
+        
+        self.logger.info(f"🔁 Radio Browser 增量同步: {change_count} 筆變更（{len(latest_changes)} 個電台）→ "
+                         f"新增 {added_count}、更新 {updated_count}、刪除 {deleted_count}")
+        if result['total_operations']:
+            result['entity_stats'] = self.resolve_entities()
+        result.update(mode='incremental', success=True, changes=change_count)
+        return result
+
+    def _full_radio_browser_sync(self, reason: str) -> Dict:
+        """以串流管線完整同步 Radio Browser（完成後由 finish_source_sync 記錄新的變更進度）"""
+        self.logger.info(f"🌐 Radio Browser 完整同步（{reason}）")
+        from station_pipeline import StationPipeline
+        pipeline = StationPipeline(self, source_deadlines=SOURCE_DEADLINES)
+        result = pipeline.run(['radio_browser'], {}, 'none')
+        result['mode'] = 'full'
+        result['success'] = result['stats'].get('radio_browser', {}).get('success', False)
+        return result
+
+    def _classify_radio_browser_changes(self, collector: RadioBrowserCollector, latest_changes: Dict):
+        """依變更後的國家/語言/標籤判斷電台是否仍在收集範圍，回傳 (要新增/更新的電台, 要刪除的 uuid)
         
-        # 按國家統計
+        既有電台仍符合原分類時維持原分類；只保留前幾名的分類（bytag）無法由單筆變更判斷名次，
+        不因此新增電台，留待完整同步。
+        """
+        with self.db.reader() as conn:
+            existing = dict(conn.execute('''
+                SELECT uuid, category FROM radio_stations
+                WHERE source_api = 'radio_browser' AND uuid IN (SELECT value FROM json_each(?))
+            ''', (json.dumps(list(latest_changes)),)).fetchall())
+        
+        upserts = []
+        deleted_uuids = []
+        for uuid, change in latest_changes.items():
+            categories = collector.match_categories(change)
+            if existing.get(uuid) in categories:
+                category = existing[uuid]
+            else:
+                category = next((c for c in categories if collector.category_limit(c) is None), None)
+            station = collector.create_station(change, category) if category else None
+            if station:
+                upserts.append(station)
+            elif uuid in existing:
+                deleted_uuids.append(uuid)
+        return upserts, deleted_uuids
+
+    def _apply_station_deltas(self, conn: sqlite3.Connection, stations: List[Dict], deleted_uuids: List[str]):
+        """在寫入交易中套用增量變更（新增/更新 stations、刪除 deleted_uuids），回傳 (新增數, 更新數, 刪除數)"""
+        cursor = conn.cursor()
+        self._reset_deleted_table(cursor)
+        cursor.executemany('''
+            INSERT OR IGNORE INTO sync_deleted (id, sync_key)
+            SELECT id, 'removed' FROM radio_stations WHERE uuid = ?
+        ''', [(uuid,) for uuid in deleted_uuids])
+        
+        self._stage_stations(cursor, stations)
+        # 名稱或串流 URL 改變的電台：先移除舊資料列，新資料列才不會因 uuid 衝突被略過
         cursor.execute('''
-            SELECT country, COUNT(*) 
-            FROM radio_stations 
-            WHERE country != '' 
-            GROUP BY country 
-            ORDER BY COUNT(*) DESC 
-            LIMIT 10
+            INSERT OR IGNORE INTO sync_deleted (id, sync_key)
+            SELECT r.id, 'replaced' FROM sync_stage s
+            JOIN radio_stations r ON r.uuid = s.uuid
+            WHERE r.source_api = s.source_api AND (r.name != s.name OR r.url != s.url)
         ''')
-        by_country = cursor.fetchall()
+        cursor.execute("SELECT r.uuid FROM sync_deleted d JOIN radio_stations r ON r.id = d.id WHERE d.sync_key = 'replaced'")
+        replaced_uuids = [row[0] for row in cursor.fetchall()]
+        cursor.execute('SELECT id FROM sync_deleted')
+        deleted_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute('DELETE FROM radio_stations WHERE id IN (SELECT id FROM sync_deleted)')
+        
+        added_count, updated_count, changed_ids = self._upsert_staged_stations(cursor)
+        # 以新資料列取代的電台計為更新（新資料列因優先級被略過時仍計為刪除）
+        replaced_count = cursor.execute('''
+            SELECT COUNT(*) FROM radio_stations WHERE uuid IN (SELECT value FROM json_each(?))
+        ''', (json.dumps(replaced_uuids),)).fetchone()[0]
+        deleted_ids += self._delete_superseded_stations(cursor)
         
-        conn.close()
+        cursor.execute('DROP TABLE IF EXISTS temp.sync_stage')
+        cursor.execute('DROP TABLE IF EXISTS temp.sync_deleted')
+        
+        self.search_index.remove_stations(conn, deleted_ids)
+        self.search_index.index_stations(conn, changed_ids)
+        if added_count or updated_count or deleted_ids:
+            self._bump_catalog_generation(cursor)
+        return added_count - replaced_count, updated_count + replaced_count, len(deleted_ids) - replaced_count
+
+    def _load_radio_browser_state(self, conn: sqlite3.Connection) -> Dict:
+        """讀取 Radio Browser 增量同步進度 {lastchangeuuid, last_full_sync, updated_at}"""
+        row = conn.execute('SELECT value FROM catalog_meta WHERE key = ?', (RADIO_BROWSER_CHANGES_KEY,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else {}
+
+    def _save_radio_browser_state(self, cursor, state: Dict):
+        cursor.execute('''
+            INSERT INTO catalog_meta (key, value) VALUES (?, ?)
+            ON CONFLICT (key) DO UPDATE SET value = excluded.value
+        ''', (RADIO_BROWSER_CHANGES_KEY, json.dumps(state)))
+
+    def _record_radio_browser_full_sync(self, cursor):
+        """完整同步後記錄變更進度：目錄中最後變更的 Radio Browser 電台之 changeuuid"""
+        cursor.execute('''
+            SELECT json_extract(metadata, '$.changeuuid') FROM radio_stations
+            WHERE source_api = 'radio_browser'
+            AND json_extract(metadata, '$.lastchangetime') > ''
+            AND json_extract(metadata, '$.changeuuid') > ''
+            ORDER BY json_extract(metadata, '$.lastchangetime') DESC
+            LIMIT 1
+        ''')
+        row = cursor.fetchone()
+        now = datetime.now().isoformat()
+        self._save_radio_browser_state(cursor, {
+            'lastchangeuuid': row[0] if row else None,
+            'last_full_sync': now,
+            'updated_at': now
+        })
+
+    def _bump_catalog_generation(self, cursor):
+        """推進目錄世代計數器（須在同步交易內呼叫），交易提交後發布到記憶體中的世代"""
+        row = cursor.execute('''
+            UPDATE catalog_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'
+            RETURNING value
+        ''').fetchone()
+        if row is not None:
+            generation = int(row[0])
+            self.db.after_commit(lambda: self._generation_published(generation))
+
+    def _generation_published(self, generation: int):
+        """世代推進的交易提交後：發布到記憶體並重設串流同步的推進計時"""
+        self._generation_dirty = False
+        self._last_generation_bump = time.monotonic()
+        self.db.publish_generation(generation)
+
+    def save_stations_to_db(self, stations_data: Dict):
+        """保存電台到資料庫 - 保留舊方法以兼容性，但建議使用 sync_stations_to_db"""
+        self.logger.info("⚠️ 使用舊版保存方法，建議使用 sync_stations_to_db 進行智能同步")
+        return self.sync_stations_to_db(stations_data)
+
+    def get_stations_summary(self) -> Dict:
+        """獲取電台統計摘要"""
+        with self.db.reader() as conn:
+            cursor = conn.cursor()
+            
+            # 由統計摘要表讀取，無需掃描 radio_stations
+            total_count = self.stats_tables.get_total(cursor)
+            by_source = self.stats_tables.get_breakdown(cursor, 'source')
+            by_country = self.stats_tables.get_breakdown(cursor, 'country', limit=10, skip_empty=True)
         
         return {
             'total_stations': total_count,
-            'by_source': dict(by_source),
-            'by_country': dict(by_country),
+            'by_source': by_source,
+            'by_country': by_country,
             'summary_time': datetime.now().isoformat()
         }
 
@@ -733,8 +1503,8 @@ def main():
     print("🎵 多源電台收集器 - 簡化版")
     print("=" * 50)
     
-    # 一鍵收集所有電台
-    result = collector.collect_all_stations()
+    # 一鍵收集所有電台（各來源完成後即同步到資料庫）
+    result = collector.collect_all_stations(commit_incrementally=True)
     
     # 顯示本次收集統計
     print("\n📊 本次收集統計:")
@@ -749,9 +1519,9 @@ def main():
         else:
             print(f"   {source}: {stats['stations_found']} 個")
     
-    # 智能同步到資料庫
-    if result['total_unique'] > 0 or any(not stats.get('skipped', False) for stats in result['stats'].values()):
-        sync_result = collector.sync_stations_to_db(result)
+    # 各來源的智能同步結果
+    if result['sync_results']:
+        sync_result = result['sync_result']
         
         print(f"\n🔄 資料庫同步結果:")
         print(f"   🎯 執行分組: {', '.join(sync_result.get('executed_sync_groups', []))}")
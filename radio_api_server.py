@@ -5,19 +5,66 @@
 整合現有收集器模組
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
-import sqlite3
 import json
 import logging
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from datetime import datetime
+from typing import List, Dict, Tuple
 import threading
 import time
+import base64
+import zlib
 import schedule
 
+from radio_database import RadioDatabase
+from station_search import StationSearchIndex, build_match_query
+from response_cache import ResponseCache
+from station_stats import StationStatsTables
+from catalog_snapshot import CatalogSnapshotManager
+from station_serializer import (COLLAPSED_FIELDS, DEFAULT_FIELDS, EXPORT_FIELDS, StationSerializer,
+                                encode_payload, parse_fields)
+from api_metrics import ApiMetrics
+
+def encode_cursor(sort_key) -> str:
+    """將排序鍵 (來源優先級, 名稱, id) 編碼為不透明的分頁游標"""
+    raw = json.dumps(list(sort_key), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """解碼分頁游標，格式錯誤時拋出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        priority, name, station_id = json.loads(raw.decode('utf-8'))
+        return int(priority), str(name), int(station_id)
+    except (ValueError, TypeError, UnicodeDecodeError) as e:
+        raise ValueError(f'無效的分頁游標: {cursor}') from e
+
+
+def check_pagination(page: int, limit: int):
+    """page 與 limit 須為正整數，否則拋出 ValueError"""
+    if page < 1:
+        raise ValueError(f'page 參數必須為正整數: {page}')
+    if limit < 1:
+        raise ValueError(f'limit 參數必須為正整數: {limit}')
+
+
+def parse_pagination(args, default_limit: int, max_limit: int = 200) -> Tuple[int, int]:
+    """解析查詢參數中的 page 與 limit（limit 超過 max_limit 時取上限），格式錯誤時拋出 ValueError"""
+    values = []
+    for name, default in (('page', 1), ('limit', default_limit)):
+        raw = args.get(name, default)
+        try:
+            values.append(int(raw))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f'{name} 參數必須為正整數: {raw}') from e
+    page, limit = values
+    check_pagination(page, limit)
+    return page, min(limit, max_limit)
+
 class RadioAPI:
-    def __init__(self, db_path: str = "expanded_radio_stations.db"):
+    def __init__(self, db_path: str = "expanded_radio_stations.db", enable_scheduler: bool = True):
         self.db_path = db_path
         self.app = Flask(__name__)
         CORS(self.app)
@@ -29,15 +76,43 @@ class RadioAPI:
         )
         self.logger = logging.getLogger(__name__)
         
-        # 註冊路由
+        # 資料庫連線管理（唯讀連線池 + 單一寫入連線）
+        self.db = RadioDatabase(db_path)
+        self.search_index = StationSearchIndex()
+        self.stats_tables = StationStatsTables()
+        
+        # 回應快取（以目錄世代失效）與總數快取（count=cached 時使用）
+        self.response_cache = ResponseCache()
+        self._count_cache = {}
+        self._count_cache_lock = threading.Lock()
+        
+        # 監控指標（路由延遲、SQL 耗時、慢查詢）
+        self.metrics = ApiMetrics()
+        
+        # 確保資料庫結構（含全文檢索索引）為最新版本
+        self.init_database()
+        
+        # 記憶體目錄快照（背景載入，同步後重建並原子替換）
+        self.snapshots = CatalogSnapshotManager(self.db)
+        self.snapshots.refresh_async()
+        
+        # 註冊路由與監控掛鉤
+        self.register_metrics_hooks()
         self.register_routes()
         
-        # 設定定時任務
-        self.setup_scheduler()
+        # 設定定時任務（基準測試等嵌入使用時可關閉）
+        if enable_scheduler:
+            self.setup_scheduler()
+
+    def init_database(self):
+        """初始化/升級資料庫結構（由收集器統一管理資料表定義）"""
+        from multi_source_radio_collector import MultiSourceRadioCollector
+        MultiSourceRadioCollector(self.db_path, db=self.db)
 
     def setup_scheduler(self):
-        """設定定時任務 - 每日早上8點更新電台"""
+        """設定定時任務 - 每日早上8點更新電台，每小時增量同步 Radio Browser 的變更"""
         schedule.every().day.at("08:00").do(self.update_stations_background)
+        schedule.every().hour.at(":30").do(self.sync_radio_browser_changes_background)
         
         # 在背景執行排程器
         def run_scheduler():
@@ -47,7 +122,24 @@ class RadioAPI:
         
         scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
         scheduler_thread.start()
-        self.logger.info("⏰ 定時任務已設定：每日早上8點自動更新電台")
+        self.logger.info("⏰ 定時任務已設定：每日早上8點自動更新電台，每小時同步 Radio Browser 變更")
+
+    def register_metrics_hooks(self):
+        """在每個請求前後記錄路由、狀態碼與延遲"""
+        
+        @self.app.before_request
+        def start_request_timer():
+            g.request_start = time.perf_counter()
+        
+        @self.app.after_request
+        def record_request_metrics(response):
+            start = g.get('request_start')
+            if start is not None:
+                # 以路由規則（而非實際路徑）分組，避免標籤數量無限增長
+                route = request.url_rule.rule if request.url_rule else 'unmatched'
+                self.metrics.record_request(route, request.method, response.status_code,
+                                            time.perf_counter() - start)
+            return response
 
     def register_routes(self):
         """註冊所有API路由"""
@@ -55,29 +147,47 @@ class RadioAPI:
         @self.app.route('/api/stations', methods=['GET'])
         def get_stations():
             """獲取電台列表（支援篩選和分頁）"""
-            try:
+            def build_payload():
                 # 獲取查詢參數
                 country = request.args.get('country', '')
                 language = request.args.get('language', '')
                 search = request.args.get('search', '')
-                page = int(request.args.get('page', 1))
-                limit = min(int(request.args.get('limit', 50)), 200)
+                page, limit = parse_pagination(request.args, default_limit=50)
+                cursor = request.args.get('cursor', '')
+                count = request.args.get('count', 'exact')
+                if count not in ('exact', 'cached', 'none'):
+                    raise ValueError(f'count 參數必須為 exact、cached 或 none: {count}')
+                collapse = request.args.get('collapse', '0') != '0'
+                fields = parse_fields(request.args.get('fields', ''),
+                                      allowed=COLLAPSED_FIELDS if collapse else DEFAULT_FIELDS)
                 
                 stations = self.get_filtered_stations(
                     country=country,
                     language=language,
                     search=search,
                     page=page,
-                    limit=limit
+                    limit=limit,
+                    cursor=cursor,
+                    count=count,
+                    fields=fields,
+                    collapse=collapse
                 )
                 
-                return jsonify({
+                return {
                     'success': True,
                     'stations': stations['data'],
                     'pagination': stations['pagination'],
                     'timestamp': datetime.now().isoformat()
-                })
+                }
+            
+            try:
+                return self.cached_json_response(build_payload)
                 
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
             except Exception as e:
                 self.logger.error(f"獲取電台列表失敗: {e}")
                 return jsonify({
@@ -85,6 +195,52 @@ class RadioAPI:
                     'error': str(e)
                 }), 500
 
+        @self.app.route('/api/stations/export', methods=['GET'])
+        def export_stations():
+            """串流匯出全部（或篩選後）電台，格式為 NDJSON 或 JSON 陣列"""
+            try:
+                export_format = request.args.get('format', 'ndjson')
+                if export_format not in ('ndjson', 'json'):
+                    raise ValueError(f'format 參數必須為 ndjson 或 json: {export_format}')
+                
+                since = request.args.get('since', '').strip()
+                if since:
+                    # 統一為資料庫中 collection_date 的格式
+                    since = datetime.fromisoformat(since).strftime('%Y-%m-%d %H:%M:%S')
+                
+                chunks = self.export_stations_stream(
+                    export_format=export_format,
+                    country=request.args.get('country', ''),
+                    language=request.args.get('language', ''),
+                    search=request.args.get('search', ''),
+                    since=since,
+                    fields=parse_fields(request.args.get('fields', ''), allowed=EXPORT_FIELDS)
+                )
+                
+                use_gzip = (request.args.get('gzip', '1') != '0'
+                            and 'gzip' in request.headers.get('Accept-Encoding', ''))
+                if use_gzip:
+                    chunks = self._gzip_stream(chunks)
+                
+                mimetype = 'application/x-ndjson' if export_format == 'ndjson' else 'application/json'
+                response = Response(chunks, mimetype=mimetype)
+                if use_gzip:
+                    response.headers['Content-Encoding'] = 'gzip'
+                response.headers['Vary'] = 'Accept-Encoding'
+                return response
+                
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+            except Exception as e:
+                self.logger.error(f"匯出電台失敗: {e}")
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+
         @self.app.route('/api/stations/search', methods=['GET'])
         def search_stations():
             """搜尋電台"""
@@ -96,15 +252,30 @@ class RadioAPI:
                         'error': '搜尋關鍵字不能為空'
                     }), 400
                 
-                results = self.search_stations_by_query(query)
+                def build_payload():
+                    page, limit = parse_pagination(request.args, default_limit=100)
+                    collapse = request.args.get('collapse', '0') != '0'
+                    fields = parse_fields(request.args.get('fields', ''),
+                                          allowed=COLLAPSED_FIELDS if collapse else DEFAULT_FIELDS)
+                    
+                    results = self.search_stations_by_query(query, page=page, limit=limit,
+                                                            fields=fields, collapse=collapse)
+                    
+                    return {
+                        'success': True,
+                        'query': query,
+                        'results': results['data'],
+                        'total_found': results['pagination']['total'],
+                        'pagination': results['pagination']
+                    }
                 
-                return jsonify({
-                    'success': True,
-                    'query': query,
-                    'results': results,
-                    'total_found': len(results)
-                })
+                return self.cached_json_response(build_payload)
                 
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
             except Exception as e:
                 self.logger.error(f"搜尋電台失敗: {e}")
                 return jsonify({
@@ -116,10 +287,9 @@ class RadioAPI:
         def get_featured_stations():
             """獲取精選電台"""
             try:
-                featured = self.get_featured_stations()
-                return jsonify({
+                return self.cached_json_response(lambda: {
                     'success': True,
-                    'featured_stations': featured
+                    'featured_stations': self.get_featured_stations()
                 })
             except Exception as e:
                 return jsonify({
@@ -131,10 +301,9 @@ class RadioAPI:
         def get_stats():
             """獲取電台統計資訊"""
             try:
-                stats = self.get_database_stats()
-                return jsonify({
+                return self.cached_json_response(lambda: {
                     'success': True,
-                    'statistics': stats
+                    'statistics': self.get_database_stats()
                 })
             except Exception as e:
                 return jsonify({
@@ -157,15 +326,22 @@ class RadioAPI:
                     'error': str(e)
                 }), 500
 
+        @self.app.route('/api/metrics', methods=['GET'])
+        def get_metrics():
+            """Prometheus 格式的監控指標"""
+            try:
+                body = self.metrics.render_prometheus(self.collect_metric_gauges())
+                return Response(body, mimetype='text/plain; version=0.0.4')
+            except Exception as e:
+                self.logger.error(f"輸出監控指標失敗: {e}")
+                return Response(f'# error: {e}\n', status=500, mimetype='text/plain')
+
         @self.app.route('/api/health', methods=['GET'])
         def health_check():
             """健康檢查"""
             try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute('SELECT COUNT(*) FROM radio_stations')
-                count = cursor.fetchone()[0]
-                conn.close()
+                with self.db.reader() as conn:
+                    count = self.stats_tables.get_total(conn.cursor())
                 
                 return jsonify({
                     'success': True,
@@ -179,11 +355,112 @@ class RadioAPI:
                     'error': str(e)
                 }), 500
 
-    def get_filtered_stations(self, country='', language='', search='', page=1, limit=50):
-        """獲取篩選後的電台列表"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def get_catalog_generation(self) -> int:
+        """目前的目錄世代（每次同步有資料變動時遞增；本程序的寫入提交後即發布，
+        其他程序的同步在 RadioDatabase.generation_ttl 秒內反映）"""
+        return self.db.catalog_generation
+
+    def collect_metric_gauges(self) -> List:
+        """目錄、快取與最近一次同步的狀態指標"""
+        with self.db.reader() as conn:
+            cursor = conn.cursor()
+            meta = dict(cursor.execute(
+                "SELECT key, value FROM catalog_meta WHERE key = 'last_sync'"
+            ).fetchall())
+            total = self.stats_tables.get_total(cursor)
+        
+        gauges = [
+            ('radio_catalog_generation', '目錄世代', {}, self.get_catalog_generation()),
+            ('radio_catalog_stations', '電台總數', {}, total),
+        ]
+        
+        snapshot = self.snapshots.current
+        if snapshot is not None:
+            gauges.append(('radio_catalog_snapshot_generation', '記憶體快照的世代', {}, snapshot.generation))
+            gauges.append(('radio_catalog_snapshot_stations', '記憶體快照的電台數', {}, len(snapshot)))
+        
+        cache_stats = self.response_cache.get_stats()
+        gauges.append(('radio_api_response_cache_entries', '回應快取項目數', {}, cache_stats['entries']))
+        gauges.append(('radio_api_response_cache_lookups_total', '回應快取查詢次數', {'result': 'hit'},
+                       cache_stats['hits']))
+        gauges.append(('radio_api_response_cache_lookups_total', '回應快取查詢次數', {'result': 'miss'},
+                       cache_stats['misses']))
         
+        if meta.get('last_sync'):
+            last_sync = json.loads(meta['last_sync'])
+            gauges.append(('radio_sync_last_duration_seconds', '最近一次同步耗時（秒）', {},
+                           last_sync.get('duration_seconds', 0)))
+            gauges.append(('radio_sync_last_finished_timestamp', '最近一次同步完成時間（Unix 秒）', {},
+                           datetime.fromisoformat(last_sync['finished_at']).timestamp()))
+            for operation in ('added', 'updated', 'deleted'):
+                gauges.append(('radio_sync_last_rows', '最近一次同步異動的電台數', {'operation': operation},
+                               last_sync.get(operation, 0)))
+        
+        return gauges
+
+    def cached_json_response(self, build_payload) -> Response:
+        """以「目錄世代 + 正規化查詢」快取 JSON 回應，並支援 ETag / If-None-Match → 304"""
+        generation = self.get_catalog_generation()
+        key = (request.path, tuple(sorted(
+            (name, value.strip()) for name, value in request.args.items(multi=True) if value.strip()
+        )))
+        
+        entry = self.response_cache.get_or_compute(
+            generation, key, lambda: encode_payload(build_payload())
+        )
+        
+        if request.if_none_match.contains(entry.etag):
+            response = Response(status=304)
+        else:
+            response = Response(entry.body, mimetype='application/json')
+        response.set_etag(entry.etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    def get_filtered_stations(self, country='', language='', search='', page=1, limit=50,
+                              cursor='', count='exact', fields=None, collapse=False):
+        """獲取篩選後的電台列表
+
+        提供 cursor 時使用 keyset 分頁（依排序鍵 (source_priority, name, id) 直接定位），
+        深頁延遲與第一頁相同；否則沿用 page/limit 的 OFFSET 分頁。
+        count: exact 精確計算總數、cached 使用快取的總數、none 不計算總數。
+        fields: 只輸出（並只讀取）指定欄位，預設為全部欄位。
+        collapse: 合併跨來源的同一電台實體，每個實體只列出主要電台（附備用串流 URL）。
+        快照與目前世代相符時直接由記憶體快照回應；關鍵字搜尋仍使用全文檢索索引。
+        """
+        check_pagination(page, limit)
+        after = decode_cursor(cursor) if cursor else None
+        serializer = StationSerializer(fields) if fields else StationSerializer()
+        
+        snapshot = None if search else self.snapshots.get(self.get_catalog_generation())
+        if snapshot is not None:
+            positions, total_count, has_more, next_key = snapshot.query(
+                country=country, language=language, page=page, limit=limit, after=after,
+                collapse=collapse
+            )
+            stations = snapshot.render(positions, serializer.fields)
+            if count == 'none':
+                total_count = None
+        else:
+            stations, total_count, has_more, next_key = self._query_stations_sql(
+                country, language, search, page, limit, after, count, serializer, collapse
+            )
+        
+        return {
+            'data': stations,
+            'pagination': {
+                'page': None if after else page,
+                'limit': limit,
+                'total': total_count,
+                'pages': (total_count + limit - 1) // limit if total_count is not None else None,
+                'has_more': has_more,
+                'next_cursor': encode_cursor(next_key) if next_key else None
+            }
+        }
+
+    def _query_stations_sql(self, country, language, search, page, limit, after, count,
+                            serializer: StationSerializer, collapse: bool = False):
+        """由 SQLite 查詢篩選後的電台，回傳 (電台, 總數, 是否還有下一頁, 下一頁排序鍵)"""
         conditions = []
         params = []
         
@@ -196,58 +473,133 @@ class RadioAPI:
             params.append(f'%{language}%')
             
         if search:
-            conditions.append('(name LIKE ? OR tags LIKE ?)')
-            params.extend([f'%{search}%', f'%{search}%'])
+            # 使用全文檢索索引比對名稱與標籤
+            conditions.append(f'id IN (SELECT rowid FROM {StationSearchIndex.TABLE} '
+                              f'WHERE {StationSearchIndex.TABLE} MATCH ?)')
+            params.append(build_match_query(search, columns=('name', 'tags')) or '""')
         
-        where_clause = ' AND '.join(conditions) if conditions else '1=1'
+        if collapse:
+            # 使用部分索引 idx_radio_stations_entity_order
+            conditions.append('entity_primary = 1')
+        
+        filter_clause = ' AND '.join(conditions) if conditions else '1=1'
         
-        # 計算總數
-        count_query = f'SELECT COUNT(*) FROM radio_stations WHERE {where_clause}'
-        cursor.execute(count_query, params)
-        total_count = cursor.fetchone()[0]
+        # 查詢形狀（使用了哪些篩選條件），作為耗時指標的標籤
+        shape = self._filter_shape(country=country, language=language, search=search, cursor=after,
+                                   collapse=collapse)
         
-        # 獲取分頁資料
+        page_conditions = list(conditions)
+        page_params = list(params)
         offset = (page - 1) * limit
-        data_query = f'''
-            SELECT uuid, name, url, homepage, favicon, tags, country, language, 
-                   codec, bitrate, source_api, source_type
-            FROM radio_stations 
-            WHERE {where_clause}
-            ORDER BY 
-                CASE source_api 
-                    WHEN 'manual' THEN 1 
-                    WHEN 'tunein' THEN 2
-                    WHEN 'radio_browser' THEN 3
-                    ELSE 4 
-                END,
-                name
-            LIMIT ? OFFSET ?
-        '''
-        
-        cursor.execute(data_query, params + [limit, offset])
-        rows = cursor.fetchall()
-        
-        stations = []
-        for row in rows:
-            stations.append({
-                'uuid': row[0],
-                'name': row[1],
-                'url': row[2],
-                'homepage': row[3],
-                'favicon': row[4],
-                'tags': row[5].split(',') if row[5] else [],
-                'country': row[6],
-                'language': row[7],
-                'codec': row[8],
-                'bitrate': row[9],
-                'source_api': row[10],
-                'source_type': row[11]
-            })
-        
-        conn.close()
+        if after:
+            page_conditions.append('(source_priority, name, id) > (?, ?, ?)')
+            page_params.extend(after)
+            offset = 0
+        
+        where_clause = ' AND '.join(page_conditions) if page_conditions else '1=1'
+        
+        with self.db.reader() as conn:
+            db_cursor = conn.cursor()
+            
+            # 計算總數
+            total_count = None
+            if count == 'exact':
+                total_count = self._count_stations(db_cursor, filter_clause, params, shape)
+            elif count == 'cached':
+                total_count = self._cached_count_stations(db_cursor, filter_clause, params, shape)
+            
+            # 獲取分頁資料（多取一筆判斷是否還有下一頁）
+            # 只讀取輸出欄位，另附排序鍵供產生下一頁游標
+            data_query = f'''
+                SELECT {serializer.select_sql()}, source_priority, name, id
+                FROM radio_stations 
+                WHERE {where_clause}
+                ORDER BY source_priority, name, id
+                LIMIT ? OFFSET ?
+            '''
+            
+            self.metrics.timed_execute(db_cursor, f'stations_page[{shape}]', data_query,
+                                       page_params + [limit + 1, offset])
+            rows = db_cursor.fetchall()
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        stations = serializer.rows_to_dicts(rows)
+        next_key = tuple(rows[-1][-3:]) if has_more and rows else None
+        
+        return stations, total_count, has_more, next_key
+
+    @staticmethod
+    def _filter_shape(**filters) -> str:
+        """有值的篩選條件名稱，例如 country+search；皆未使用時為 all"""
+        return '+'.join(name for name, value in filters.items() if value) or 'all'
+
+    def _count_stations(self, cursor, where_clause: str, params: List, shape: str = 'all') -> int:
+        """精確計算符合條件的電台數"""
+        self.metrics.timed_execute(cursor, f'stations_count[{shape}]',
+                                   f'SELECT COUNT(*) FROM radio_stations WHERE {where_clause}', params)
+        return cursor.fetchone()[0]
+
+    def _cached_count_stations(self, cursor, where_clause: str, params: List, shape: str = 'all') -> int:
+        """回傳快取的總數（目錄世代改變後才重新計算）"""
+        key = (self.get_catalog_generation(), where_clause, tuple(params))
+        
+        with self._count_cache_lock:
+            cached = self._count_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        total = self._count_stations(cursor, where_clause, params, shape)
+        with self._count_cache_lock:
+            if len(self._count_cache) >= 1024:
+                self._count_cache.clear()
+            self._count_cache[key] = total
+        return total
+
+    def search_stations_by_query(self, query: str, page: int = 1, limit: int = 100,
+                                 fields=None, collapse: bool = False) -> Dict:
+        """根據查詢字串搜尋電台（FTS5 全文檢索，BM25 相關度排序；collapse 時每個實體只列出主要電台）"""
+        check_pagination(page, limit)
+        match = build_match_query(query)
+        if not match:
+            return {
+                'data': [],
+                'pagination': {'page': page, 'limit': limit, 'total': 0, 'pages': 0}
+            }
+        
+        fts = StationSearchIndex.TABLE
+        serializer = StationSerializer(fields) if fields else StationSerializer()
+        
+        with self.db.reader() as conn:
+            cursor = conn.cursor()
+            
+            if collapse:
+                self.metrics.timed_execute(cursor, 'search_count[collapse]', f'''
+                    SELECT COUNT(*) FROM {fts}
+                    JOIN radio_stations s ON s.id = {fts}.rowid
+                    WHERE {fts} MATCH ? AND s.entity_primary = 1
+                ''', (match,))
+            else:
+                self.metrics.timed_execute(cursor, 'search_count',
+                                           f'SELECT COUNT(*) FROM {fts} WHERE {fts} MATCH ?', (match,))
+            total_count = cursor.fetchone()[0]
+            
+            search_query = f'''
+                SELECT {serializer.select_sql(prefix='s.')}
+                FROM {fts}
+                JOIN radio_stations s ON s.id = {fts}.rowid
+                WHERE {fts} MATCH ?{' AND s.entity_primary = 1' if collapse else ''}
+                ORDER BY {self.search_index.rank_expression()}, s.name
+                LIMIT ? OFFSET ?
+            '''
+            
+            self.metrics.timed_execute(cursor, 'search_page', search_query,
+                                       (match, limit, (page - 1) * limit))
+            results = serializer.rows_to_dicts(cursor.fetchall())
         
         return {
-            'data': stations,
+            'data': results,
             'pagination': {
                 'page': page,
                 'limit': limit,
@@ -256,125 +608,115 @@ class RadioAPI:
             }
         }
 
-    def search_stations_by_query(self, query: str) -> List[Dict]:
-        """根據查詢字串搜尋電台"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        search_query = '''
-            SELECT uuid, name, url, homepage, favicon, tags, country, language, 
-                   codec, bitrate, source_api, source_type
-            FROM radio_stations 
-            WHERE name LIKE ? OR tags LIKE ? OR country LIKE ?
-            ORDER BY 
-                CASE 
-                    WHEN name LIKE ? THEN 1
-                    WHEN tags LIKE ? THEN 2
-                    ELSE 3
-                END, name
-            LIMIT 100
-        '''
-        
-        like_query = f'%{query}%'
-        cursor.execute(search_query, [like_query, like_query, like_query, like_query, like_query])
-        rows = cursor.fetchall()
-        
-        results = []
-        for row in rows:
-            results.append({
-                'uuid': row[0],
-                'name': row[1],
-                'url': row[2],
-                'homepage': row[3],
-                'favicon': row[4],
-                'tags': row[5].split(',') if row[5] else [],
-                'country': row[6],
-                'language': row[7],
-                'codec': row[8],
-                'bitrate': row[9],
-                'source_api': row[10],
-                'source_type': row[11]
-            })
-        
-        conn.close()
-        return results
-
     def get_featured_stations(self) -> List[Dict]:
         """獲取精選電台"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT uuid, name, url, homepage, favicon, tags, country, language, 
-                   codec, bitrate, source_api, source_type
-            FROM radio_stations 
-            WHERE source_api = 'manual'
-            ORDER BY name
-            LIMIT 20
-        ''')
-        
-        featured = []
-        for row in cursor.fetchall():
-            featured.append({
-                'uuid': row[0],
-                'name': row[1],
-                'url': row[2],
-                'homepage': row[3],
-                'favicon': row[4],
-                'tags': row[5].split(',') if row[5] else [],
-                'country': row[6],
-                'language': row[7],
-                'codec': row[8],
-                'bitrate': row[9],
-                'source_api': row[10],
-                'source_type': row[11],
-                'featured_reason': '⭐ 手動精選高品質電台'
-            })
-        
-        conn.close()
+        snapshot = self.snapshots.get(self.get_catalog_generation())
+        if snapshot is not None:
+            return [dict(station, featured_reason='⭐ 手動精選高品質電台')
+                    for station in snapshot.featured(20)]
+        
+        serializer = StationSerializer()
+        
+        with self.db.reader() as conn:
+            cursor = conn.cursor()
+        
+            self.metrics.timed_execute(cursor, 'featured', f'''
+                SELECT {serializer.select_sql()}
+                FROM radio_stations 
+                WHERE source_api = 'manual'
+                ORDER BY name
+                LIMIT 20
+            ''')
+        
+            featured = serializer.rows_to_dicts(cursor.fetchall())
+        
+        for station in featured:
+            station['featured_reason'] = '⭐ 手動精選高品質電台'
         return featured
 
+    def export_stations_stream(self, export_format='ndjson', country='', language='',
+                               search='', since='', fields=EXPORT_FIELDS, batch_size=500):
+        """以伺服器端游標逐批讀取並產生輸出片段，記憶體用量與目錄大小無關"""
+        conditions = []
+        params = []
+        
+        if country:
+            conditions.append('country LIKE ?')
+            params.append(f'%{country}%')
+        
+        if language:
+            conditions.append('language LIKE ?')
+            params.append(f'%{language}%')
+        
+        if search:
+            conditions.append(f'id IN (SELECT rowid FROM {StationSearchIndex.TABLE} '
+                              f'WHERE {StationSearchIndex.TABLE} MATCH ?)')
+            params.append(build_match_query(search, columns=('name', 'tags')) or '""')
+        
+        if since:
+            conditions.append('collection_date >= ?')
+            params.append(since)
+        
+        where_clause = ' AND '.join(conditions) if conditions else '1=1'
+        serializer = StationSerializer(fields)
+        shape = self._filter_shape(country=country, language=language, search=search, since=since)
+        
+        with self.db.reader() as conn:
+            cursor = self.metrics.timed_execute(conn.cursor(), f'export[{shape}]', f'''
+                SELECT {serializer.select_sql()}
+                FROM radio_stations 
+                WHERE {where_clause}
+                ORDER BY source_priority, name, id
+            ''', params)
+            
+            separator = b'\n' if export_format == 'ndjson' else b',\n'
+            first = True
+            if export_format == 'json':
+                yield b'[\n'
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                
+                chunk = separator.join(serializer.row_to_json(row) for row in rows)
+                if export_format == 'ndjson':
+                    yield chunk + b'\n'
+                else:
+                    yield chunk if first else b',\n' + chunk
+                first = False
+            
+            if export_format == 'json':
+                yield b'\n]\n'
+
+    def _gzip_stream(self, chunks):
+        """將輸出片段串流壓縮為 gzip"""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
     def get_database_stats(self) -> Dict:
-        """獲取資料庫統計資訊"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 總電台數
-        cursor.execute('SELECT COUNT(*) FROM radio_stations')
-        total = cursor.fetchone()[0]
-        
-        # 按來源統計
-        cursor.execute('''
-            SELECT source_api, COUNT(*) 
-            FROM radio_stations 
-            GROUP BY source_api 
-            ORDER BY COUNT(*) DESC
-        ''')
-        by_source = dict(cursor.fetchall())
-        
-        # 按國家統計
-        cursor.execute('''
-            SELECT country, COUNT(*) 
-            FROM radio_stations 
-            WHERE country != '' 
-            GROUP BY country 
-            ORDER BY COUNT(*) DESC 
-            LIMIT 10
-        ''')
-        by_country = dict(cursor.fetchall())
-        
-        # 最近更新時間
-        cursor.execute('SELECT MAX(collection_date) FROM radio_stations')
-        last_update = cursor.fetchone()[0]
-        
-        conn.close()
+        """獲取資料庫統計資訊（優先使用記憶體快照，否則讀取觸發器維護的統計摘要表）"""
+        snapshot_stats = self.snapshots.get_stats(self.get_catalog_generation())
+        if snapshot_stats is not None:
+            return snapshot_stats
         
-        return {
-            'total_stations': total,
-            'by_source': by_source,
-            'by_country': by_country,
-            'last_update': last_update
-        }
+        with self.db.reader() as conn:
+            cursor = conn.cursor()
+            stats = self.stats_tables
+            
+            return {
+                'total_stations': stats.get_total(cursor),
+                'by_source': stats.get_breakdown(cursor, 'source'),
+                'by_country': stats.get_breakdown(cursor, 'country', limit=10, skip_empty=True),
+                'by_language': stats.get_breakdown(cursor, 'language', skip_empty=True),
+                'by_codec': stats.get_breakdown(cursor, 'codec', skip_empty=True),
+                'by_bitrate': stats.get_breakdown(cursor, 'bitrate'),
+                'last_update': stats.get_last_update(cursor)
+            }
 
     def update_stations_background(self):
         """背景更新電台資料"""
@@ -382,14 +724,30 @@ class RadioAPI:
             self.logger.info("🔄 開始背景更新電台資料...")
             from multi_source_radio_collector import MultiSourceRadioCollector
             
-            collector = MultiSourceRadioCollector(self.db_path)
-            result = collector.collect_all_stations()
-            collector.sync_stations_to_db(result)
+            collector = MultiSourceRadioCollector(self.db_path, db=self.db)
+            # 各來源完成後即同步到資料庫，不必等待最慢的來源
+            result = collector.collect_all_stations(commit_incrementally=True)
+            
+            # 於背景重建記憶體快照，完成後原子替換
+            self.snapshots.refresh_async()
             
             self.logger.info(f"✅ 背景更新完成，共 {result['total_unique']} 個電台")
         except Exception as e:
             self.logger.error(f"❌ 背景更新失敗: {e}")
 
+    def sync_radio_browser_changes_background(self):
+        """背景增量同步 Radio Browser（只套用上次同步後的變更，必要時改為完整同步）"""
+        try:
+            from multi_source_radio_collector import MultiSourceRadioCollector
+            
+            collector = MultiSourceRadioCollector(self.db_path, db=self.db)
+            result = collector.sync_radio_browser_changes()
+            
+            if result.get('total_operations') or result.get('mode') == 'full':
+                self.snapshots.refresh_async()
+        except Exception as e:
+            self.logger.error(f"❌ Radio Browser 增量同步失敗: {e}")
+
     def run(self, host='0.0.0.0', port=5000, debug=False):
         """啟動API服務器"""
         self.logger.info(f"🚀 電台API服務器啟動於 http://{host}:{port}")
@@ -8,18 +8,33 @@ import requests
 import json
 import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional, Sequence, Tuple
+
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import AdaptiveRateLimiter, HostRateLimiters
+from radio_browser_servers import RadioBrowserServerPool, ServerUnavailable
+from radio_browser_query_plan import CategoryQuery, load_query_plan
+
 
 
 class RadioBrowserCollector:
     """Radio Browser API 電台收集器"""
     
-    def __init__(self):
+    def __init__(self, max_workers: int = 4, requests_per_second: float = 2.0, burst: int = 2,
+                 server_pool: RadioBrowserServerPool = None, query_plan: Sequence[CategoryQuery] = None,
+                 rate_limiters: HostRateLimiters = None, max_requests_per_second: float = 10.0):
+        # 並行請求共用同一個 Session；連線池大小與工作執行緒數一致以重用 keep-alive 連線
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Taiwan Radio App/1.0 (Personal Use)'
         })
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         
         # 設定日誌
         self.logger = logging.getLogger(__name__)
@@ -30,62 +45,198 @@ class RadioBrowserCollector:
             self.logger.addHandler(handler)
             self.logger.setLevel(logging.INFO)
         
-        # API 設定
-        self.base_url = 'https://all.api.radio-browser.info'
-        self.rate_limit = 1.0
+        # API 設定：依延遲選擇鏡像伺服器並在失敗時切換；每個鏡像一個自適應速率限制器（行程內共用），
+        # 從 requests_per_second 開始，成功時逐步提高到 max_requests_per_second，429/5xx 時減半並遵守 Retry-After
+        self.servers = server_pool or RadioBrowserServerPool.shared()
+        self.timeout = 10
+        self.max_workers = max_workers
+        self.rate_limiters = rate_limiters or HostRateLimiters.shared()
+        self.rate_settings = {
+            'rate': requests_per_second, 'capacity': burst, 'min_rate': min(0.2, requests_per_second),
+            'max_rate': max(max_requests_per_second, requests_per_second), 'increase': 0.1, 'decrease': 0.5,
+        }
+        # 收集的分類與查詢條件（預設讀取 radio_browser_query_plan.json）
+        self.categories = list(query_plan) if query_plan is not None else load_query_plan()
+        
+        # 每個請求的耗時紀錄（供收集後的摘要與除錯）
+        self.request_timings = []
+        self._timings_lock = threading.Lock()
     
-    def collect_from_radio_browser(self) -> List[Dict]:
-        """從 Radio Browser API 收集電台"""
-        self.logger.info("🌐 從 Radio Browser API 收集電台...")
-        stations = []
+    def _get_json(self, path: str, params: Dict = None, cancel_event=None):
+        """經速率限制發出 GET 請求並回傳 JSON（取消時回傳 None）
         
+        依伺服器排序逐一嘗試：連線錯誤、逾時、5xx/429 或無效的 JSON 時降級該伺服器並改用下一個；
+        其他 4xx 直接拋出。所有伺服器都失敗時拋出 ServerUnavailable。
+        """
+        last_error = None
+        for server in self.servers.candidates():
+            limiter = self.rate_limiter(server)
+            if not limiter.acquire(cancel_event=cancel_event):
+                return None
+            try:
+                return self._request_json(server, path, params, limiter)
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status is not None and status < 500 and status != 429:
+                    raise
+                last_error = e
+            except (requests.ConnectionError, requests.Timeout, ValueError) as e:
+                last_error = e
+            self.servers.mark_failed(server)
+        
+        raise ServerUnavailable(f"所有 Radio Browser 伺服器都無法完成 {path}: {last_error}")
+    
+    def rate_limiter(self, server: str) -> AdaptiveRateLimiter:
+        """伺服器主機的自適應速率限制器"""
+        return self.rate_limiters.get(server, **self.rate_settings)
+    
+    def _request_json(self, server: str, path: str, params: Dict = None, limiter: AdaptiveRateLimiter = None):
+        """對單一伺服器發出請求並記錄耗時（回應狀態回饋給速率限制器）"""
+        start_time = time.perf_counter()
+        timing = {'server': server, 'path': path, 'started_at': datetime.now().isoformat()}
         try:
-            # 收集台灣、中文、熱門電台
-            endpoints = [
-                ('taiwan', '/json/stations/bycountry/taiwan'),
-                ('chinese', '/json/stations/bylanguage/chinese'),
-                ('classical', '/json/stations/bytag/classical'),
-                ('pop', '/json/stations/bytag/pop'),
-                ('news', '/json/stations/bytag/news'),
-                ('jazz', '/json/stations/bytag/jazz'),
-                ('rock', '/json/stations/bytag/rock')
-            ]
-            
-            for category, endpoint in endpoints:
-                time.sleep(self.rate_limit)
-                url = f"{self.base_url}{endpoint}"
+            try:
+                response = self.session.get(f"{server}{path}", params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if limiter is not None:
+                    limiter.feedback()
+                raise
+            if limiter is not None:
+                pause = limiter.feedback_response(response)
+                if pause:
+                    self.logger.warning(f"⚠️ {server} 要求降速 ({response.status_code})，"
+                                        f"速率降至 {limiter.rate:.2f} 次/秒，暫停 {pause:.0f} 秒")
+            timing['status'] = response.status_code
+            timing['bytes'] = len(response.content)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            timing['error'] = str(e)
+            raise
+        finally:
+            timing['seconds'] = round(time.perf_counter() - start_time, 3)
+            with self._timings_lock:
+                self.request_timings.append(timing)
+    
+    def fetch_many(self, jobs: Sequence[Tuple[str, str, Optional[Dict]]],
+                   cancel_event=None) -> Iterator[Tuple[str, Optional[list], Optional[Exception]]]:
+        """並行發出多個請求 (名稱, 路徑, 參數)，依傳入順序產生 (名稱, JSON, 例外)
+        
+        請求在執行緒池中同時進行（仍受共用令牌桶限制），單一慢速請求不會阻塞其他請求；
+        依序產生結果讓下游的處理順序固定。cancel_event 被設定時，尚未開始的請求會被取消。
+        """
+        if not jobs:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs)),
+                                thread_name_prefix='radio-browser') as executor:
+            futures = [(name, executor.submit(self._get_json, path, params, cancel_event))
+                       for name, path, params in jobs]
+            try:
+                for name, future in futures:
+                    try:
+                        yield name, future.result(), None
+                    except Exception as e:
+                        yield name, None, e
+            finally:
+                for _, future in futures:
+                    future.cancel()
+    
+    def request_stats(self) -> Dict:
+        """請求耗時摘要：次數、失敗數、下載位元組數、平均與最慢的請求"""
+        with self._timings_lock:
+            timings = list(self.request_timings)
+        if not timings:
+            return {'requests': 0, 'failed': 0, 'bytes': 0, 'avg_seconds': 0.0, 'max_seconds': 0.0, 'slowest': None}
+        slowest = max(timings, key=lambda timing: timing['seconds'])
+        return {
+            'requests': len(timings),
+            'failed': sum(1 for timing in timings if 'error' in timing),
+            'bytes': sum(timing.get('bytes', 0) for timing in timings),
+            'avg_seconds': round(sum(timing['seconds'] for timing in timings) / len(timings), 3),
+            'max_seconds': slowest['seconds'],
+            'slowest': slowest['path']
+        }
+    
+    def collect_from_radio_browser(self, cancel_event=None) -> List[Dict]:
+        """從 Radio Browser API 收集電台（cancel_event 被設定時停止並回傳已收集的電台）"""
+        return list(self.iter_radio_browser(cancel_event=cancel_event))
+    
+    def iter_radio_browser(self, cancel_event=None) -> Iterator[Dict]:
+        """逐一產生 Radio Browser 電台（串流版本，各分類並行請求，依分類順序產生）"""
+        self.logger.info(f"🌐 從 Radio Browser API 收集電台（{len(self.categories)} 個分類，並行 {self.max_workers}）...")
+        total_count = 0
+        queries = {query.category: query for query in self.categories}
+        jobs = [(query.category, query.endpoint, query.params()) for query in self.categories]
+        
+        try:
+            for category, data, error in self.fetch_many(jobs, cancel_event=cancel_event):
+                if cancel_event is not None and cancel_event.is_set():
+                    self.logger.warning("⏹️ Radio Browser 收集已取消")
+                    break
+                if error is not None:
+                    self.logger.warning(f"⚠️ Radio Browser {category} 收集失敗: {error}")
+                    continue
                 
-                try:
-                    self.logger.info(f"🔍 收集 Radio Browser 分類: {category}")
-                    response = self.session.get(url, timeout=10)
-                    response.raise_for_status()
-                    data = response.json()
-                    
-                    # 限制數量避免過多
-                    if category in ['classical', 'pop', 'jazz', 'rock']:
-                        data = data[:50]
-                    elif category == 'news':
-                        data = data[:30]
-                    
-                    category_count = 0
-                    for station in data:
-                        station_data = self._create_station_from_radio_browser(station, category)
-                        if station_data:
-                            stations.append(station_data)
-                            category_count += 1
-                    
-                    self.logger.info(f"📻 Radio Browser {category}: 收集到 {category_count} 個電台")
-                        
-                except Exception as e:
-                    self.logger.warning(f"⚠️ Radio Browser {category} 收集失敗: {e}")
+                # 筆數上限與排序已由伺服器處理；本地只套用位元率/編碼篩選（並防範忽略 limit 的鏡像）
+                data = queries[category].filter(data)
+                
+                category_stations = self._create_stations(data, category)
+                del data
+                self.logger.info(f"📻 Radio Browser {category}: 收集到 {len(category_stations)} 個電台")
+                
+                # 在請求的例外處理之外產生，下游的錯誤不會被誤判為收集失敗
+                total_count += len(category_stations)
+                yield from category_stations
             
-            self.logger.info(f"✅ Radio Browser: 總共收集到 {len(stations)} 個電台")
+            stats = self.request_stats()
+            self.logger.info(f"✅ Radio Browser: 總共收集到 {total_count} 個電台"
+                             f"（{stats['requests']} 個請求共 {stats['bytes'] / 1024:.0f} KB，平均 {stats['avg_seconds']} 秒，"
+                             f"最慢 {stats['max_seconds']} 秒: {stats['slowest']}）")
             
         except Exception as e:
             self.logger.error(f"❌ Radio Browser 收集失敗: {e}")
-        
+    
+    def iter_changes(self, lastchangeuuid: str, page_size: int = 1000, max_changes: int = None,
+                     cancel_event=None) -> Iterator[Dict]:
+        """依序產生 lastchangeuuid 之後的電台變更紀錄（/json/stations/changed，逐頁取得）"""
+        count = 0
+        while True:
+            limit = page_size if max_changes is None else min(page_size, max_changes - count)
+            if limit <= 0:
+                return
+            changes = self._get_json('/json/stations/changed',
+                                     {'lastchangeuuid': lastchangeuuid, 'limit': limit},
+                                     cancel_event=cancel_event)
+            if not changes:
+                return
+            for change in changes:
+                yield change
+            count += len(changes)
+            lastchangeuuid = changes[-1].get('changeuuid') or lastchangeuuid
+            if len(changes) < limit:
+                return
+    
+    def match_categories(self, station_data: dict) -> List[str]:
+        """電台符合的收集分類（依分類順序，比對方式與各分類的端點及篩選條件相同）"""
+        return [query.category for query in self.categories if query.matches(station_data)]
+    
+    def category_limit(self, category: str) -> Optional[int]:
+        """分類保留的電台數上限（None 為全部保留）"""
+        return next((query.limit for query in self.categories if query.category == category), None)
+    
+    def _create_stations(self, data: list, category: str) -> List[Dict]:
+        """將 API 回應轉為電台記錄（略過無效的電台）"""
+        stations = []
+        for station in data or []:
+            station_data = self._create_station_from_radio_browser(station, category)
+            if station_data:
+                stations.append(station_data)
         return stations
     
+    def create_station(self, station_data: dict, category: str) -> Optional[Dict]:
+        """將單筆 API 電台資料（含變更紀錄）轉為指定分類的電台記錄，無效時回傳 None"""
+        return self._create_station_from_radio_browser(station_data, category)
+    
     def _create_station_from_radio_browser(self, station_data: dict, category: str) -> dict:
         """從 Radio Browser 數據創建電台記錄"""
         # 基本驗證
@@ -111,6 +262,11 @@ class RadioBrowserCollector:
             'bitrate': self._safe_int(station_data.get('bitrate', 0)),
             'source_api': 'radio_browser',
             'source_type': 'public_api',
+            'category': category,
+            'votes': self._safe_int(station_data.get('votes', 0)),
+            'clickcount': self._safe_int(station_data.get('clickcount', 0)),
+            'lastcheckok': self._safe_int(station_data.get('lastcheckok', 0)),
+            'countrycode': station_data.get('countrycode', ''),
             'metadata': json.dumps({
                 'votes': station_data.get('votes', 0),
                 'clickcount': station_data.get('clickcount', 0),
@@ -119,6 +275,7 @@ class RadioBrowserCollector:
                 'changeuuid': station_data.get('changeuuid', ''),
                 'lastcheckok': station_data.get('lastcheckok', 0),
                 'lastchecktime': station_data.get('lastchecktime', ''),
+                'lastchangetime': station_data.get('lastchangetime', ''),
                 'category': category
             })
         }
@@ -164,10 +321,7 @@ class RadioBrowserCollector:
     def get_available_countries(self) -> List[Dict]:
         """獲取可用的國家列表"""
         try:
-            url = f"{self.base_url}/json/countries"
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            return self._get_json('/json/countries')
         except Exception as e:
             self.logger.error(f"❌ 獲取國家列表失敗: {e}")
             return []
@@ -175,10 +329,7 @@ class RadioBrowserCollector:
     def get_available_languages(self) -> List[Dict]:
         """獲取可用的語言列表"""
         try:
-            url = f"{self.base_url}/json/languages"
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            return self._get_json('/json/languages')
         except Exception as e:
             self.logger.error(f"❌ 獲取語言列表失敗: {e}")
             return []
@@ -186,70 +337,44 @@ class RadioBrowserCollector:
     def get_available_tags(self) -> List[Dict]:
         """獲取可用的標籤列表"""
         try:
-            url = f"{self.base_url}/json/tags"
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            return self._get_json('/json/tags')
         except Exception as e:
             self.logger.error(f"❌ 獲取標籤列表失敗: {e}")
             return []
     
     def search_stations_by_name(self, name: str, limit: int = 50) -> List[Dict]:
         """按名稱搜索電台"""
-        try:
-            url = f"{self.base_url}/json/stations/byname/{name}"
-            params = {'limit': limit}
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            stations = []
-            for station in response.json():
-                station_data = self._create_station_from_radio_browser(station, 'search')
-                if station_data:
-                    stations.append(station_data)
-            
-            return stations
-        except Exception as e:
-            self.logger.error(f"❌ 按名稱搜索失敗: {e}")
-            return []
+        return self.search_stations_by_names([name], limit=limit).get(name, [])
+    
+    def search_stations_by_names(self, names: Sequence[str], limit: int = 50) -> Dict[str, List[Dict]]:
+        """並行按多個名稱搜索電台，回傳 名稱 → 電台"""
+        jobs = [(name, f"/json/stations/byname/{name}", {'limit': limit}) for name in names]
+        results = {}
+        for name, data, error in self.fetch_many(jobs):
+            if error is not None:
+                self.logger.error(f"❌ 按名稱搜索失敗 ({name}): {error}")
+            results[name] = self._create_stations(data, 'search')
+        return results
     
     def get_top_stations_by_votes(self, limit: int = 100) -> List[Dict]:
         """獲取按投票數排序的熱門電台"""
-        try:
-            url = f"{self.base_url}/json/stations/topvote"
-            params = {'limit': limit}
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            stations = []
-            for station in response.json():
-                station_data = self._create_station_from_radio_browser(station, 'top_voted')
-                if station_data:
-                    stations.append(station_data)
-            
-            return stations
-        except Exception as e:
-            self.logger.error(f"❌ 獲取熱門電台失敗: {e}")
-            return []
+        return self.get_top_stations(limit=limit, rankings=('top_voted',))['top_voted']
     
     def get_top_stations_by_clicks(self, limit: int = 100) -> List[Dict]:
         """獲取按點擊數排序的熱門電台"""
-        try:
-            url = f"{self.base_url}/json/stations/topclick"
-            params = {'limit': limit}
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            stations = []
-            for station in response.json():
-                station_data = self._create_station_from_radio_browser(station, 'top_clicked')
-                if station_data:
-                    stations.append(station_data)
-            
-            return stations
-        except Exception as e:
-            self.logger.error(f"❌ 獲取熱門電台失敗: {e}")
-            return []
+        return self.get_top_stations(limit=limit, rankings=('top_clicked',))['top_clicked']
+    
+    def get_top_stations(self, limit: int = 100,
+                         rankings: Sequence[str] = ('top_voted', 'top_clicked')) -> Dict[str, List[Dict]]:
+        """並行獲取熱門電台排行（top_voted 按投票數、top_clicked 按點擊數）"""
+        endpoints = {'top_voted': '/json/stations/topvote', 'top_clicked': '/json/stations/topclick'}
+        jobs = [(ranking, endpoints[ranking], {'limit': limit}) for ranking in rankings]
+        results = {}
+        for ranking, data, error in self.fetch_many(jobs):
+            if error is not None:
+                self.logger.error(f"❌ 獲取熱門電台失敗 ({ranking}): {error}")
+            results[ranking] = self._create_stations(data, ranking)
+        return results
 
 
 # 使用示例和測試
@@ -289,4 +414,7 @@ if __name__ == "__main__":
     search_results = collector.search_stations_by_name("BBC", 5)
     print(f"🔎 搜索 'BBC': {len(search_results)} 個結果")
     
+    # 請求耗時
+    print(f"⏱️ 請求統計: {collector.request_stats()}")
+    
     print(f"\n✅ Radio Browser 收集器測試完成！")
\ No newline at end of file
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Radio Browser 查詢計畫
+收集的分類與各分類的查詢條件由 radio_browser_query_plan.json 設定：
+筆數上限、排序與隱藏失效電台以請求參數交由伺服器處理（只下載要保留的電台），
+最低位元率與編碼格式於收到回應後篩選
+"""
+import os
+import json
+from typing import Dict, List, Optional, Sequence
+
+
+DEFAULT_QUERY_PLAN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'radio_browser_query_plan.json')
+
+# 支援的端點類型 → 比對的電台欄位（exact 為完全比對，其餘為不分大小寫的部分比對，同 API 行為）
+ENDPOINT_FIELDS = {
+    'bycountry': 'country',
+    'bycountryexact': 'country',
+    'bylanguage': 'language',
+    'bylanguageexact': 'language',
+    'bytag': 'tags',
+    'bytagexact': 'tags',
+}
+
+# API 接受的排序欄位
+ORDER_FIELDS = {
+    'name', 'url', 'homepage', 'favicon', 'tags', 'country', 'state', 'language', 'votes',
+    'codec', 'bitrate', 'lastcheckok', 'lastchecktime', 'clicktimestamp', 'clickcount',
+    'clicktrend', 'changetimestamp', 'random',
+}
+
+QUERY_OPTIONS = ('limit', 'order', 'reverse', 'hidebroken', 'min_bitrate', 'codecs')
+
+
+class CategoryQuery:
+    """單一分類的查詢：端點、伺服器端參數（limit/order/reverse/hidebroken）與本地篩選條件"""
+
+    def __init__(self, category: str, endpoint: str, limit: Optional[int] = None, order: Optional[str] = None,
+                 reverse: bool = False, hidebroken: bool = False, min_bitrate: int = 0,
+                 codecs: Sequence[str] = ()):
+        kind, value = endpoint.rstrip('/').rsplit('/', 2)[-2:]
+        if kind not in ENDPOINT_FIELDS:
+            raise ValueError(f'{category}: 不支援的端點 {endpoint}（可用: {", ".join(ENDPOINT_FIELDS)}）')
+        if order is not None and order not in ORDER_FIELDS:
+            raise ValueError(f'{category}: 不支援的排序欄位 {order}')
+        if limit is not None and limit <= 0:
+            raise ValueError(f'{category}: limit 必須大於 0')
+
+        self.category = category
+        self.endpoint = endpoint
+        self.limit = limit
+        self.order = order
+        self.reverse = bool(reverse)
+        self.hidebroken = bool(hidebroken)
+        self.min_bitrate = min_bitrate or 0
+        self.codecs = frozenset(codec.lower() for codec in codecs)
+
+        self.field = ENDPOINT_FIELDS[kind]
+        self.exact = kind.endswith('exact')
+        self.value = value.lower()
+
+    @classmethod
+    def from_dict(cls, data: Dict, defaults: Dict = None) -> 'CategoryQuery':
+        options = dict(defaults or {}, **data)
+        unknown = set(options) - {'category', 'endpoint'} - set(QUERY_OPTIONS)
+        if unknown:
+            raise ValueError(f'{options.get("category")}: 未知的查詢設定 {", ".join(sorted(unknown))}')
+        return cls(**options)
+
+    def params(self) -> Dict:
+        """交由伺服器處理的請求參數"""
+        params = {}
+        if self.limit is not None:
+            params['limit'] = self.limit
+        if self.order is not None:
+            params['order'] = self.order
+            params['reverse'] = 'true' if self.reverse else 'false'
+        if self.hidebroken:
+            params['hidebroken'] = 'true'
+        return params
+
+    @property
+    def filters_locally(self) -> bool:
+        return bool(self.min_bitrate or self.codecs)
+
+    def accepts(self, station_data: dict) -> bool:
+        """本地篩選條件：最低位元率、編碼格式（hidebroken 時另須最近一次檢查成功，沒有檢查結果的資料不判斷）"""
+        if self.min_bitrate and _to_int(station_data.get('bitrate')) < self.min_bitrate:
+            return False
+        if self.codecs and (station_data.get('codec') or '').lower() not in self.codecs:
+            return False
+        if self.hidebroken and 'lastcheckok' in station_data and not _to_int(station_data['lastcheckok']):
+            return False
+        return True
+
+    def filter(self, data: list) -> list:
+        """套用本地篩選與筆數上限（本地篩選在伺服器取回 limit 筆之後進行，保留數可能少於 limit）"""
+        if self.filters_locally:
+            data = [station for station in data if self.accepts(station)]
+        if self.limit is not None:
+            data = data[:self.limit]
+        return data
+
+    def matches(self, station_data: dict) -> bool:
+        """電台是否符合此分類的端點與篩選條件（增量同步判斷變更後的電台所屬分類）"""
+        field = (station_data.get(self.field) or '').lower()
+        if self.exact:
+            matched = self.value in (item.strip() for item in field.split(','))
+        else:
+            matched = self.value in field
+        return matched and self.accepts(station_data)
+
+
+def _to_int(value) -> int:
+    try:
+        return int(value) if value else 0
+    except (ValueError, TypeError):
+        return 0
+
+
+def load_query_plan(path: str = DEFAULT_QUERY_PLAN_PATH) -> List[CategoryQuery]:
+    """讀取查詢計畫（JSON: defaults 與 categories），設定錯誤時拋出 ValueError"""
+    with open(path, 'r', encoding='utf-8') as f:
+        plan = json.load(f)
+
+    defaults = plan.get('defaults', {})
+    queries = [CategoryQuery.from_dict(entry, defaults) for entry in plan.get('categories', [])]
+    categories = [query.category for query in queries]
+    if len(set(categories)) != len(categories):
+        raise ValueError(f'查詢計畫中有重複的分類: {categories}')
+    return queries
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Radio Browser 鏡像伺服器選擇
+all.api.radio-browser.info 是輪詢 DNS，可能整次收集都落在緩慢或故障的鏡像上。
+此模組列出可用的 API 伺服器、以 /json/stats 探測延遲並排序（排序結果依 TTL 快取），
+請求失敗時暫時降級該伺服器並改用下一個
+"""
+import time
+import socket
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import requests
+
+
+# 輪詢 DNS 名稱：解析出的每個 IP 反查即為各鏡像的主機名稱
+DISCOVERY_HOST = 'all.api.radio-browser.info'
+
+# DNS 查詢失敗時使用的已知鏡像
+FALLBACK_SERVERS = [
+    'https://de1.api.radio-browser.info',
+    'https://fi1.api.radio-browser.info',
+    'https://at1.api.radio-browser.info',
+]
+
+# 延遲探測用的輕量端點
+PROBE_PATH = '/json/stats'
+
+
+class ServerUnavailable(Exception):
+    """所有伺服器都無法回應"""
+
+
+class RadioBrowserServerPool:
+    """Radio Browser API 伺服器池：探測延遲排序、TTL 快取、失敗降級"""
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, servers: Sequence[str] = None, discovery_host: str = DISCOVERY_HOST,
+                 ttl: float = 3600, probe_timeout: float = 3.0, failure_cooldown: float = 300,
+                 probe_path: str = PROBE_PATH):
+        # servers 指定時不做 DNS 探索（設定檔或測試用的本機伺服器）
+        self.static_servers = [server.rstrip('/') for server in servers] if servers else None
+        self.discovery_host = discovery_host
+        self.ttl = ttl
+        self.probe_timeout = probe_timeout
+        self.failure_cooldown = failure_cooldown
+        self.probe_path = probe_path
+
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': 'Taiwan Radio App/1.0 (Personal Use)'})
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._ranking = []          # [{'url', 'latency', 'healthy'}]，延遲由低到高
+        self._ranked_at = None
+        self._failed_until = {}     # 伺服器 → 降級到期時間
+
+    @classmethod
+    def shared(cls) -> 'RadioBrowserServerPool':
+        """同一行程共用的預設伺服器池（排序結果跨收集器實例快取）"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def discover(self) -> List[str]:
+        """列出可用的 API 伺服器：解析輪詢 DNS 的所有 IP 並反查主機名稱"""
+        if self.static_servers is not None:
+            return list(self.static_servers)
+
+        try:
+            addresses = {info[4][0] for info in socket.getaddrinfo(self.discovery_host, 443,
+                                                                   proto=socket.IPPROTO_TCP)}
+        except OSError as e:
+            self.logger.warning(f"⚠️ 無法解析 {self.discovery_host}，使用預設鏡像清單: {e}")
+            return list(FALLBACK_SERVERS)
+
+        servers = set()
+        for address in addresses:
+            try:
+                hostname = socket.gethostbyaddr(address)[0]
+            except OSError:
+                continue
+            servers.add(f'https://{hostname}')
+
+        if not servers:
+            return list(FALLBACK_SERVERS)
+        return sorted(servers)
+
+    def probe(self, server: str) -> Dict:
+        """探測單一伺服器的延遲與健康狀態"""
+        start_time = time.perf_counter()
+        try:
+            response = self.session.get(f'{server}{self.probe_path}', timeout=self.probe_timeout)
+            latency = time.perf_counter() - start_time
+            response.raise_for_status()
+            stats = response.json()
+            healthy = not isinstance(stats, dict) or stats.get('status', 'OK') == 'OK'
+            return {'url': server, 'latency': round(latency, 3), 'healthy': healthy}
+        except Exception as e:
+            return {'url': server, 'latency': None, 'healthy': False, 'error': str(e)}
+
+    def refresh(self) -> List[Dict]:
+        """重新探索並並行探測所有伺服器，依（健康、延遲）排序"""
+        with self._refresh_lock:
+            servers = self.discover()
+            with ThreadPoolExecutor(max_workers=max(1, min(8, len(servers))),
+                                    thread_name_prefix='rb-probe') as executor:
+                results = list(executor.map(self.probe, servers))
+
+            ranking = sorted(results, key=lambda result: (not result['healthy'],
+                                                          result['latency'] if result['latency'] is not None
+                                                          else float('inf'),
+                                                          result['url']))
+            with self._lock:
+                self._ranking = ranking
+                self._ranked_at = time.monotonic()
+                self._failed_until.clear()
+
+            healthy = [f"{result['url']} ({result['latency']}s)" for result in ranking if result['healthy']]
+            if healthy:
+                self.logger.info(f"🌐 Radio Browser 伺服器排序: {', '.join(healthy)}")
+            else:
+                self.logger.warning(f"⚠️ 沒有健康的 Radio Browser 伺服器（共探測 {len(ranking)} 個）")
+            return ranking
+
+    def ranking(self) -> List[Dict]:
+        """目前的伺服器排序（超過 TTL 時重新探測）"""
+        with self._lock:
+            expired = self._ranked_at is None or time.monotonic() - self._ranked_at >= self.ttl
+            ranking = self._ranking
+        if expired:
+            ranking = self.refresh()
+        return ranking
+
+    def candidates(self) -> List[str]:
+        """依序嘗試的伺服器：健康且未降級的伺服器優先，其餘（含探測失敗者）排在最後作為備援"""
+        ranking = self.ranking()
+        now = time.monotonic()
+        with self._lock:
+            preferred = [result['url'] for result in ranking
+                         if result['healthy'] and self._failed_until.get(result['url'], 0) <= now]
+        fallback = [result['url'] for result in ranking if result['url'] not in preferred]
+        return preferred + fallback
+
+    def best(self) -> Optional[str]:
+        candidates = self.candidates()
+        return candidates[0] if candidates else None
+
+    def mark_failed(self, server: str):
+        """請求失敗：在冷卻時間內降級該伺服器"""
+        with self._lock:
+            self._failed_until[server] = time.monotonic() + self.failure_cooldown
+        self.logger.warning(f"⚠️ Radio Browser 伺服器 {server} 請求失敗，暫時改用其他鏡像")
+
+    def invalidate(self):
+        """清除快取的排序，下次請求時重新探測"""
+        with self._lock:
+            self._ranked_at = None
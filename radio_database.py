@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+電台資料庫連線管理器
+提供 WAL 模式的唯讀連線池與單一寫入連線，避免每個請求重新建立 SQLite 連線
+"""
+import time
+import sqlite3
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+
+
+class RadioDatabase:
+    """SQLite 連線管理器 - 唯讀連線池 + 單一寫入連線"""
+
+    def __init__(self, db_path: str = "expanded_radio_stations.db",
+                 pool_size: int = 8,
+                 cache_size_kb: int = 16384,
+                 mmap_size: int = 256 * 1024 * 1024,
+                 busy_timeout: float = 30.0,
+                 generation_ttl: float = 1.0):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout
+        self.generation_ttl = generation_ttl
+
+        self.logger = logging.getLogger(__name__)
+
+        # 唯讀連線池（LIFO 讓最近使用、頁面快取較熱的連線優先被取用）
+        self._readers = queue.LifoQueue(maxsize=pool_size)
+
+        # 單一寫入連線，由鎖保護
+        self._writer = None
+        self._writer_lock = threading.RLock()
+
+        # 自訂 SQL 函式（名稱 → (參數數量, 函式)），每個連線建立時註冊一次
+        self._functions = {}
+
+        # 寫入交易提交後執行的回呼（回滾時捨棄）
+        self._after_commit = []
+
+        # 目錄世代的記憶體副本：本程序的寫入提交後立即發布；其他程序（update_stations.sh、
+        # 啟動時的收集器）的同步則由超過 generation_ttl 秒時重新讀取 catalog_meta 得知
+        self._generation = None
+        self._generation_checked_at = None
+        self._generation_lock = threading.Lock()
+
+        # WAL 為資料庫檔案層級設定，啟用後讀取不再被寫入交易阻塞
+        self._enable_wal()
+
+    def _connect(self, read_only: bool) -> sqlite3.Connection:
+        """建立並調校一個新的連線"""
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=False)
+        conn.execute(f'PRAGMA cache_size = -{int(self.cache_size_kb)}')
+        conn.execute(f'PRAGMA mmap_size = {int(self.mmap_size)}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+
+        if read_only:
+            conn.execute('PRAGMA query_only = ON')
+        else:
+            conn.execute('PRAGMA synchronous = NORMAL')
+
+        for name, (num_params, func) in self._functions.items():
+            conn.create_function(name, num_params, func, deterministic=True)
+        return conn
+
+    def register_function(self, name: str, num_params: int, func):
+        """註冊確定性的自訂 SQL 函式，套用到寫入連線與之後建立的連線（重複註冊時忽略）"""
+        with self._writer_lock:
+            if name in self._functions:
+                return
+            self._functions[name] = (num_params, func)
+            if self._writer is not None:
+                self._writer.create_function(name, num_params, func, deterministic=True)
+
+    def _enable_wal(self):
+        """將資料庫切換為 WAL 模式"""
+        try:
+            with self.writer() as conn:
+                mode = conn.execute('PRAGMA journal_mode = WAL').fetchone()[0]
+            if str(mode).lower() != 'wal':
+                self.logger.warning(f"⚠️ 無法啟用 WAL 模式，目前為 {mode}")
+        except sqlite3.Error as e:
+            self.logger.warning(f"⚠️ 啟用 WAL 模式失敗: {e}")
+
+    @contextmanager
+    def reader(self):
+        """從連線池取得唯讀連線，使用完畢自動歸還"""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._connect(read_only=True)
+
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._readers.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    @contextmanager
+    def writer(self):
+        """取得唯一的寫入連線，正常結束時提交，發生例外時回滾"""
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = self._connect(read_only=False)
+
+            conn = self._writer
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                self._after_commit.clear()
+                conn.rollback()
+                raise
+
+            callbacks, self._after_commit = self._after_commit, []
+            for callback in callbacks:
+                callback()
+
+    def after_commit(self, callback):
+        """登記於目前寫入交易提交後執行的回呼（須持有寫入連線時呼叫，交易回滾時不執行）"""
+        with self._writer_lock:
+            self._after_commit.append(callback)
+
+    @property
+    def catalog_generation(self) -> int:
+        """目前的目錄世代（記憶體副本，距上次讀取資料庫超過 generation_ttl 秒時重新查詢）"""
+        generation = self._generation
+        checked_at = self._generation_checked_at
+        now = time.monotonic()
+        if generation is None or checked_at is None or now - checked_at >= self.generation_ttl:
+            self._generation_checked_at = now
+            with self.reader() as conn:
+                row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'generation'").fetchone()
+            generation = self.publish_generation(int(row[0]) if row else 0)
+        return generation
+
+    def publish_generation(self, generation: int) -> int:
+        """發布已提交的目錄世代（只前進不後退，避免較晚完成的舊讀取覆蓋新值）"""
+        with self._generation_lock:
+            if self._generation is None or generation > self._generation:
+                self._generation = generation
+            return self._generation
+
+    def close(self):
+        """關閉所有連線"""
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
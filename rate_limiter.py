@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+請求速率限制
+執行緒安全的令牌桶：多個並行請求共用同一個桶，平均速率不超過設定值，
+短時間內允許最多 capacity 個請求的突發。
+AdaptiveRateLimiter 依回應調整單一主機的速率（AIMD：成功時加性增加，429/403/5xx 時乘性降低，
+遵守 Retry-After），HostRateLimiters 讓同一行程內所有收集器與執行緒共用各主機的限制器
+"""
+import time
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+
+# 表示伺服器要求降速的狀態碼（另加所有 5xx）
+THROTTLE_STATUSES = {403, 429}
+
+
+class TokenBucket:
+    """令牌桶速率限制器（rate 為每秒補充的令牌數，capacity 為桶的容量）"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError('rate 必須大於 0')
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate: float):
+        """調整補充速率（已累積的令牌依舊速率結算）"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+    def drain(self):
+        """清空桶內令牌（降速後不允許立即突發）"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = 0.0
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """嘗試取得令牌：成功回傳 0，否則回傳還需等待的秒數（不阻塞）"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0, cancel_event: threading.Event = None,
+                timeout: Optional[float] = None) -> bool:
+        """取得令牌（必要時等待）；cancel_event 被設定或超過 timeout 時回傳 False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            if cancel_event is not None:
+                if cancel_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 標頭（秒數或 HTTP 日期），回傳需等待的秒數；無法解析時回傳 None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class AdaptiveRateLimiter:
+    """單一主機的自適應速率限制（AIMD）
+
+    每個成功的回應讓速率增加 increase（每秒請求數），直到 max_rate；429/403/5xx 時速率乘以 decrease
+    （不低於 min_rate，一個請求間隔內只降一次）、清空令牌，並暫停到 Retry-After 指定的時間
+    （沒有時暫停 cooldown 秒，上限 max_pause）；連線錯誤與逾時只降速不暫停。
+    """
+
+    def __init__(self, rate: float = 1.0, min_rate: float = 0.05, max_rate: float = 5.0,
+                 increase: float = 0.05, decrease: float = 0.5, capacity: float = 1.0,
+                 cooldown: float = 0.0, max_pause: float = 600.0):
+        if not 0 < min_rate <= max_rate:
+            raise ValueError('min_rate 必須大於 0 且不大於 max_rate')
+        if not 0 < decrease < 1:
+            raise ValueError('decrease 必須介於 0 與 1 之間')
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.max_pause = max_pause
+        self.bucket = TokenBucket(min(max(rate, min_rate), max_rate), capacity)
+
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self._decreased_at = None
+        self.successes = 0
+        self.throttled = 0
+        self.errors = 0
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def acquire(self, cancel_event: threading.Event = None, timeout: Optional[float] = None) -> bool:
+        """等待暫停結束並取得令牌；cancel_event 被設定或超過 timeout 時回傳 False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                wait = self._paused_until - time.monotonic()
+            if wait <= 0:
+                break
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            if cancel_event is not None:
+                if cancel_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        return self.bucket.acquire(cancel_event=cancel_event, timeout=remaining)
+
+    def feedback(self, status: Optional[int] = None, retry_after: Optional[str] = None) -> float:
+        """依回應調整速率（status 為 None 表示連線錯誤或逾時），回傳因此暫停的秒數"""
+        with self._lock:
+            if status is not None and status < 400:
+                self.successes += 1
+                self.bucket.set_rate(min(self.max_rate, self.rate + self.increase))
+                return 0.0
+            if status is not None and status not in THROTTLE_STATUSES and status < 500:
+                return 0.0
+
+            # 並行請求同時收到的錯誤視為同一次壅塞：一個請求間隔內只降速一次
+            now = time.monotonic()
+            if self._decreased_at is None or now - self._decreased_at >= 1.0 / self.rate:
+                self.bucket.set_rate(max(self.min_rate, self.rate * self.decrease))
+                self._decreased_at = now
+            self.bucket.drain()
+            if status is None:
+                self.errors += 1
+                return 0.0
+            self.throttled += 1
+            pause = parse_retry_after(retry_after)
+            pause = min(self.max_pause, self.cooldown if pause is None else pause)
+            self._paused_until = max(self._paused_until, now + pause)
+            return pause
+
+    def feedback_response(self, response) -> float:
+        """以 requests 的回應（None 表示沒有回應）調整速率"""
+        if response is None:
+            return self.feedback()
+        return self.feedback(response.status_code, response.headers.get('Retry-After'))
+
+    def stats(self) -> Dict:
+        return {'rate': round(self.rate, 3), 'successes': self.successes,
+                'throttled': self.throttled, 'errors': self.errors}
+
+
+class HostRateLimiters:
+    """各主機的自適應速率限制器（同一主機的所有請求共用一個）"""
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'HostRateLimiters':
+        """同一行程共用的限制器（各收集器實例與執行緒共用主機的速率狀態）"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def get(self, host_or_url: str, **settings) -> AdaptiveRateLimiter:
+        """取得主機的限制器；第一次使用時以 settings 建立，之後沿用已調整的速率"""
+        host = (urlsplit(host_or_url).hostname if '://' in host_or_url else host_or_url).lower()
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = AdaptiveRateLimiter(**settings)
+            return limiter
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {host: limiter.stats() for host, limiter in self._limiters.items()}
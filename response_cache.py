@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API 回應快取
+以「目錄世代 + 正規化查詢」為鍵的 LRU 快取，並以 single-flight 合併同時發生的相同查詢
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+
+class CachedResponse:
+    """已序列化的回應內容與其強 ETag"""
+
+    __slots__ = ('body', 'etag')
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class _Flight:
+    """進行中的計算，供相同鍵的其他請求等待結果"""
+
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ResponseCache:
+    """世代版本化的 LRU 回應快取"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._generation = None
+        self._lock = threading.Lock()
+
+        # 統計
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, generation: int, key: Hashable,
+                       compute: Callable[[], bytes]) -> CachedResponse:
+        """取得快取的回應；未命中時只由一個請求執行 compute，其餘請求等待其結果"""
+        full_key = (generation, key)
+
+        with self._lock:
+            # 目錄世代前進時，舊世代的快取全部失效
+            if generation != self._generation:
+                self._entries.clear()
+                self._generation = generation
+
+            entry = self._entries.get(full_key)
+            if entry is not None:
+                self._entries.move_to_end(full_key)
+                self.hits += 1
+                return entry
+
+            self.misses += 1
+            flight = self._inflight.get(full_key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[full_key] = flight
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            entry = CachedResponse(compute())
+            flight.result = entry
+
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[full_key] = entry
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+
+            return entry
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(full_key, None)
+            flight.event.set()
+
+    def clear(self):
+        """清除所有快取"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """取得快取統計"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'generation': self._generation
+            }
@@ -27,8 +27,7 @@ def main():
         from multi_source_radio_collector import MultiSourceRadioCollector
         
         collector = MultiSourceRadioCollector()
-        result = collector.collect_all_stations()
-        collector.sync_stations_to_db(result)
+        result = collector.collect_all_stations(commit_incrementally=True)
         
         print(f"✅ 成功收集 {result['total_unique']} 個電台")
         
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+電台去重引擎
+以 (名稱鍵, 正規化串流 URL) 為唯一標識，字典索引 O(1) 判斷重複並依來源優先級保留，
+統計各來源之間的碰撞次數
+"""
+import hashlib
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+# 預設連接埠（正規化時移除）
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# 追蹤/播放器用的查詢參數（不影響串流內容，正規化時移除）
+TRACKING_QUERY_PARAMS = {
+    'ref', 'source', 'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid',
+    'partnerid', 'listenerid', 'listening-from-radio-garden', 'awparams', 'cb', 'nocache', '_',
+    'aw_0_req.gdpr', 'aw_0_1st.playerid', 'aw_0_1st.skey', 'aw_0_azn.planguage',
+}
+TRACKING_QUERY_PREFIXES = ('utm_', 'aw_0_')
+
+# TuneIn 的 Tune.ashx 串流連結：同一電台的各種寫法（不同主機、formats、partnerId）以 id 為準
+TUNEIN_HOSTS = ('radiotime.com', 'tunein.com')
+
+
+def station_name_key(name: str) -> str:
+    """跨來源去重用的名稱比對鍵（與 URL 組合為唯一標識）"""
+    return (name or '').lower().strip()
+
+
+def canonical_stream_url(url: str) -> str:
+    """將串流 URL 正規化為比對用的形式
+
+    - http / https 視為相同（不保留 scheme）
+    - 主機名稱小寫、移除預設連接埠與結尾的點
+    - 移除路徑結尾的斜線、追蹤用查詢參數與 fragment，其餘參數排序
+    - TuneIn Tune.ashx 連結統一為 tunein:<id>
+    """
+    url = (url or '').strip()
+    if not url:
+        return ''
+
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url.lower()
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    if not host:
+        return url.lower()
+
+    query = parse_qsl(parts.query, keep_blank_values=True)
+
+    if host.endswith(TUNEIN_HOSTS) and parts.path.lower().endswith('/tune.ashx'):
+        station_id = next((value for key, value in query if key.lower() == 'id' and value), None)
+        if station_id:
+            return f'tunein:{station_id.lower()}'
+
+    netloc = f'[{host}]' if ':' in host else host
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc = f'{netloc}:{port}'
+
+    path = parts.path.rstrip('/')
+    kept = sorted(
+        (key, value) for key, value in query
+        if key.lower() not in TRACKING_QUERY_PARAMS and not key.lower().startswith(TRACKING_QUERY_PREFIXES)
+    )
+    return urlunsplit(('', netloc, path, urlencode(kept), '')).lstrip('/')
+
+
+def station_dedup_key(station: Dict) -> Tuple[str, str]:
+    """電台的去重鍵 (名稱鍵, 正規化 URL)"""
+    return station_name_key(station.get('name', '')), canonical_stream_url(station.get('url', ''))
+
+
+class _CollisionStats:
+    """碰撞統計：各來源被略過/被取代的次數，以及 (被略過來源, 保留來源) 的組合"""
+
+    def __init__(self):
+        self.duplicates = 0
+        self.by_source = {}     # 被略過的來源 → 次數
+        self.pairs = {}         # (被略過的來源, 保留的來源) → 次數
+
+    def record(self, dropped_source: str, kept_source: str):
+        self.duplicates += 1
+        self.by_source[dropped_source] = self.by_source.get(dropped_source, 0) + 1
+        pair = (dropped_source, kept_source)
+        self.pairs[pair] = self.pairs.get(pair, 0) + 1
+
+    def collision_stats(self) -> Dict:
+        return {
+            'duplicates': self.duplicates,
+            'by_source': dict(self.by_source),
+            'pairs': {f'{dropped}->{kept}': count for (dropped, kept), count in sorted(self.pairs.items())}
+        }
+
+
+class StationDeduplicator(_CollisionStats):
+    """字典索引去重：去重鍵 → 保留的電台；較高優先級（數值較小）的來源取代已保留的電台"""
+
+    def __init__(self, priority: Callable[[str], int]):
+        super().__init__()
+        self.priority = priority
+        self.index = {}
+
+    def add(self, station: Dict) -> bool:
+        """加入電台，回傳是否被保留（新電台或取代了較低優先級的電台）"""
+        key = station_dedup_key(station)
+        kept = self.index.get(key)
+        source = station.get('source_api', '') or 'unknown'
+
+        if kept is None:
+            self.index[key] = station
+            return True
+
+        kept_source = kept.get('source_api', '') or 'unknown'
+        if self.priority(source) < self.priority(kept_source):
+            self.index[key] = station
+            self.record(kept_source, source)
+            return True
+
+        self.record(source, kept_source)
+        return False
+
+    def stations(self) -> List[Dict]:
+        """保留的電台，依來源優先級排序（同優先級維持加入順序）"""
+        return sorted(self.index.values(), key=lambda s: self.priority(s.get('source_api', '')))
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+class DigestDeduplicator(_CollisionStats):
+    """串流去重：規則同 StationDeduplicator，但只保留 8 位元組摘要與來源優先級，不保留電台資料
+
+    同一來源保留第一筆；較高優先級來源已出現的電台直接略過。較低優先級來源先出現的情況
+    由資料庫同步時的跨來源優先級處理取代。
+    """
+
+    def __init__(self, priority: Callable[[str], int]):
+        super().__init__()
+        self.priority = priority
+        self._seen = {}     # 摘要 → (來源優先級, 來源)
+
+    @staticmethod
+    def _digest(station: Dict) -> bytes:
+        name_key, url_key = station_dedup_key(station)
+        return hashlib.blake2b(f'{name_key}\n{url_key}'.encode('utf-8'), digest_size=8).digest()
+
+    def accept(self, station: Dict) -> bool:
+        digest = self._digest(station)
+        source = station.get('source_api', '') or 'unknown'
+        priority = self.priority(source)
+        seen = self._seen.get(digest)
+        if seen is not None and seen[0] <= priority:
+            self.record(source, seen[1])
+            return False
+        if seen is not None:
+            self.record(seen[1], source)
+        self._seen[digest] = (priority, source)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._seen)
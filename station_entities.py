@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨來源電台實體解析
+同一個廣播電台常以不同名稱/鏡像串流出現在多個來源（手動、TuneIn 各子分類、Radio Browser），
+以名稱 n-gram 的 MinHash/LSH 與串流主機/首頁分塊找出候選配對，驗證後以 union-find 分群
+（名稱相似之外須有主機、首頁、頻率或呼號等佐證，合併不跨國家、比對雙方群的主要電台且限制群的大小，
+避免「XX人民广播电台」或 Radio 1 之類的常見名稱串連成大群），
+每群指定主要電台與穩定的 entity_id，並合併各來源的中繼資料與備用串流 URL
+"""
+import re
+import json
+import math
+import hashlib
+import logging
+import unicodedata
+from array import array
+from itertools import combinations
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+
+# MinHash 雜湊排列使用的梅森質數（排列參數由固定種子產生，確保每次解析結果一致）
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = _MERSENNE_PRIME
+
+_NON_WORD = re.compile(r'[\W_]+', re.UNICODE)
+_DIGITS = re.compile(r'\d+')
+# FM 頻率（如 107.7、FM96.3）與呼號（如 XHCPN-FM、KQED）
+_FREQUENCY = re.compile(r'(?<![\d.])\d{2,3}\.\d{1,2}(?![\d.])')
+_CALL_SIGN = re.compile(r'\b(?:[KWXC][A-Z]{2,3}-(?:FM|AM)|[KW][A-Z]{3})\b')
+
+
+def normalize_entity_name(name: str) -> str:
+    """實體比對用的名稱：全形轉半形、小寫、移除空白與標點（保留中日韓文字與數字）"""
+    return _NON_WORD.sub('', unicodedata.normalize('NFKC', name or '').lower())
+
+
+def name_shingles(name: str, size: int = 3) -> Set[str]:
+    """名稱的字元 n-gram 集合（名稱短於 n 時以整個名稱為一個片段）"""
+    normalized = normalize_entity_name(name)
+    if len(normalized) <= size:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+
+def stream_host(canonical_url: str) -> str:
+    """正規化 URL 的主機部分（TuneIn tunein:<id> 沒有主機，回傳空字串）"""
+    if not canonical_url or canonical_url.startswith('tunein:'):
+        return ''
+    return canonical_url.split('/', 1)[0]
+
+
+class MinHasher:
+    """以 (a·h + b) mod p 模擬多個雜湊排列的 MinHash"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        self.num_perm = num_perm
+        self.permutations = []
+        for i in range(num_perm):
+            digest = hashlib.blake2b(f'{seed}:{i}'.encode(), digest_size=16).digest()
+            a = int.from_bytes(digest[:8], 'little') % (_MERSENNE_PRIME - 1) + 1
+            b = int.from_bytes(digest[8:], 'little') % _MERSENNE_PRIME
+            self.permutations.append((a, b))
+        # 片段 → 各排列的雜湊值（不同電台的片段大量重複，每個片段只計算一次）
+        self._shingle_hashes = {}
+
+    def _hashes(self, shingle: str) -> array:
+        hashes = self._shingle_hashes.get(shingle)
+        if hashes is None:
+            h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+            prime = _MERSENNE_PRIME
+            hashes = array('Q', [(a * h + b) % prime for a, b in self.permutations])
+            self._shingle_hashes[shingle] = hashes
+        return hashes
+
+    def signature(self, shingles: Iterable[str]) -> Tuple[int, ...]:
+        vectors = [self._hashes(shingle) for shingle in shingles]
+        if not vectors:
+            return (_MAX_HASH,) * self.num_perm
+        return tuple(map(min, zip(*vectors)))
+
+
+def name_digits(name: str) -> Tuple[frozenset, frozenset]:
+    """名稱中的數字：(正規化名稱中的連續數字, 原始名稱中以標點分隔的數字)
+
+    正規化會移除標點，Hit FM 10.77 與 Hit FM 107.7 都成為 hitfm1077，須以原始名稱的數字區分
+    """
+    return (frozenset(_DIGITS.findall(normalize_entity_name(name))),
+            frozenset(_DIGITS.findall(unicodedata.normalize('NFKC', name or ''))))
+
+
+def name_frequencies(name: str) -> frozenset:
+    """名稱中的 FM 頻率（64–108 MHz），正規化為一位小數"""
+    values = (float(value) for value in _FREQUENCY.findall(unicodedata.normalize('NFKC', name or '')))
+    return frozenset(f'{value:.1f}' for value in values if 64 <= value <= 108)
+
+
+def call_signs(name: str) -> frozenset:
+    """名稱中的廣播呼號（不含 -FM/-AM 後綴）"""
+    return frozenset(sign.split('-', 1)[0] for sign in _CALL_SIGN.findall(unicodedata.normalize('NFKC', name or '')))
+
+
+def canonical_homepage(url: str) -> str:
+    """比對用的首頁：小寫，去除協定、www.、查詢字串與結尾斜線"""
+    url = re.sub(r'^[a-z][a-z0-9+.-]*://', '', (url or '').strip().lower())
+    url = url.split('#', 1)[0].split('?', 1)[0]
+    if url.startswith('www.'):
+        url = url[4:]
+    return url.rstrip('/')
+
+
+def normalize_country(country: str) -> str:
+    """比對用的國家名稱；未知的國家回傳空字串"""
+    country = (country or '').strip().lower()
+    return '' if country in ('', 'unknown') else country
+
+
+class _NameSimilarity:
+    """不重複名稱之間以片段 IDF 加權的 Jaccard 相似度與包含度（常見片段的權重低）"""
+
+    def __init__(self, shingles: Sequence[frozenset], weights: Dict[str, float]):
+        self.shingles = shingles
+        self.weights = weights
+        self.totals = [sum(weights[shingle] for shingle in name_shingle_set) for name_shingle_set in shingles]
+        self._cache = {}
+
+    def _shared(self, left: int, right: int) -> float:
+        key = (left, right) if left < right else (right, left)
+        shared = self._cache.get(key)
+        if shared is None:
+            weights = self.weights
+            shared = self._cache[key] = sum(weights[shingle] for shingle in self.shingles[left] & self.shingles[right])
+        return shared
+
+    def jaccard(self, left: int, right: int) -> float:
+        shared = self._shared(left, right)
+        union = self.totals[left] + self.totals[right] - shared
+        return shared / union if union > 0 else 0.0
+
+    def containment(self, left: int, right: int) -> float:
+        """較短（權重較小）的名稱有多少比例出現在另一個名稱中"""
+        smaller = min(self.totals[left], self.totals[right])
+        return self._shared(left, right) / smaller if smaller > 0 else 0.0
+
+
+class _StationFeatures:
+    """實體比對用的各電台特徵（以電台列索引存取）"""
+
+    def __init__(self, rows: Sequence[tuple], row_names: List[int], distinctive: List[bool],
+                 hosts: List[str], homepages: List[str], similarity: _NameSimilarity):
+        self.names = row_names                  # 不重複名稱的索引（沒有名稱時為 None）
+        self.distinctive = distinctive          # 名稱 → 是否含有非常見片段
+        self.digits = [name_digits(row[1]) for row in rows]
+        self.frequencies = [name_frequencies(row[1]) for row in rows]
+        self.call_signs = [call_signs(row[1]) for row in rows]
+        self.hosts = hosts                      # 可作為佐證的串流主機（共用者為空字串）
+        self.homepages = homepages              # 可作為佐證的首頁（共用者為空字串）
+        self.countries = [normalize_country(row[14]) for row in rows]
+        self.similarity = similarity
+
+
+class _UnionFind:
+    def __init__(self, countries: Sequence[str], order_keys: Sequence[tuple]):
+        self.parent = list(range(len(countries)))
+        self.size = [1] * len(countries)
+        self.countries = [{country} if country else set() for country in countries]   # 群內已知的國家
+        self.order_keys = order_keys
+        self.primary = list(range(len(countries)))      # 群的主要電台（order_keys 最小者）
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, left: int, right: int, same_stream: bool = False):
+        """合併兩群；群大小以串流計算，相同串流的合併不增加大小"""
+        left, right = self.find(left), self.find(right)
+        if left != right:
+            root, child = min(left, right), max(left, right)
+            self.parent[child] = root
+            if same_stream:
+                self.size[root] = max(self.size[root], self.size[child])
+            else:
+                self.size[root] += self.size[child]
+            self.countries[root] |= self.countries[child]
+            self.countries[child] = set()
+            self.primary[root] = min(self.primary[root], self.primary[child], key=self.order_keys.__getitem__)
+
+    def can_join(self, left: int, right: int, max_size: int, same_host: bool) -> bool:
+        """名稱比對的合併條件：合併後不超過 max_size 個串流，且國家不衝突（同串流主機時不檢查國家）"""
+        left, right = self.find(left), self.find(right)
+        if left == right:
+            return True
+        if self.size[left] + self.size[right] > max_size:
+            return False
+        return same_host or len(self.countries[left] | self.countries[right]) <= 1
+
+
+class StationEntityResolver:
+    """將 radio_stations 分群為實體，寫入 entity_id / entity_primary / alternate_urls / entity_metadata
+
+    名稱相似只用來找候選，合併還須有佐證：相同的串流主機或首頁（只被少數名稱使用者，
+    共用 CDN 或電台集團的首頁不算）、相同的頻率或呼號，或名稱完全相同且國家相同。
+    名稱相似度以 IDF 加權（「人民广播电台」「综合广播」這類常見片段權重低，也不參與 MinHash），
+    合併兩群時比對雙方的主要電台，不因群內其他成員相似而串連。
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.6,
+                 containment_threshold: float = 0.85, max_block_size: int = 200, max_cluster_size: int = 50,
+                 max_shared_names: int = 4, common_shingle_df: int = 20, max_band_pairs: int = 20000):
+        if num_perm % bands:
+            raise ValueError('num_perm 必須是 bands 的倍數')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.threshold = threshold                  # 名稱加權 Jaccard 相似度門檻
+        self.containment_threshold = containment_threshold  # 名稱加權包含度門檻（ICRT 與 ICRT FM100.7）
+        self.max_block_size = max_block_size        # 過大的分塊（常見名稱片段、常見名稱的各群）不展開配對
+        self.max_cluster_size = max_cluster_size    # 名稱比對合併的群大小上限（相同串流的合併不受限）
+        self.max_shared_names = max_shared_names    # 串流主機/首頁被超過此數量的名稱使用時不視為佐證
+        self.common_shingle_df = common_shingle_df  # 出現在超過此數量名稱中的片段視為常見片段
+        self.max_band_pairs = max_band_pairs        # 每段 LSH 簽章最多展開的配對數（由小的分桶優先展開）
+        self.logger = logging.getLogger(__name__)
+
+    def resolve(self, conn) -> Dict:
+        """對整個目錄執行實體解析並寫回有變動的電台（須在寫入交易內呼叫），回傳統計"""
+        changes, stats = self.plan(conn)
+        self.apply(conn, changes)
+        return stats
+
+    @staticmethod
+    def apply(conn, changes: List[tuple]):
+        """寫回 plan 算出的實體欄位變動（須在寫入交易內呼叫）"""
+        if changes:
+            conn.executemany('''
+                UPDATE radio_stations
+                SET entity_id = ?, entity_primary = ?, alternate_urls = ?, entity_metadata = ?
+                WHERE id = ?
+            ''', changes)
+
+    def plan(self, conn) -> Tuple[List[tuple], Dict]:
+        """讀取整個目錄並計算實體分群（可在唯讀連線上執行），回傳 (實體欄位有變動的電台, 統計)"""
+        rows = conn.execute('''
+            SELECT id, name, canonical_url, url, source_api, source_priority,
+                   votes, clickcount, category, subcategory,
+                   entity_id, entity_primary, alternate_urls, entity_metadata, country, homepage
+            FROM radio_stations
+            ORDER BY id
+        ''').fetchall()
+        if not rows:
+            return [], {'stations': 0, 'entities': 0, 'merged_stations': 0, 'candidate_pairs': 0,
+                        'skipped_pairs': 0, 'changed': 0}
+
+        # 群的主要電台與 _entity_values 相同：來源優先級最高，其次投票數最多，最後 id 最小
+        clusters = _UnionFind([normalize_country(row[14]) for row in rows],
+                              [(row[5], -(row[6] or 0), row[0]) for row in rows])
+
+        # 1. 串流相同（正規化 URL）的電台直接歸為同一實體
+        first_row_by_url = {}
+        for index, row in enumerate(rows):
+            if row[2]:
+                clusters.union(first_row_by_url.setdefault(row[2], index), index, same_stream=True)
+
+        # 2. 不重複的正規化名稱（TuneIn 同一電台常出現在多個分類），之後的名稱比對只針對不重複的名稱進行
+        names = []              # 不重複的正規化名稱
+        name_rows = []          # 名稱 → 使用此名稱的電台列
+        name_index = {}
+        row_names = []          # 電台列 → 名稱（沒有名稱時為 None）
+        names_by_host = {}      # 串流主機 → 出現的名稱
+        names_by_homepage = {}  # 首頁 → 出現的名稱
+        hosts = [stream_host(row[2]) for row in rows]
+        homepages = [canonical_homepage(row[15]) for row in rows]
+        for index, row in enumerate(rows):
+            normalized = normalize_entity_name(row[1])
+            if not normalized:
+                row_names.append(None)
+                continue
+            name_id = name_index.get(normalized)
+            if name_id is None:
+                name_id = name_index[normalized] = len(names)
+                names.append(normalized)
+                name_rows.append([])
+            name_rows[name_id].append(index)
+            row_names.append(name_id)
+            if hosts[index]:
+                names_by_host.setdefault(hosts[index], set()).add(name_id)
+            if homepages[index]:
+                names_by_homepage.setdefault(homepages[index], set()).add(name_id)
+
+        # 只被少數名稱使用的串流主機與首頁才能作為同一電台的佐證
+        hosts = [host if host and len(names_by_host.get(host, ())) <= self.max_shared_names else '' for host in hosts]
+        homepages = [homepage if homepage and len(names_by_homepage.get(homepage, ())) <= self.max_shared_names else ''
+                     for homepage in homepages]
+
+        # 3. 片段的 IDF 權重；常見片段不參與 MinHash（全由常見片段組成的名稱仍以全部片段計算）
+        shingles = [frozenset(name_shingles(name)) for name in names]
+        document_frequency = {}
+        for name_shingle_set in shingles:
+            for shingle in name_shingle_set:
+                document_frequency[shingle] = document_frequency.get(shingle, 0) + 1
+        common_df = max(self.common_shingle_df, len(names) // 1000)
+        weights = {shingle: math.log(1 + len(names) / count) for shingle, count in document_frequency.items()}
+        rare_shingles = [frozenset(shingle for shingle in name_shingle_set if document_frequency[shingle] <= common_df)
+                         for name_shingle_set in shingles]
+        hasher = MinHasher(self.num_perm)
+        signatures = [hasher.signature(rare or name_shingle_set)
+                      for rare, name_shingle_set in zip(rare_shingles, shingles)]
+        similarity = _NameSimilarity(shingles, weights)
+
+        features = _StationFeatures(rows, row_names, [bool(rare) for rare in rare_shingles],
+                                    hosts, homepages, similarity)
+
+        # 4. 候選名稱配對：相似度高者先比對，合併時比對雙方群的主要電台
+        names_by_evidence = {}  # 頻率/呼號 → 出現的名稱
+        for index, name_id in enumerate(row_names):
+            if name_id is not None:
+                for key in features.frequencies[index] | features.call_signs[index]:
+                    names_by_evidence.setdefault(key, set()).add(name_id)
+        evidence_blocks = [indexes for blocks in (names_by_host, names_by_homepage)
+                           for indexes in blocks.values() if len(indexes) <= self.max_shared_names]
+        evidence_blocks += [indexes for indexes in names_by_evidence.values() if len(indexes) <= self.max_block_size]
+        candidates, skipped_pairs = self._candidate_pairs(signatures, rare_shingles, evidence_blocks)
+        candidates.update((name_id, name_id) for name_id, indexes in enumerate(name_rows) if len(indexes) > 1)
+        # 名稱不夠相似的配對不會通過 _is_match，先行排除再展開為電台配對
+        ranked = []
+        for left, right in candidates:
+            jaccard = similarity.jaccard(left, right)
+            if left == right or jaccard >= self.threshold or \
+                    similarity.containment(left, right) >= self.containment_threshold:
+                ranked.append((-jaccard, left, right))
+        ranked.sort()
+        for _, left, right in ranked:
+            for left_row, right_row in self._row_pairs(clusters, name_rows, left, right):
+                self._join(clusters, features, left_row, right_row)
+
+        members_by_root = {}
+        for index in range(len(rows)):
+            members_by_root.setdefault(clusters.find(index), []).append(index)
+
+        # 只寫回實體欄位有變動的電台
+        entity_ids = self._assign_entity_ids(rows, members_by_root)
+        current = {row[0]: tuple(row[10:14]) for row in rows}
+        changed = []
+        merged_stations = 0
+        for root, members in members_by_root.items():
+            if len(members) > 1:
+                merged_stations += len(members)
+            for station_id, values in self._entity_values(rows, members, entity_ids[root]):
+                if current[station_id] != values:
+                    changed.append(values + (station_id,))
+
+        return changed, {
+            'stations': len(rows),
+            'entities': len(members_by_root),
+            'merged_stations': merged_stations,
+            'candidate_pairs': len(candidates),
+            'skipped_pairs': skipped_pairs,
+            'changed': len(changed)
+        }
+
+    def _candidate_pairs(self, signatures: List[Tuple[int, ...]], rare_shingles: List[frozenset],
+                         evidence_blocks: List[Set[int]]) -> Tuple[Set[Tuple[int, int]], int]:
+        """以名稱 MinHash 的 LSH 分桶，以及共用佐證（串流主機、首頁、頻率、呼號）的名稱分塊產生候選名稱配對
+
+        回傳 (候選配對, 因超過每段配對上限而略過的配對數)
+        """
+        pairs = set()
+        skipped = 0
+
+        # 名稱 MinHash 的 LSH 分桶：任一段簽章完全相同的名稱成為候選；
+        # 每段由小的分桶（較獨特的名稱）優先展開，總數不超過 max_band_pairs
+        rows_per_band = self.rows_per_band
+        for band in range(self.bands):
+            buckets = {}
+            start = band * rows_per_band
+            for index, signature in enumerate(signatures):
+                buckets.setdefault(signature[start:start + rows_per_band], []).append(index)
+            band_pairs = 0
+            for indexes in sorted((indexes for indexes in buckets.values() if 1 < len(indexes) <= self.max_block_size),
+                                  key=len):
+                count = len(indexes) * (len(indexes) - 1) // 2
+                if band_pairs + count > self.max_band_pairs:
+                    skipped += count
+                    continue
+                band_pairs += count
+                pairs.update(combinations(indexes, 2))
+
+        # 共用佐證的名稱（鏡像/不同掛載點、同一首頁、同一頻率），名稱可能只是互相包含（ICRT 與 ICRT FM100.7）；
+        # 較大的分塊（常見頻率）只配對共用非常見片段的名稱
+        for indexes in evidence_blocks:
+            if len(indexes) <= self.max_shared_names:
+                pairs.update(combinations(sorted(indexes), 2))
+                continue
+            names_by_shingle = {}
+            for index in indexes:
+                for shingle in rare_shingles[index]:
+                    names_by_shingle.setdefault(shingle, []).append(index)
+            for members in names_by_shingle.values():
+                if len(members) > 1:
+                    pairs.update(combinations(sorted(members), 2))
+
+        return pairs, skipped
+
+    def _row_pairs(self, clusters: _UnionFind, name_rows: List[List[int]], left: int, right: int):
+        """候選名稱配對對應的電台配對：各群只取一列，名稱出現在過多群中（常見名稱）時不展開"""
+        if left != right and len(name_rows[left]) == 1 and len(name_rows[right]) == 1:
+            return ((name_rows[left][0], name_rows[right][0]),)
+        left_rows = list({clusters.find(index): index for index in name_rows[left]}.values())
+        right_rows = left_rows if left == right else \
+            list({clusters.find(index): index for index in name_rows[right]}.values())
+        if left == right:
+            if len(left_rows) * (len(left_rows) - 1) // 2 > self.max_block_size:
+                return []
+            return combinations(left_rows, 2)
+        if len(left_rows) * len(right_rows) > self.max_block_size:
+            return []
+        return ((left_row, right_row) for left_row in left_rows for right_row in right_rows)
+
+    def _join(self, clusters: _UnionFind, features: _StationFeatures, left: int, right: int) -> bool:
+        """兩群的主要電台相符時合併（國家衝突或超過群大小上限時不合併），回傳是否已合併"""
+        left_root, right_root = clusters.find(left), clusters.find(right)
+        if left_root == right_root:
+            return True
+        left_primary, right_primary = clusters.primary[left_root], clusters.primary[right_root]
+        hosts = features.hosts
+        same_host = bool(hosts[left_primary]) and hosts[left_primary] == hosts[right_primary]
+        if not clusters.can_join(left_root, right_root, self.max_cluster_size, same_host):
+            return False
+        if not self._is_match(features, left_primary, right_primary):
+            return False
+        clusters.union(left_root, right_root)
+        return True
+
+    def _is_match(self, features: _StationFeatures, left: int, right: int) -> bool:
+        """兩個電台是否為同一電台：名稱相似、數字/頻率/呼號不矛盾，且有名稱以外的佐證"""
+        left_name, right_name = features.names[left], features.names[right]
+        if left_name is None or right_name is None:
+            return False
+
+        # 名稱都含數字（頻率、台號）但沒有共同數字時視為不同電台，例如 Hit FM 107.7 與 Hit FM 90.1
+        for left_set, right_set in zip(features.digits[left], features.digits[right]):
+            if left_set and right_set and not (left_set & right_set):
+                return False
+        left_frequencies, right_frequencies = features.frequencies[left], features.frequencies[right]
+        left_signs, right_signs = features.call_signs[left], features.call_signs[right]
+        if (left_frequencies and right_frequencies and not (left_frequencies & right_frequencies)) or \
+                (left_signs and right_signs and not (left_signs & right_signs)):
+            return False
+
+        similarity = features.similarity
+        if left_name != right_name and similarity.jaccard(left_name, right_name) < self.threshold and \
+                similarity.containment(left_name, right_name) < self.containment_threshold:
+            return False
+
+        # 名稱相似之外的佐證；名稱完全相同時，同一國家（且名稱不是全由常見片段組成）也可作為佐證
+        if features.hosts[left] and features.hosts[left] == features.hosts[right]:
+            return True
+        if features.homepages[left] and features.homepages[left] == features.homepages[right]:
+            return True
+        if left_frequencies & right_frequencies or left_signs & right_signs:
+            return True
+        country = features.countries[left]
+        return left_name == right_name and features.distinctive[left_name] and \
+            bool(country) and country == features.countries[right]
+
+    @staticmethod
+    def _assign_entity_ids(rows: List[tuple], members_by_root: Dict[int, List[int]]) -> Dict[int, str]:
+        """為每群決定 entity_id（群的根 → ID）
+
+        沿用群內電台既有的 ID，主要電台或名稱改變時 ID 不變；同一 ID 只分配給一群
+        （群分裂時由持有者最多的群沿用）。沒有可沿用的 ID 時，由群內最小的正規化 URL 產生。
+        """
+        holders = {}
+        for root, members in members_by_root.items():
+            for index in members:
+                if rows[index][10]:
+                    key = (rows[index][10], root)
+                    holders[key] = holders.get(key, 0) + 1
+
+        entity_ids = {}
+        claimed = set()
+        for (entity_id, root), _ in sorted(holders.items(), key=lambda item: (-item[1], item[0])):
+            if entity_id not in claimed and root not in entity_ids:
+                entity_ids[root] = entity_id
+                claimed.add(entity_id)
+
+        for root, members in sorted(members_by_root.items()):
+            if root in entity_ids:
+                continue
+            key = min(rows[index][2] or f'#{rows[index][0]}' for index in members)
+            entity_id = 'e' + hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+            salt = 0
+            while entity_id in claimed:
+                salt += 1
+                entity_id = 'e' + hashlib.blake2b(f'{key}\n{salt}'.encode('utf-8'), digest_size=8).hexdigest()
+            entity_ids[root] = entity_id
+            claimed.add(entity_id)
+        return entity_ids
+
+    @staticmethod
+    def _entity_values(rows: List[tuple], members: List[int], entity_id: str):
+        """產生群內每個電台的 (entity_id, entity_primary, alternate_urls, entity_metadata)"""
+        # 主要電台：來源優先級最高，其次投票數最多，最後 id 最小
+        ordered = sorted(members, key=lambda index: (rows[index][5], -(rows[index][6] or 0), rows[index][0]))
+        primary = rows[ordered[0]]
+
+        if len(ordered) == 1:
+            yield primary[0], (entity_id, 1, None, None)
+            return
+
+        alternate_urls = []
+        seen_urls = {primary[2]}
+        sources = []
+        genres = []
+        votes = None
+        clickcount = None
+        for index in ordered:
+            row = rows[index]
+            if row[2] not in seen_urls:
+                seen_urls.add(row[2])
+                alternate_urls.append(row[3])
+            if row[4] not in sources:
+                sources.append(row[4])
+            if row[6] is not None:
+                votes = max(votes or 0, row[6])
+            if row[7] is not None:
+                clickcount = max(clickcount or 0, row[7])
+            for genre in (row[8], row[9]):
+                if genre and genre != 'unknown' and genre not in genres:
+                    genres.append(genre)
+
+        metadata = json.dumps({
+            'members': len(ordered),
+            'sources': sources,
+            'names': sorted({rows[index][1] for index in ordered}),
+            'votes': votes,
+            'clickcount': clickcount,
+            'genres': genres
+        }, ensure_ascii=False)
+
+        yield primary[0], (entity_id, 1, json.dumps(alternate_urls, ensure_ascii=False), metadata)
+        for index in ordered[1:]:
+            yield rows[index][0], (entity_id, 0, None, None)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+串流收集管線
+收集器（產生器）→ 正規化 → 去重 → 分批寫入資料庫，各階段之間以有界佇列銜接：
+寫入跟不上時收集器會被阻塞（背壓），記憶體用量不隨收集規模成長；
+每批獨立提交，中途當機時已寫入的電台會保留，下次同步再補齊
+"""
+import json
+import time
+import queue
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from multi_source_radio_collector import get_source_priority
+from station_dedup import DigestDeduplicator
+
+
+# 有界佇列的大小與每次提交的批次大小
+DEFAULT_QUEUE_SIZE = 2000
+DEFAULT_BATCH_SIZE = 500
+
+# 佇列操作的輪詢間隔（秒），用於檢查取消信號與時限
+POLL_INTERVAL = 0.5
+
+
+def normalize_station(station: Dict) -> Optional[Dict]:
+    """正規化單一電台：去除名稱/URL 前後空白、補齊預設欄位、metadata 轉為 JSON 字串；無 URL 時回傳 None"""
+    url = (station.get('url') or '').strip()
+    name = (station.get('name') or '').strip()
+    if not url or not name:
+        return None
+
+    station['url'] = url
+    station['name'] = name
+    for field in ('uuid', 'homepage', 'favicon', 'tags', 'country', 'language', 'codec',
+                  'source_api', 'source_type'):
+        if station.get(field) is None:
+            station[field] = ''
+    try:
+        station['bitrate'] = int(station.get('bitrate') or 0)
+    except (ValueError, TypeError):
+        station['bitrate'] = 0
+
+    metadata = station.get('metadata')
+    if metadata is None:
+        station['metadata'] = '{}'
+    elif not isinstance(metadata, str):
+        station['metadata'] = json.dumps(metadata)
+    return station
+
+
+class _SourceDone:
+    """來源結束的佇列標記"""
+
+    __slots__ = ('count', 'error')
+
+    def __init__(self, count: int, error: Exception = None):
+        self.count = count
+        self.error = error
+
+
+class StationPipeline:
+    """串流收集管線：各來源在獨立執行緒中產生並正規化電台，寫入端去重後分批提交"""
+
+    def __init__(self, collector, source_deadlines: Dict[str, float], batch_size: int = DEFAULT_BATCH_SIZE,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.collector = collector
+        self.source_deadlines = source_deadlines
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.logger = logging.getLogger(__name__)
+
+    def _put(self, item, cancel_event: threading.Event) -> bool:
+        """放入有界佇列（佇列滿時阻塞），取消信號被設定時放棄並回傳 False"""
+        while not cancel_event.is_set():
+            try:
+                self.queue.put(item, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self, source: str, cancel_event: threading.Event, tunein_mode: str):
+        """收集 + 正規化階段（在來源各自的執行緒中執行）"""
+        count = 0
+        error = None
+        try:
+            for station in self.collector.iter_source(source, cancel_event, tunein_mode):
+                station = normalize_station(station)
+                if station is None:
+                    continue
+                if not self._put((source, station), cancel_event):
+                    return
+                count += 1
+        except Exception as e:
+            error = e
+        self._put((source, _SourceDone(count, error)), cancel_event)
+
+    def run(self, sources: List[str], collection_stats: Dict, tunein_mode: str) -> Dict:
+        """執行管線，回傳格式同 collect_all_stations（stations 為空清單，電台已寫入資料庫）"""
+        run_id = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        deduplicator = DigestDeduplicator(get_source_priority)
+        self.collector.begin_sync_run(run_id)
+
+        cancel_events = {source: threading.Event() for source in sources}
+        start_times = {}
+        for source in sources:
+            start_times[source] = time.time()
+            threading.Thread(target=self._produce, args=(source, cancel_events[source], tunein_mode),
+                             name=f'collector-{source}', daemon=True).start()
+
+        active = set(sources)
+        batches = {source: [] for source in sources}     # 每個來源最多暫存 batch_size 個電台
+        group_scopes = {}
+        totals = {source: {'added': 0, 'updated': 0, 'deleted': 0} for source in sources}
+        failed_writes = set()
+        found = {source: 0 for source in sources}
+        sync_results = {}
+
+        def flush(source: str):
+            batch = batches[source]
+            if not batch:
+                return
+            try:
+                result = self.collector.sync_station_batch(run_id, batch)
+                group_scopes.update(result['group_scopes'])
+                for key in ('added', 'updated', 'deleted'):
+                    totals[source][key] += result[key]
+            except Exception as e:
+                # 有批次寫入失敗的來源不進行刪除，避免把未寫入的電台當成消失
+                self.logger.error(f"❌ {source} 批次寫入失敗 ({len(batch)} 個電台): {e}")
+                failed_writes.add(source)
+            batch.clear()
+
+        try:
+            while active:
+                now = time.time()
+                next_deadline = min(start_times[s] + self.source_deadlines.get(s, 3600) for s in active)
+                try:
+                    source, item = self.queue.get(timeout=max(0.0, min(next_deadline - now, POLL_INTERVAL)))
+                except queue.Empty:
+                    source, item = None, None
+
+                if source in active:
+                    if isinstance(item, _SourceDone):
+                        flush(source)
+                        active.discard(source)
+                        elapsed = time.time() - start_times[source]
+                        success = item.error is None and source not in failed_writes
+                        collection_stats[source] = {
+                            'stations_found': item.count,
+                            'time_seconds': elapsed,
+                            'success': item.error is None
+                        }
+                        if item.error is not None:
+                            collection_stats[source]['error'] = str(item.error)
+                            self.logger.error(f"❌ {source} 收集失敗: {item.error}")
+                        else:
+                            self.logger.info(f"✅ {source} 收集完成: {item.count} 個電台 ({elapsed:.1f} 秒)")
+                        sync_results[source] = self._finish(run_id, source, group_scopes, totals[source],
+                                                            elapsed, success)
+                    else:
+                        found[source] += 1
+                        if deduplicator.accept(item):
+                            batches[source].append(item)
+                            if len(batches[source]) >= self.batch_size:
+                                flush(source)
+
+                # 逾時的來源：發出取消信號，已寫入的批次保留，但不刪除消失的電台
+                now = time.time()
+                for source in list(active):
+                    deadline = self.source_deadlines.get(source, 3600)
+                    if now - start_times[source] >= deadline:
+                        cancel_events[source].set()
+                        active.discard(source)
+                        flush(source)
+                        collection_stats[source] = {
+                            'stations_found': found[source],
+                            'time_seconds': now - start_times[source],
+                            'success': False,
+                            'timed_out': True,
+                            'error': f'超過時限 {deadline:.0f} 秒'
+                        }
+                        self.logger.warning(f"⏰ {source} 超過時限 {deadline:.0f} 秒，已取消（已寫入的 {found[source]} 個電台保留，不刪除舊資料）")
+                        sync_results[source] = self._finish(run_id, source, group_scopes, totals[source],
+                                                            now - start_times[source], False)
+        finally:
+            for event in cancel_events.values():
+                event.set()
+            try:
+                self.collector.end_sync_run(run_id)
+            except Exception as e:
+                self.logger.error(f"❌ 同步輪次 {run_id} 清理失敗: {e}")
+
+        if 'tunein' in collection_stats:
+            collection_stats['tunein']['mode'] = tunein_mode
+
+        # 所有來源都寫入後才對整個目錄解析跨來源實體
+        try:
+            entity_stats = self.collector.resolve_entities()
+        except Exception as e:
+            self.logger.error(f"❌ 實體解析失敗: {e}")
+            entity_stats = {'error': str(e)}
+
+        total_found = sum(found.values())
+        collisions = deduplicator.collision_stats()
+        self.logger.info(f"🎯 串流收集完成: 原始 {total_found} 個，去重後 {len(deduplicator)} 個電台"
+                         f"（跳過 {collisions['duplicates']} 個重複）")
+        if collisions['duplicates']:
+            self.logger.info(f"🔄 重複組合 (略過 -> 保留): {collisions['pairs']}")
+
+        return {
+            'stations': [],
+            'stats': collection_stats,
+            'total_found': total_found,
+            'total_unique': len(deduplicator),
+            'dedup_collisions': collisions,
+            'collection_time': datetime.now().isoformat(),
+            'synced': True,
+            'sync_results': sync_results,
+            'sync_result': self.collector._merge_sync_results(sync_results.values()),
+            'entity_stats': entity_stats
+        }
+
+    def _finish(self, run_id: str, source: str, group_scopes: Dict, totals: Dict,
+                elapsed: float, delete_missing: bool) -> Dict:
+        try:
+            result = self.collector.finish_source_sync(run_id, source, group_scopes, totals, elapsed,
+                                                       delete_missing=delete_missing)
+            self.logger.info(f"💾 {source} 已同步: 新增 {result['added']}、更新 {result['updated']}、刪除 {result['deleted']}")
+            return result
+        except Exception as e:
+            self.logger.error(f"❌ {source} 同步失敗: {e}")
+            return {'added': 0, 'updated': 0, 'deleted': 0, 'total_operations': 0, 'error': str(e)}
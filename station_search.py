@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+電台全文檢索索引
+以 SQLite FTS5 建立名稱/標籤/國家/首頁的檢索索引，支援繁簡中文折疊與 BM25 排序
+"""
+import re
+import sqlite3
+import unicodedata
+from typing import Iterable, List
+
+
+# 常用繁體 → 簡體字對照（每組兩字：繁體在前、簡體在後）
+_TRAD_SIMP_PAIRS = '''
+臺台 颱台 灣湾 廣广 電电 聲声 樂乐 網网 華华 語语 國国 愛爱 東东 際际 聞闻 經经 濟济 體体 藝艺 學学
+會会 時时 間间 話话 說说 現现 實实 歡欢 們们 這这 來来 個个 為为 與与 開开 關关 門门 問问 題题 視视
+見见 親亲 觀观 記记 讀读 書书 寫写 號号 線线 綫线 級级 紅红 綠绿 藍蓝 銀银 鐵铁 鋼钢 錢钱 長长 張张
+陳陈 劉刘 黃黄 楊杨 趙赵 吳吴 鄭郑 鄧邓 蘇苏 羅罗 許许 謝谢 馮冯 韓韩 葉叶 園园 圓圆 團团 場场 報报
+壓压 戰战 戲戏 歲岁 歷历 曆历 氣气 漢汉 無无 點点 熱热 燈灯 爺爷 狀状 獨独 產产 畫画 當当 發发 髮发
+盡尽 監监 眾众 衆众 種种 穩稳 窮穷 節节 範范 築筑 簡简 紀纪 約约 紙纸 組组 結结 給给 統统 絲丝 續续
+總总 義义 習习 聖圣 聯联 聽听 肅肃 腦脑 興兴 舊旧 莊庄 萬万 蘭兰 處处 蟲虫 衛卫 衝冲 補补 裝装 製制
+複复 復复 規规 覺觉 訊讯 訪访 設设 評评 試试 詩诗 詞词 誠诚 調调 談谈 請请 論论 諾诺 證证 識识 譯译
+護护 變变 讓让 豐丰 貝贝 負负 財财 貨货 質质 購购 賽赛 贊赞 讚赞 趕赶 車车 軍军 輕轻 輪轮 轉转 農农
+運运 過过 達达 遠远 適适 選选 還还 邊边 鄉乡 醫医 針针 鐘钟 鍾钟 閃闪 閱阅 隊队 陽阳 陰阴 隨随 險险
+隱隐 雞鸡 雙双 雜杂 難难 雲云 靈灵 韻韵 響响 頁页 頂顶 項项 順顺 須须 頌颂 預预 領领 頻频 顏颜 顯显
+風风 飛飞 飯饭 館馆 馬马 駐驻 驗验 鬥斗 魚鱼 鳥鸟 鳴鸣 麗丽 麥麦 齊齐 齒齿 龍龙 龜龟 廳厅 廈厦 廟庙
+廠厂 應应 強强 彈弹 錄录 彙汇 徵征 從从 恆恒 悅悦 惡恶 態态 憶忆 懷怀 戀恋 戶户 擁拥 據据 擊击 擇择
+擴扩 攝摄 敵敌 數数 斷断 於于 昇升 晉晋 條条 極极 構构 標标 樓楼 樣样 橋桥 機机 檢检 權权 歐欧 歸归
+殺杀 沒没 況况 淚泪 淺浅 測测 湯汤 溫温 滿满 漁渔 潔洁 濤涛 灑洒 烏乌 煙烟 爭争 牆墙 獎奖 環环 瑪玛
+畢毕 異异 療疗 盤盘 碼码 礎础 禮礼 禱祷 稱称 穀谷 筆笔 箏筝 籃篮 糧粮 紐纽 純纯 細细 終终 綜综 維维
+練练 縣县 織织 繼继 職职 臉脸 舉举 艦舰 蒼苍 蓮莲 薦荐 藥药 蘋苹 虛虚 術术 裡里 覽览 計计 訂订
+訓训 託托 訴诉 診诊 詢询 該该 認认 誌志 誤误 課课 誰谁 豬猪 貓猫 貿贸 資资 賓宾 賣卖 賴赖 贏赢 趨趋
+跡迹 軟软 較较 載载 輸输 輯辑 辦办 邁迈 郵邮 鄰邻 釋释 鈴铃 錦锦 鍵键 鏡镜 閣阁 闆板 陸陆 雖虽 靜静
+頭头 願愿 類类 飄飘 養养 駕驾 騎骑 驚惊 鬧闹 魯鲁 鮮鲜 鳳凤 鴻鸿 鶴鹤 黨党 齡龄 優优 傳传 傷伤 價价
+億亿 儀仪 兒儿 兩两 內内 冊册 凱凯 劇剧 劍剑 動动 務务 勝胜 勞劳 區区 協协 參参 員员 啟启 單单 嚴严
+圖图 圍围 壇坛 壯壮 夢梦 夥伙 奮奋 婦妇 媽妈 孫孙 寧宁 寶宝 對对 專专 將将 尋寻 導导 屆届 屬属 島岛
+峽峡 嶺岭 師师 帶带 幣币 幫帮 庫库 彎弯 後后 徑径 憂忧 掃扫 掛挂 採采 揚扬 換换 損损 搖摇 撥拨 擔担
+攜携 敗败 敘叙 暉晖 暢畅 暫暂 曉晓 榮荣 檔档 欄栏 殘残 漸渐 潛潜 澤泽 濱滨 災灾 煉炼 燒烧 營营 爾尔
+牽牵 猶犹 獅狮 獻献 瑤瑶 瓊琼 盜盗 確确 禪禅 離离 穫获 獲获 窩窝 競竞 籌筹 籤签 紋纹 絕绝 絡络 緊紧
+緒绪 緣缘 編编 緯纬 縱纵 績绩 罷罢 聰聪 膚肤 臨临 蔣蒋 蕭萧 蘆芦 虧亏 蝦虾 襲袭 訣诀 詳详 誕诞 誼谊
+謀谋 謠谣 謹谨 譜谱 貞贞 貢贡 販贩 責责 貴贵 費费 貼贴 賀贺 賞赏 賢贤 贈赠 躍跃 軌轨 輔辅 輝辉 轟轰
+辭辞 遲迟 遷迁 遺遗 鋒锋 錯错 鍋锅 鎮镇 閒闲 闊阔 陣阵 霧雾 韋韦 頓顿 頒颁 顆颗 顧顾 餘余 騰腾 驅驱
+鬱郁 鹽盐 麼么 齋斋 瀋沈 滬沪 閩闽 贛赣 遼辽 龢和 妳你 綵彩 粵粤 鎖锁 頫俯
+'''
+
+_FOLD_TABLE = str.maketrans(dict(pair for pair in _TRAD_SIMP_PAIRS.split()))
+
+# CJK 字元（統一表意文字、擴充 A、相容表意文字、日文假名、韓文音節）
+_CJK_CHAR = re.compile('([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af])')
+
+# 與 FTS5 unicode61 分詞器一致的詞元（字母數字，底線視為分隔符）
+_TOKEN = re.compile(r'[^\W_]+')
+
+
+def fold_search_text(text: str) -> str:
+    """將文字正規化為索引/查詢用形式：全半形統一、小寫、繁轉簡、CJK 逐字分詞"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', str(text)).lower().translate(_FOLD_TABLE)
+    # 每個 CJK 字元成為獨立詞元，查詢時以片語比對相鄰字元
+    return _CJK_CHAR.sub(r' \1 ', text)
+
+
+def build_match_query(query: str, columns: Iterable[str] = None) -> str:
+    """將使用者輸入轉為 FTS5 MATCH 查詢字串；無有效詞元時回傳空字串
+
+    每個詞轉為片語（CJK 連續字元需相鄰），最後一個詞使用前綴比對以支援即時搜尋。
+    """
+    if not query:
+        return ''
+
+    normalized = unicodedata.normalize('NFKC', str(query)).lower().translate(_FOLD_TABLE)
+
+    phrases = []
+    for word in normalized.split():
+        tokens = _TOKEN.findall(_CJK_CHAR.sub(r' \1 ', word))
+        if tokens:
+            phrases.append('"' + ' '.join(tokens) + '"')
+
+    if not phrases:
+        return ''
+
+    phrases[-1] += '*'
+    match = ' '.join(phrases)
+
+    if columns:
+        match = '{' + ' '.join(columns) + '}: (' + match + ')'
+
+    return match
+
+
+class StationSearchIndex:
+    """radio_stations 的 FTS5 檢索索引維護器"""
+
+    TABLE = 'radio_stations_fts'
+    COLUMNS = ('name', 'tags', 'country', 'homepage')
+
+    # BM25 欄位權重：名稱 > 標籤 > 國家 > 首頁
+    BM25_WEIGHTS = (10.0, 4.0, 2.0, 1.0)
+
+    def rank_expression(self) -> str:
+        """BM25 排序運算式（數值越小越相關）"""
+        weights = ', '.join(str(w) for w in self.BM25_WEIGHTS)
+        return f'bm25({self.TABLE}, {weights})'
+
+    def _register_functions(self, conn: sqlite3.Connection):
+        try:
+            conn.create_function('fold_search_text', 1, fold_search_text, deterministic=True)
+        except sqlite3.OperationalError:
+            # 已註冊過且連線上仍有進行中的語句（如 FTS5 刪除）時無法重新定義，沿用既有的註冊
+            pass
+
+    def ensure_schema(self, conn: sqlite3.Connection):
+        """建立 FTS5 表；若索引為空但已有電台資料則自動重建"""
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {self.TABLE}
+            USING fts5({', '.join(self.COLUMNS)}, tokenize = 'unicode61')
+        ''')
+
+        cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {self.TABLE})')
+        indexed = cursor.fetchone()[0]
+        cursor.execute('SELECT EXISTS (SELECT 1 FROM radio_stations)')
+        has_stations = cursor.fetchone()[0]
+
+        if has_stations and not indexed:
+            self.rebuild(conn)
+
+    def rebuild(self, conn: sqlite3.Connection):
+        """完整重建索引"""
+        self._register_functions(conn)
+        cursor = conn.cursor()
+        cursor.execute(f'DELETE FROM {self.TABLE}')
+        cursor.execute(f'''
+            INSERT INTO {self.TABLE} (rowid, {', '.join(self.COLUMNS)})
+            SELECT id, {', '.join(f'fold_search_text({c})' for c in self.COLUMNS)}
+            FROM radio_stations
+        ''')
+
+    def index_stations(self, conn: sqlite3.Connection, station_ids: List[int]):
+        """重新索引指定 id 的電台（新增或更新後呼叫）"""
+        if not station_ids:
+            return
+        self._register_functions(conn)
+        cursor = conn.cursor()
+        params = [(station_id,) for station_id in station_ids]
+        cursor.executemany(f'DELETE FROM {self.TABLE} WHERE rowid = ?', params)
+        cursor.executemany(f'''
+            INSERT INTO {self.TABLE} (rowid, {', '.join(self.COLUMNS)})
+            SELECT id, {', '.join(f'fold_search_text({c})' for c in self.COLUMNS)}
+            FROM radio_stations WHERE id = ?
+        ''', params)
+
+    def remove_stations(self, conn: sqlite3.Connection, station_ids: List[int]):
+        """從索引移除指定 id 的電台（刪除後呼叫）"""
+        if not station_ids:
+            return
+        conn.executemany(f'DELETE FROM {self.TABLE} WHERE rowid = ?',
+                         [(station_id,) for station_id in station_ids])
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+電台序列化
+各查詢共用的「資料列 → 電台資料 → JSON」轉換：欄位投影、標籤陣列快取、
+可選的 orjson 編碼，以及將預先序列化的片段直接拼接進回應
+"""
+import json
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# 公開欄位 → radio_stations 欄位（依 API 輸出順序）
+STATION_COLUMNS = {
+    'uuid': 'uuid',
+    'name': 'name',
+    'url': 'url',
+    'homepage': 'homepage',
+    'favicon': 'favicon',
+    'tags': 'tags',
+    'country': 'country',
+    'language': 'language',
+    'codec': 'codec',
+    'bitrate': 'bitrate',
+    'source_api': 'source_api',
+    'source_type': 'source_type',
+    'collection_date': 'collection_date',
+    'metadata': 'metadata',
+    'entity_id': 'entity_id',
+    'alternate_urls': 'alternate_urls',
+    'entity': 'entity_metadata',
+}
+
+# 列表/搜尋預設輸出的欄位
+DEFAULT_FIELDS = ('uuid', 'name', 'url', 'homepage', 'favicon', 'tags', 'country',
+                  'language', 'codec', 'bitrate', 'source_api', 'source_type')
+
+# 匯出額外包含收集時間與原始中繼資料
+EXPORT_FIELDS = DEFAULT_FIELDS + ('collection_date', 'metadata')
+
+# 合併實體（collapse=1）時額外輸出實體 id、其他來源的備用串流與合併後的中繼資料
+ENTITY_FIELDS = ('entity_id', 'alternate_urls', 'entity')
+COLLAPSED_FIELDS = DEFAULT_FIELDS + ENTITY_FIELDS
+
+
+def dumps(obj) -> bytes:
+    """編碼為 UTF-8 JSON（有安裝 orjson 時使用 orjson）"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+@lru_cache(maxsize=8192)
+def split_tags(tags: str) -> Tuple[str, ...]:
+    """將逗號分隔的標籤字串轉為陣列（相同字串只切割一次）"""
+    return tuple(tags.split(',')) if tags else ()
+
+
+def decode_alternate_urls(alternate_urls: str) -> List[str]:
+    """備用串流 URL（JSON 陣列字串，單一來源的電台為 NULL）"""
+    return json.loads(alternate_urls) if alternate_urls else []
+
+
+def decode_entity_metadata(entity_metadata: str) -> Optional[Dict]:
+    """跨來源合併的中繼資料（JSON 字串，單一來源的電台為 NULL）"""
+    return json.loads(entity_metadata) if entity_metadata else None
+
+
+# 以 JSON 字串儲存、輸出前需解碼的欄位
+JSON_FIELD_DECODERS = {
+    'alternate_urls': decode_alternate_urls,
+    'entity': decode_entity_metadata,
+}
+
+
+def parse_fields(spec: str, allowed: Sequence[str] = DEFAULT_FIELDS) -> Tuple[str, ...]:
+    """解析 fields= 參數（逗號分隔），未指定時回傳全部欄位；含未知欄位時拋出 ValueError"""
+    if not spec or not spec.strip():
+        return tuple(allowed)
+
+    fields = []
+    for field in spec.split(','):
+        field = field.strip()
+        if not field or field in fields:
+            continue
+        if field not in allowed:
+            raise ValueError(f'未知的欄位: {field}（可用欄位: {", ".join(allowed)}）')
+        fields.append(field)
+
+    # 保持 API 既有的欄位順序
+    return tuple(field for field in allowed if field in fields)
+
+
+class RawJSON:
+    """已編碼的 JSON 片段，由 encode_payload 原樣拼接"""
+
+    __slots__ = ('encoded',)
+
+    def __init__(self, encoded: bytes):
+        self.encoded = encoded
+
+    @classmethod
+    def array(cls, items: Iterable[bytes]) -> 'RawJSON':
+        """由已編碼的元素組成 JSON 陣列"""
+        return cls(b'[' + b','.join(items) + b']')
+
+
+def encode_payload(payload: Dict) -> bytes:
+    """編碼回應外層物件；值為 RawJSON 時直接拼接，不再重新編碼"""
+    parts = []
+    for key, value in payload.items():
+        encoded = value.encoded if isinstance(value, RawJSON) else dumps(value)
+        parts.append(dumps(key) + b':' + encoded)
+    return b'{' + b','.join(parts) + b'}'
+
+
+class StationSerializer:
+    """依欄位投影產生 SELECT 欄位清單，並將資料列轉為電台資料"""
+
+    def __init__(self, fields: Sequence[str] = DEFAULT_FIELDS):
+        self.fields = tuple(fields)
+        self._tags_index = self.fields.index('tags') if 'tags' in self.fields else None
+        self._decoders = [(field, decoder) for field, decoder in JSON_FIELD_DECODERS.items() if field in self.fields]
+
+    def select_sql(self, prefix: str = '') -> str:
+        """SELECT 欄位清單（只讀取需要的欄位）"""
+        return ', '.join(f'{prefix}{STATION_COLUMNS[field]}' for field in self.fields)
+
+    def row_to_dict(self, row: Sequence) -> Dict:
+        """將資料列（前 len(fields) 欄依 fields 順序）轉為電台資料"""
+        station = dict(zip(self.fields, row))
+        if self._tags_index is not None:
+            station['tags'] = split_tags(row[self._tags_index])
+        for field, decoder in self._decoders:
+            station[field] = decoder(station[field])
+        return station
+
+    def rows_to_dicts(self, rows: Iterable[Sequence]) -> List[Dict]:
+        return [self.row_to_dict(row) for row in rows]
+
+    def row_to_json(self, row: Sequence) -> bytes:
+        return dumps(self.row_to_dict(row))
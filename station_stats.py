@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+電台統計摘要表
+以觸發器在寫入 radio_stations 的同一交易中維護各維度計數，統計與健康檢查只需查表
+"""
+import sqlite3
+from typing import Dict
+
+
+# 比特率分組（與觸發器中的 SQL 運算式一致）
+_BITRATE_BUCKET_SQL = '''
+    CASE
+        WHEN COALESCE({col}, 0) <= 0 THEN 'unknown'
+        WHEN {col} < 64 THEN '<64'
+        WHEN {col} < 128 THEN '64-127'
+        WHEN {col} < 192 THEN '128-191'
+        WHEN {col} < 256 THEN '192-255'
+        ELSE '256+'
+    END
+'''
+
+
+class StationStatsTables:
+    """station_stats 摘要表的結構與查詢"""
+
+    TABLE = 'station_stats'
+
+    # 維度名稱 → radio_stations 欄位運算式（{row} 會替換為 NEW / OLD / 資料表名稱）
+    DIMENSIONS = {
+        'total': "''",
+        'source': "COALESCE({row}.source_api, '')",
+        'country': "COALESCE({row}.country, '')",
+        'language': "COALESCE({row}.language, '')",
+        'codec': "COALESCE({row}.codec, '')",
+        'bitrate': _BITRATE_BUCKET_SQL.format(col='{row}.bitrate'),
+    }
+
+    def _values_sql(self, row: str, delta: int) -> str:
+        return ',\n'.join(
+            f"('{dimension}', {expression.format(row=row)}, {delta})"
+            for dimension, expression in self.DIMENSIONS.items()
+        )
+
+    def _upsert_sql(self, row: str, delta: int) -> str:
+        return f'''
+            INSERT INTO {self.TABLE} (dimension, value, count) VALUES
+            {self._values_sql(row, delta)}
+            ON CONFLICT (dimension, value) DO UPDATE SET count = count + ({delta});
+        '''
+
+    def ensure_schema(self, conn: sqlite3.Connection):
+        """建立摘要表與觸發器；首次建立時由現有資料回填"""
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.TABLE,))
+        is_new = cursor.fetchone() is None
+
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                dimension TEXT NOT NULL,
+                value TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (dimension, value)
+            ) WITHOUT ROWID
+        ''')
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{self.TABLE}_insert
+            AFTER INSERT ON radio_stations
+            BEGIN
+                {self._upsert_sql('NEW', 1)}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{self.TABLE}_delete
+            AFTER DELETE ON radio_stations
+            BEGIN
+                {self._upsert_sql('OLD', -1)}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{self.TABLE}_update
+            AFTER UPDATE OF source_api, country, language, codec, bitrate ON radio_stations
+            BEGIN
+                {self._upsert_sql('OLD', -1)}
+                {self._upsert_sql('NEW', 1)}
+            END
+        ''')
+
+        # MAX(collection_date) 走索引即可取得最後更新時間
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_radio_stations_collection_date
+            ON radio_stations (collection_date)
+        ''')
+
+        if is_new:
+            self.rebuild(conn)
+
+    def rebuild(self, conn: sqlite3.Connection):
+        """由 radio_stations 全量重算摘要表"""
+        cursor = conn.cursor()
+        cursor.execute(f'DELETE FROM {self.TABLE}')
+        for dimension, expression in self.DIMENSIONS.items():
+            value_sql = expression.format(row='radio_stations')
+            cursor.execute(f'''
+                INSERT INTO {self.TABLE} (dimension, value, count)
+                SELECT '{dimension}', {value_sql}, COUNT(*)
+                FROM radio_stations
+                GROUP BY 2
+            ''')
+
+    def get_total(self, cursor) -> int:
+        """電台總數"""
+        cursor.execute(f"SELECT count FROM {self.TABLE} WHERE dimension = 'total' AND value = ''")
+        row = cursor.fetchone()
+        return row[0] if row else 0
+
+    def get_breakdown(self, cursor, dimension: str, limit: int = None,
+                      skip_empty: bool = False) -> Dict[str, int]:
+        """某個維度的計數（依數量遞減排序）"""
+        query = f'''
+            SELECT value, count FROM {self.TABLE}
+            WHERE dimension = ? AND count > 0 {"AND value != ''" if skip_empty else ''}
+            ORDER BY count DESC, value
+        '''
+        params = [dimension]
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+        cursor.execute(query, params)
+        return dict(cursor.fetchall())
+
+    def get_last_update(self, cursor):
+        """最近一次收集時間"""
+        cursor.execute('SELECT MAX(collection_date) FROM radio_stations')
+        return cursor.fetchone()[0]
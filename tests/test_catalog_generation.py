@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨程序的目錄世代測試
+API 程序內的世代為記憶體副本；update_stations.sh 或啟動時的收集器在另一個程序同步後，
+API 須在 generation_ttl 內重新讀取世代，讓回應快取與記憶體快照失效
+"""
+import os
+import sys
+import time
+import shutil
+import logging
+import tempfile
+import unittest
+import subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from radio_api_server import RadioAPI
+
+# 在另一個程序同步 count 個 TuneIn 電台（與 update_stations.sh 相同，經由收集器寫入）
+SYNC_SCRIPT = '''
+import sys
+from multi_source_radio_collector import MultiSourceRadioCollector
+
+collector = MultiSourceRadioCollector(sys.argv[1])
+stations = [{
+    'uuid': f'tunein_s{index}',
+    'name': f'Test Station {index}',
+    'url': f'http://opml.radiotime.com/Tune.ashx?id=s{index}',
+    'country': 'Taiwan',
+    'tags': 'tunein,music_Pop',
+    'source_api': 'tunein',
+    'source_type': 'tunein',
+} for index in range(int(sys.argv[2]))]
+collector.sync_stations_to_db({'stations': stations, 'stats': {'tunein': {'success': True}}})
+collector.db.close()
+'''
+
+
+class CatalogGenerationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmpdir, 'stations.db')
+        logging.disable(logging.WARNING)
+        self.api = RadioAPI(self.db_path, enable_scheduler=False)
+        self.api.db.generation_ttl = 0.2
+        self.client = self.api.app.test_client()
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        self.api.db.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def sync_in_other_process(self, count: int):
+        subprocess.run([sys.executable, '-c', SYNC_SCRIPT, self.db_path, str(count)],
+                       cwd=PROJECT_ROOT, check=True, capture_output=True)
+
+    def total_stations(self) -> int:
+        response = self.client.get('/api/stats')
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()['statistics']['total_stations']
+
+    def test_sync_from_other_process_invalidates_cached_responses(self):
+        generation = self.api.get_catalog_generation()
+        self.assertEqual(self.total_stations(), 0)
+
+        self.sync_in_other_process(3)
+        time.sleep(self.api.db.generation_ttl)
+
+        self.assertGreater(self.api.get_catalog_generation(), generation)
+        self.assertEqual(self.total_stations(), 3)
+
+    def test_generation_is_not_reread_within_ttl(self):
+        self.api.db.generation_ttl = 60
+        generation = self.api.get_catalog_generation()
+
+        self.sync_in_other_process(2)
+
+        self.assertEqual(self.api.get_catalog_generation(), generation)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+記憶體目錄快照與 SQLite 查詢的一致性測試
+get_filtered_stations 在快照與目前世代相符時由快照（filter_positions / query）回應，
+否則由 _query_stations_sql 查詢；兩者的篩選、排序、分頁、欄位投影與合併實體結果須完全相同
+"""
+import os
+import sys
+import json
+import shutil
+import logging
+import tempfile
+import unittest
+from itertools import product
+from unittest import mock
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from multi_source_radio_collector import MultiSourceRadioCollector
+from radio_api_server import RadioAPI
+from station_serializer import COLLAPSED_FIELDS, DEFAULT_FIELDS, encode_payload
+
+
+class SnapshotParityTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        db_path = os.path.join(cls.tmpdir, 'stations.db')
+        logging.disable(logging.WARNING)
+
+        # 專案內的真實目錄（含跨來源合併的實體）
+        collector = MultiSourceRadioCollector(db_path)
+        with open(os.path.join(PROJECT_ROOT, 'radio_stations.json'), encoding='utf-8') as f:
+            stations = json.load(f)
+        collector.sync_stations_to_db({'stations': stations, 'stats': {
+            source: {'success': True} for source in {station['source_api'] for station in stations}}})
+        collector.db.close()
+
+        cls.api = RadioAPI(db_path, enable_scheduler=False)
+        cls.api.snapshots.refresh()
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+        cls.api.db.close()
+        shutil.rmtree(cls.tmpdir, ignore_errors=True)
+
+    def query(self, use_snapshot: bool, **kwargs) -> dict:
+        """以快照或 SQLite 執行 get_filtered_stations，回傳解碼後的結果"""
+        if use_snapshot:
+            self.assertIsNotNone(self.api.snapshots.get(self.api.get_catalog_generation()))
+            result = self.api.get_filtered_stations(**kwargs)
+        else:
+            with mock.patch.object(self.api.snapshots, 'get', return_value=None):
+                result = self.api.get_filtered_stations(**kwargs)
+        return json.loads(encode_payload(result))
+
+    def assert_same_results(self, **kwargs):
+        snapshot_result = self.query(True, **kwargs)
+        sql_result = self.query(False, **kwargs)
+        self.assertEqual(snapshot_result, sql_result, kwargs)
+        return snapshot_result
+
+    def test_filters_and_pages_match(self):
+        countries = ('', 'Taiwan', 'china', 'Un')
+        languages = ('', 'chinese', 'ENGLISH')
+        for country, language, collapse, page in product(countries, languages, (False, True), (1, 3)):
+            result = self.assert_same_results(country=country, language=language, collapse=collapse,
+                                              page=page, limit=25)
+            if not country and not language and page == 1:
+                self.assertEqual(len(result['data']), 25)
+
+    def test_collapse_hides_secondary_streams(self):
+        full = self.assert_same_results(limit=1)
+        collapsed = self.assert_same_results(limit=1, collapse=True, fields=COLLAPSED_FIELDS)
+        self.assertLess(collapsed['pagination']['total'], full['pagination']['total'])
+
+    def test_field_projection_matches(self):
+        for fields, collapse in ((('name', 'url'), False),
+                                (('uuid', 'entity_id', 'alternate_urls', 'entity'), True),
+                                (COLLAPSED_FIELDS, True),
+                                (DEFAULT_FIELDS, False)):
+            result = self.assert_same_results(country='Taiwan', fields=fields, collapse=collapse, limit=40)
+            self.assertEqual(set(result['data'][0]), set(fields))
+
+    def test_cursor_pages_match(self):
+        for country, collapse in (('', False), ('Taiwan', True), ('china', False)):
+            seen = []
+            cursor = ''
+            for _ in range(5):
+                result = self.assert_same_results(country=country, collapse=collapse, cursor=cursor, limit=30)
+                seen.extend(station['uuid'] for station in result['data'])
+                cursor = result['pagination']['next_cursor']
+                if not cursor:
+                    break
+            # 游標分頁依序走訪，不重複也不跳過
+            self.assertEqual(seen, [station['uuid'] for station in self.assert_same_results(
+                country=country, collapse=collapse, limit=len(seen))['data']])
+
+    def test_count_modes_match(self):
+        for count in ('exact', 'cached', 'none'):
+            self.assert_same_results(country='Taiwan', count=count, limit=10)
+
+
+if __name__ == '__main__':
+    unittest.main()
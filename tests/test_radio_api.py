@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API 查詢參數測試
+列表、搜尋與篩選共用的 page/limit 解析：非正整數回應 400，limit 超過上限時取上限
+"""
+import os
+import sys
+import shutil
+import logging
+import tempfile
+import unittest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from radio_api_server import RadioAPI
+
+
+class PaginationParameterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        logging.disable(logging.WARNING)
+        self.api = RadioAPI(os.path.join(self.tmpdir, 'stations.db'), enable_scheduler=False)
+        self.client = self.api.app.test_client()
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        self.api.db.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_invalid_page_and_limit_are_rejected(self):
+        for path in ('/api/stations?', '/api/stations/search?q=radio&'):
+            for query in ('limit=0', 'limit=-5', 'page=0', 'page=-1', 'limit=abc', 'page=1.5'):
+                response = self.client.get(path + query)
+                self.assertEqual(response.status_code, 400, path + query)
+                self.assertFalse(response.get_json()['success'])
+
+    def test_limit_is_capped(self):
+        response = self.client.get('/api/stations?limit=1000')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['pagination']['limit'], 200)
+
+    def test_filtered_stations_validate_pagination(self):
+        with self.assertRaises(ValueError):
+            self.api.get_filtered_stations(limit=0)
+        with self.assertRaises(ValueError):
+            self.api.get_filtered_stations(page=0)
+        with self.assertRaises(ValueError):
+            self.api.search_stations_by_query('radio', limit=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
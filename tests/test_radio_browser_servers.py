@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Radio Browser 伺服器池測試
+以本機 http.server 模擬鏡像伺服器（可注入延遲與失敗），驗證延遲排序、
+RadioBrowserCollector._get_json 的失敗切換，以及 mark_failed 的冷卻時間
+"""
+import os
+import sys
+import json
+import time
+import socket
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import requests
+
+from radio_browser_collector import RadioBrowserCollector
+from radio_browser_servers import RadioBrowserServerPool, ServerUnavailable
+from rate_limiter import HostRateLimiters
+
+
+class MirrorServer:
+    """本機的 Radio Browser 鏡像替身
+
+    delay: 每個請求回應前等待的秒數；probe_status / api_status: /json/stats 與其他路徑回應的狀態碼
+    """
+
+    def __init__(self, name: str, delay: float = 0.0, probe_status: int = 200, api_status: int = 200):
+        self.name = name
+        self.delay = delay
+        self.probe_status = probe_status
+        self.api_status = api_status
+        self.requests = []
+
+        mirror = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                mirror.requests.append(self.path)
+                time.sleep(mirror.delay)
+                if self.path.startswith('/json/stats'):
+                    status, payload = mirror.probe_status, {'status': 'OK', 'stations': 1}
+                else:
+                    status, payload = mirror.api_status, [{'name': mirror.name}]
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def api_requests(self):
+        return [path for path in self.requests if not path.startswith('/json/stats')]
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def unused_url() -> str:
+    """沒有伺服器監聽的本機位址（模擬無法連線的鏡像）"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f'http://127.0.0.1:{port}'
+
+
+class RadioBrowserServerPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mirrors = []
+
+    def tearDown(self):
+        for mirror in self.mirrors:
+            mirror.close()
+
+    def mirror(self, name: str, **kwargs) -> MirrorServer:
+        mirror = MirrorServer(name, **kwargs)
+        self.mirrors.append(mirror)
+        return mirror
+
+    def pool(self, servers, **kwargs) -> RadioBrowserServerPool:
+        kwargs.setdefault('probe_timeout', 2.0)
+        return RadioBrowserServerPool(servers=[server.url if isinstance(server, MirrorServer) else server
+                                               for server in servers], **kwargs)
+
+    def collector(self, pool: RadioBrowserServerPool) -> RadioBrowserCollector:
+        collector = RadioBrowserCollector(server_pool=pool, query_plan=[], rate_limiters=HostRateLimiters(),
+                                          requests_per_second=50, burst=10, max_requests_per_second=50)
+        collector.timeout = 2
+        return collector
+
+    def test_ranking_orders_healthy_servers_by_latency(self):
+        slow = self.mirror('slow', delay=0.3)
+        fast = self.mirror('fast')
+        broken = self.mirror('broken', probe_status=500)
+        dead = unused_url()
+        pool = self.pool([slow, broken, dead, fast])
+
+        ranking = pool.ranking()
+
+        self.assertEqual([result['url'] for result in ranking[:2]], [fast.url, slow.url])
+        self.assertTrue(all(result['healthy'] for result in ranking[:2]))
+        self.assertLess(ranking[0]['latency'], ranking[1]['latency'])
+        self.assertEqual({result['url'] for result in ranking[2:]}, {broken.url, dead})
+        self.assertFalse(any(result['healthy'] for result in ranking[2:]))
+        # 探測失敗的伺服器仍排在最後作為備援
+        self.assertEqual(pool.candidates()[:2], [fast.url, slow.url])
+        self.assertEqual(set(pool.candidates()[2:]), {broken.url, dead})
+
+    def test_ranking_is_cached_until_ttl_or_invalidate(self):
+        fast = self.mirror('fast')
+        pool = self.pool([fast], ttl=3600)
+
+        pool.ranking()
+        pool.ranking()
+        self.assertEqual(fast.requests.count('/json/stats'), 1)
+
+        pool.invalidate()
+        pool.ranking()
+        self.assertEqual(fast.requests.count('/json/stats'), 2)
+
+    def test_get_json_fails_over_to_next_server(self):
+        fast = self.mirror('fast', api_status=503)
+        slow = self.mirror('slow', delay=0.1)
+        pool = self.pool([fast, slow])
+        collector = self.collector(pool)
+
+        self.assertEqual(collector._get_json('/json/stations/search', {'limit': 1}), [{'name': 'slow'}])
+        self.assertEqual(len(fast.api_requests()), 1)
+        self.assertEqual(len(slow.api_requests()), 1)
+        # 失敗的伺服器已降級，下一個請求直接使用其他伺服器
+        self.assertEqual(pool.candidates(), [slow.url, fast.url])
+        collector._get_json('/json/stations/search', {'limit': 1})
+        self.assertEqual(len(fast.api_requests()), 1)
+
+    def test_get_json_fails_over_from_unreachable_server(self):
+        gone = self.mirror('gone')
+        slow = self.mirror('slow', delay=0.1)
+        pool = self.pool([gone, slow])
+        self.assertEqual(pool.best(), gone.url)
+        # 排序後伺服器才停止回應
+        gone.close()
+        collector = self.collector(pool)
+
+        self.assertEqual(collector._get_json('/json/stations/search'), [{'name': 'slow'}])
+        self.assertEqual(pool.candidates(), [slow.url, gone.url])
+
+    def test_get_json_raises_client_errors_without_failover(self):
+        fast = self.mirror('fast', api_status=404)
+        slow = self.mirror('slow', delay=0.1)
+        pool = self.pool([fast, slow])
+        collector = self.collector(pool)
+
+        with self.assertRaises(requests.HTTPError):
+            collector._get_json('/json/stations/byuuid/missing')
+        self.assertEqual(slow.api_requests(), [])
+        self.assertEqual(pool.candidates()[0], fast.url)
+
+    def test_get_json_raises_when_all_servers_fail(self):
+        first = self.mirror('first', api_status=500)
+        second = self.mirror('second', api_status=429)
+        collector = self.collector(self.pool([first, second]))
+
+        with self.assertRaises(ServerUnavailable):
+            collector._get_json('/json/stations/search')
+        self.assertEqual(len(first.api_requests()), 1)
+        self.assertEqual(len(second.api_requests()), 1)
+
+    def test_mark_failed_cooldown_expires(self):
+        fast = self.mirror('fast')
+        slow = self.mirror('slow', delay=0.2)
+        pool = self.pool([fast, slow], failure_cooldown=0.3)
+        self.assertEqual(pool.best(), fast.url)
+
+        pool.mark_failed(fast.url)
+        self.assertEqual(pool.candidates(), [slow.url, fast.url])
+
+        time.sleep(0.35)
+        self.assertEqual(pool.candidates(), [fast.url, slow.url])
+        # 冷卻期間不重新探測
+        self.assertEqual(fast.requests.count('/json/stats'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
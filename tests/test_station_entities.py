@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨來源電台實體解析測試
+以專案內的 radio_stations.json（真實的 Radio Browser 資料）同步到暫存資料庫，驗證名稱相似、
+但各自獨立的電台（各縣市的「人民广播电台」「综合广播」、Radiorama 各城市頻率）不被合併，
+同一電台的不同串流仍合併；並以手動與 TuneIn 電台驗證頻率作為跨來源合併的佐證
+"""
+import os
+import sys
+import json
+import shutil
+import sqlite3
+import logging
+import tempfile
+import unittest
+from unittest import mock
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from multi_source_radio_collector import MultiSourceRadioCollector
+from station_entities import StationEntityResolver
+
+
+def tunein_station(name: str, station_id: str, country: str = 'Taiwan') -> dict:
+    return {
+        'uuid': f'tunein_{station_id}',
+        'name': name,
+        'url': f'http://opml.radiotime.com/Tune.ashx?id={station_id}',
+        'country': country,
+        'tags': 'tunein,music_Pop',
+        'source_api': 'tunein',
+        'source_type': 'tunein',
+    }
+
+
+class StationEntityResolverTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.collector = MultiSourceRadioCollector(os.path.join(self.tmpdir, 'stations.db'))
+        logging.getLogger('multi_source_radio_collector').setLevel(logging.WARNING)
+
+    def tearDown(self):
+        self.collector.db.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def sync(self, stations):
+        sources = {station['source_api'] for station in stations}
+        self.collector.sync_stations_to_db({'stations': stations,
+                                            'stats': {source: {'success': True} for source in sources}})
+
+    def entities(self, where: str = '1', params=()) -> dict:
+        """名稱 → 所屬 entity_id 的集合"""
+        result = {}
+        with self.collector.db.reader() as conn:
+            for name, entity_id in conn.execute(f'SELECT name, entity_id FROM radio_stations WHERE {where}', params):
+                result.setdefault(name, set()).add(entity_id)
+        return result
+
+    def sync_repository_catalog(self):
+        with open(os.path.join(PROJECT_ROOT, 'radio_stations.json'), encoding='utf-8') as f:
+            self.sync(json.load(f))
+
+    def assert_distinct_entities(self, where: str):
+        with self.collector.db.reader() as conn:
+            stations, entities = conn.execute(
+                f'SELECT COUNT(*), COUNT(DISTINCT entity_id) FROM radio_stations WHERE {where}').fetchone()
+        self.assertGreater(stations, 10)
+        self.assertEqual(entities, stations)
+
+    def test_similar_names_of_different_stations_stay_apart(self):
+        self.sync_repository_catalog()
+
+        # 共用「人民广播电台」後綴、同一 CDN 主機的各縣電台
+        self.assert_distinct_entities("name LIKE '%人民广播电台'")
+        # Radiorama 各城市、不同頻率的 ARROBA FM
+        self.assert_distinct_entities("name LIKE '%Radiorama%'")
+
+        entities = self.entities()
+        for cluster in (['三台人民广播电台', '三门人民广播电台', '临朐人民广播电台', '乐清人民广播电台'],
+                        ['万州综合广播', '亳州综合广播', '台州综合广播', '温州综合广播'],
+                        ['Harbin Music Radio', 'Harbin Traffic Radio', 'Canton Traffic Radio'],
+                        ['Kweiyang Music Radio', 'Kweiyang Traffic Radio'],
+                        ['台灣廣播 台北一台', '台灣廣播 台北二台']):
+            entity_ids = [entities[name] for name in cluster]
+            for index, left in enumerate(entity_ids):
+                for right in entity_ids[index + 1:]:
+                    self.assertFalse(left & right, cluster)
+
+    def test_catalog_does_not_chain_into_large_entities(self):
+        self.sync_repository_catalog()
+
+        with self.collector.db.reader() as conn:
+            stations, entities, largest = conn.execute('''
+                SELECT SUM(members), COUNT(*), MAX(members)
+                FROM (SELECT COUNT(*) AS members FROM radio_stations GROUP BY entity_id)
+            ''').fetchone()
+        self.assertEqual(stations, 2212)
+        self.assertGreater(entities, 1950)
+        self.assertLessEqual(largest, 5)
+
+    def test_streams_of_the_same_station_are_merged(self):
+        self.sync_repository_catalog()
+
+        entities = self.entities()
+        # 同名、同國家且首頁/串流主機相同的鏡像
+        for name in ('南京音乐广播', '- 0 N - Jazz on Radio', '宁夏新闻广播', 'TAIWAN LOUNGE RADIO'):
+            self.assertEqual(len(entities[name]), 1, name)
+        # 名稱互相包含且首頁相同
+        self.assertEqual(entities['文山综合广播'], entities['文山综合广播（新）'])
+
+    def test_frequency_corroborates_cross_source_names(self):
+        manual = self.collector.add_manual_premium_stations()
+        self.sync(manual + [
+            tunein_station('Hit Fm 107.7', 's1'),
+            tunein_station('ICRT FM 100.7', 's2'),
+            tunein_station('Hit FM 90.1', 's3'),
+            tunein_station('中廣音樂網', 's4'),
+        ])
+
+        entities = self.entities()
+        self.assertEqual(entities['Hit Fm 107.7'], entities['Hit FM 聯播網 FM107.7'])
+        self.assertEqual(entities['ICRT FM 100.7'], entities['ICRT FM100.7'])
+        # 頻率不同
+        self.assertNotEqual(entities['Hit FM 90.1'], entities['Hit FM 聯播網 FM107.7'])
+        # 只有名稱相似、沒有其他佐證
+        self.assertNotEqual(entities['中廣音樂網'], entities['中廣音樂網 FM96.3'])
+
+        with self.collector.db.reader() as conn:
+            primary = conn.execute('''
+                SELECT source_api, alternate_urls FROM radio_stations
+                WHERE name = 'Hit FM 聯播網 FM107.7' AND entity_primary = 1
+            ''').fetchone()
+        self.assertEqual(primary[0], 'manual')
+        self.assertEqual(json.loads(primary[1]), ['http://opml.radiotime.com/Tune.ashx?id=s1'])
+
+    def test_band_pair_cap_limits_candidates(self):
+        self.sync_repository_catalog()
+
+        with self.collector.db.reader() as conn:
+            _, unlimited = StationEntityResolver().plan(conn)
+            _, capped = StationEntityResolver(max_band_pairs=5).plan(conn)
+        self.assertEqual(unlimited['skipped_pairs'], 0)
+        self.assertGreater(capped['skipped_pairs'], 0)
+        self.assertLess(capped['candidate_pairs'], unlimited['candidate_pairs'])
+
+    def test_resolution_is_recomputed_when_catalog_changes_meanwhile(self):
+        self.sync(self.collector.add_manual_premium_stations() + [tunein_station('Hit Fm 107.7', 's1')])
+        with self.collector.db.writer() as conn:
+            conn.execute('UPDATE radio_stations SET entity_id = NULL, alternate_urls = NULL, entity_metadata = NULL')
+
+        # 第一次計算後，另一個行程的同步推進了目錄世代
+        resolver = self.collector.entity_resolver
+        plan = resolver.plan
+        plans = []
+
+        def plan_during_other_sync(conn):
+            plans.append(conn)
+            result = plan(conn)
+            if len(plans) == 1:
+                other = sqlite3.connect(self.collector.db_path)
+                other.execute("UPDATE catalog_meta SET value = value + 1 WHERE key = 'generation'")
+                other.commit()
+                other.close()
+            return result
+
+        with mock.patch.object(resolver, 'plan', side_effect=plan_during_other_sync):
+            entity_stats = self.collector.resolve_entities()
+
+        self.assertEqual(len(plans), 2)
+        self.assertGreater(entity_stats['changed'], 0)
+        entities = self.entities()
+        self.assertEqual(entities['Hit Fm 107.7'], entities['Hit FM 聯播網 FM107.7'])
+        self.assertNotIn(None, set().union(*entities.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
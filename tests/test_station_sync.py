@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+電台同步行為測試
+內容指紋（content_hash）相同的電台不重寫；串流管線只在來源完整同步成功後刪除消失的電台；
+Radio Browser 變更紀錄正確分類為新增、更新與刪除
+"""
+import os
+import sys
+import json
+import shutil
+import logging
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from multi_source_radio_collector import MultiSourceRadioCollector
+from radio_browser_collector import RadioBrowserCollector
+from station_pipeline import StationPipeline
+
+SENTINEL_DATE = '2000-01-01 00:00:00'
+
+
+def radio_browser_station(uuid: str, name: str, tags: str = 'pop', lastchecktime: str = '2026-10-01 00:00:00',
+                          **fields) -> dict:
+    station = {
+        'uuid': uuid,
+        'name': name,
+        'url': f'http://stream.example.com/{uuid}',
+        'homepage': f'http://{uuid}.example.com',
+        'tags': tags,
+        'country': 'Taiwan',
+        'language': 'chinese',
+        'codec': 'MP3',
+        'bitrate': 128,
+        'source_api': 'radio_browser',
+        'source_type': 'radio_browser',
+        'metadata': json.dumps({'changeuuid': f'c-{uuid}', 'lastchecktime': lastchecktime, 'votes': 3}),
+    }
+    station.update(fields)
+    return station
+
+
+class StationSyncTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.collector = MultiSourceRadioCollector(os.path.join(self.tmpdir, 'stations.db'))
+        logging.getLogger('multi_source_radio_collector').setLevel(logging.WARNING)
+
+    def tearDown(self):
+        self.collector.db.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def sync(self, stations, success: bool = True, source: str = 'radio_browser') -> dict:
+        return self.collector.sync_stations_to_db({'stations': stations, 'stats': {source: {'success': success}}})
+
+    def mark_all_rows(self):
+        """將所有電台的 collection_date 設為固定值，之後被重寫的電台會變成目前時間"""
+        with self.collector.db.writer() as conn:
+            conn.execute('UPDATE radio_stations SET collection_date = ?', (SENTINEL_DATE,))
+
+    def rewritten(self) -> set:
+        with self.collector.db.reader() as conn:
+            return {uuid for uuid, in conn.execute('SELECT uuid FROM radio_stations WHERE collection_date != ?',
+                                                    (SENTINEL_DATE,))}
+
+    def uuids(self) -> set:
+        with self.collector.db.reader() as conn:
+            return {uuid for uuid, in conn.execute('SELECT uuid FROM radio_stations')}
+
+
+class ContentHashSyncTest(StationSyncTestCase):
+
+    def test_unchanged_rows_are_not_rewritten(self):
+        stations = [radio_browser_station(f'rb{index}', f'Station {index}') for index in range(5)]
+        result = self.sync(stations)
+        self.assertEqual((result['added'], result['updated'], result['deleted']), (5, 0, 0))
+        self.mark_all_rows()
+        generation = self.collector.db.catalog_generation
+
+        # 只有易變的 lastchecktime 不同：不算變動、不重寫、世代不前進
+        stations = [radio_browser_station(f'rb{index}', f'Station {index}', lastchecktime='2026-10-17 08:00:00')
+                    for index in range(5)]
+        result = self.sync(stations)
+        self.assertEqual(result['total_operations'], 0)
+        self.assertEqual(self.rewritten(), set())
+        self.assertEqual(self.collector.db.catalog_generation, generation)
+
+    def test_only_changed_rows_are_rewritten(self):
+        stations = [radio_browser_station(f'rb{index}', f'Station {index}') for index in range(5)]
+        self.sync(stations)
+        self.mark_all_rows()
+
+        stations[2] = radio_browser_station('rb2', 'Station 2', tags='pop,news')
+        result = self.sync(stations)
+        self.assertEqual((result['added'], result['updated'], result['deleted']), (0, 1, 0))
+        self.assertEqual(self.rewritten(), {'rb2'})
+        with self.collector.db.reader() as conn:
+            tags = conn.execute("SELECT tags FROM radio_stations WHERE uuid = 'rb2'").fetchone()[0]
+        self.assertEqual(tags, 'pop,news')
+
+
+class PipelineDeletionTest(StationSyncTestCase):
+
+    def run_pipeline(self, stations, error: Exception = None) -> dict:
+        """以串流管線同步 Radio Browser：收集器產生 stations 後拋出 error（若有）"""
+        def iter_source(source, cancel_event, tunein_mode):
+            yield from (dict(station) for station in stations)
+            if error is not None:
+                raise error
+
+        collection_stats = {}
+        with mock.patch.object(self.collector, 'iter_source', side_effect=iter_source):
+            result = StationPipeline(self.collector, source_deadlines={}, batch_size=2).run(
+                ['radio_browser'], collection_stats, 'none')
+        return result
+
+    def test_missing_rows_are_deleted_after_successful_full_sync(self):
+        stations = [radio_browser_station(f'rb{index}', f'Station {index}') for index in range(5)]
+        self.run_pipeline(stations)
+        self.assertEqual(self.uuids(), {f'rb{index}' for index in range(5)})
+
+        result = self.run_pipeline(stations[:3])
+        self.assertTrue(result['stats']['radio_browser']['success'])
+        self.assertEqual(result['sync_results']['radio_browser']['deleted'], 2)
+        self.assertEqual(self.uuids(), {'rb0', 'rb1', 'rb2'})
+
+    def test_rows_are_kept_when_producer_fails(self):
+        stations = [radio_browser_station(f'rb{index}', f'Station {index}') for index in range(5)]
+        self.run_pipeline(stations)
+
+        # 收集到一半失敗：已寫入的批次保留，沒有出現的電台不被當成消失
+        changed = [radio_browser_station('rb0', 'Station 0', tags='news'), stations[1]]
+        result = self.run_pipeline(changed, error=ConnectionError('mirror down'))
+        self.assertFalse(result['stats']['radio_browser']['success'])
+        self.assertEqual(result['sync_results']['radio_browser']['deleted'], 0)
+        self.assertEqual(self.uuids(), {f'rb{index}' for index in range(5)})
+        with self.collector.db.reader() as conn:
+            tags = conn.execute("SELECT tags FROM radio_stations WHERE uuid = 'rb0'").fetchone()[0]
+        self.assertEqual(tags, 'news')
+
+    def test_rows_are_kept_when_batch_write_fails(self):
+        stations = [radio_browser_station(f'rb{index}', f'Station {index}') for index in range(5)]
+        self.run_pipeline(stations)
+
+        sync_station_batch = self.collector.sync_station_batch
+        calls = []
+
+        def fail_second_batch(run_id, batch):
+            calls.append(len(batch))
+            if len(calls) == 2:
+                raise RuntimeError('disk full')
+            return sync_station_batch(run_id, batch)
+
+        with mock.patch.object(self.collector, 'sync_station_batch', side_effect=fail_second_batch):
+            result = self.run_pipeline(stations[:4])
+        self.assertEqual(result['sync_results']['radio_browser']['deleted'], 0)
+        self.assertEqual(self.uuids(), {f'rb{index}' for index in range(5)})
+
+
+def radio_browser_change(uuid: str, changeuuid: str, name: str = None, country: str = 'Taiwan',
+                         language: str = 'chinese', tags: str = 'music') -> dict:
+    """/json/stations/changed 的一筆變更紀錄"""
+    return {
+        'stationuuid': uuid,
+        'changeuuid': changeuuid,
+        'name': name or f'Station {uuid}',
+        'url': f'http://stream.example.com/{uuid}',
+        'homepage': f'http://{uuid}.example.com',
+        'tags': tags,
+        'country': country,
+        'language': language,
+        'codec': 'MP3',
+        'bitrate': 128,
+        'lastcheckok': 1,
+        'lastchangetime': '2026-10-17 07:00:00',
+    }
+
+
+class RadioBrowserChangesTest(StationSyncTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # 變更紀錄只由 iter_changes 提供，不連線
+        self.rb_collector = RadioBrowserCollector()
+        self.changes = []
+        patcher = mock.patch.object(RadioBrowserCollector, 'iter_changes',
+                                    side_effect=lambda *args, **kwargs: iter(self.changes))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # 上次同步的電台（hk 由 chinese 分類收集）與變更進度
+        self.sync([self.rb_collector.create_station(radio_browser_change(uuid, f'c0-{uuid}'), 'taiwan')
+                   for uuid in ('keep', 'moved', 'renamed', 'untouched')] +
+                  [self.rb_collector.create_station(radio_browser_change('hk', 'c0-hk', country='Hong Kong'),
+                                                    'chinese')])
+        with self.collector.db.writer() as conn:
+            self.collector._save_radio_browser_state(conn.cursor(), {
+                'lastchangeuuid': 'c0', 'last_full_sync': datetime.now().isoformat()})
+
+    def state(self) -> dict:
+        with self.collector.db.reader() as conn:
+            return self.collector._load_radio_browser_state(conn)
+
+    def test_changes_are_classified_as_added_updated_and_deleted(self):
+        self.changes = [
+            radio_browser_change('keep', 'c1', tags='music,news'),
+            radio_browser_change('added', 'c2'),
+            # 移出收集範圍（國家與語言都不再符合）
+            radio_browser_change('moved', 'c3', country='Japan', language='japanese'),
+            # 名稱改變：以新資料列取代，計為更新
+            radio_browser_change('renamed', 'c4', name='Renamed Station'),
+            # 只符合有名次限制的標籤分類，無法由單筆變更判斷名次，不新增
+            radio_browser_change('pop-only', 'c5', country='France', language='french', tags='pop'),
+            # 同一電台的多筆變更只套用最新的一筆
+            radio_browser_change('keep', 'c6', tags='music,talk'),
+        ]
+
+        result = self.collector.sync_radio_browser_changes()
+
+        self.assertEqual(result['mode'], 'incremental')
+        self.assertTrue(result['success'])
+        self.assertEqual(result['changes'], 6)
+        self.assertEqual((result['added'], result['updated'], result['deleted']), (1, 2, 1))
+        self.assertEqual(self.uuids(), {'keep', 'added', 'renamed', 'untouched', 'hk'})
+        with self.collector.db.reader() as conn:
+            rows = dict(conn.execute("SELECT uuid, name || '|' || tags FROM radio_stations"))
+        self.assertTrue(rows['keep'].endswith('music,talk'))
+        self.assertTrue(rows['renamed'].startswith('Renamed Station|'))
+        self.assertEqual(self.state()['lastchangeuuid'], 'c6')
+
+    def test_existing_station_keeps_its_category(self):
+        # 由 chinese 分類收集的電台改為台灣電台：同時符合 taiwan 與 chinese，維持原本的 chinese 分類
+        self.changes = [radio_browser_change('hk', 'c1', country='Taiwan')]
+
+        result = self.collector.sync_radio_browser_changes()
+
+        self.assertEqual((result['added'], result['updated'], result['deleted']), (0, 1, 0))
+        with self.collector.db.reader() as conn:
+            category, country = conn.execute(
+                "SELECT category, country FROM radio_stations WHERE uuid = 'hk'").fetchone()
+        self.assertEqual((category, country), ('chinese', 'Taiwan'))
+
+    def test_failed_feed_keeps_rows_and_progress(self):
+        def broken_feed(*args, **kwargs):
+            yield radio_browser_change('moved', 'c1', country='Japan', language='japanese')
+            raise ConnectionError('mirror down')
+
+        with mock.patch.object(RadioBrowserCollector, 'iter_changes', side_effect=broken_feed):
+            result = self.collector.sync_radio_browser_changes()
+
+        self.assertFalse(result['success'])
+        self.assertIn('moved', self.uuids())
+        self.assertEqual(self.state()['lastchangeuuid'], 'c0')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TuneIn 爬取檢查點與已訪問索引測試
+以模擬的 OPML 樹取代網路請求（_fetch_opml）：中斷的爬取由 SQLite 檢查點繼續，不重複抓取已處理的節點；
+visited_ttl 內已抓取的節點重用保存的內容，其電台與子分類不因略過請求而遺失
+"""
+import os
+import sys
+import shutil
+import sqlite3
+import logging
+import tempfile
+import unittest
+from collections import Counter
+from urllib.parse import parse_qs, urlsplit
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from rate_limiter import HostRateLimiters
+from tunein_collector import TuneInCollector
+
+
+def browse_url(node_id: str, render: bool = False) -> str:
+    return f'http://opml.radiotime.com/Browse.ashx?id={node_id}' + ('&render=xml' if render else '')
+
+
+def opml(node_id: str) -> str:
+    """模擬的 OPML 節點：深度 2 以內有 3 個子分類與共用的 shared 節點（參數寫法不同），每個節點 2 個電台"""
+    outlines = []
+    if node_id.count('.') < 2:
+        for index in range(3):
+            outlines.append(f'<outline type="link" text="Sub {index}" URL="{browse_url(f"{node_id}.{index}")}"/>')
+        if not node_id.startswith('shared'):
+            shared = 'http://opml.radiotime.com/Browse.ashx?render=xml&amp;id=shared'
+            outlines.append(f'<outline type="link" text="Shared" URL="{shared}"/>')
+    for index in range(2):
+        guide_id = f's-{node_id}-{index}'
+        outlines.append(f'<outline type="audio" text="Station {node_id} {index}" bitrate="64" '
+                        f'URL="http://opml.radiotime.com/Tune.ashx?id={guide_id}" guide_id="{guide_id}"/>')
+    return f'<?xml version="1.0"?><opml><body>{"".join(outlines)}</body></opml>'
+
+
+class TuneInCrawlTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        # TuneIn 日誌寫在工作目錄的 logs/ 下
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.tmpdir)
+        logging.disable(logging.WARNING)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        self.rate_limiters = HostRateLimiters()
+        self.hits = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def make_collector(self, db_name: str = 'crawl.db', **kwargs) -> TuneInCollector:
+        collector = TuneInCollector(checkpoint_path=os.path.join(self.tmpdir, db_name),
+                                    rate_limiters=self.rate_limiters, max_in_flight=1,
+                                    max_parallel_categories=1, **kwargs)
+
+        def fetch_opml(node, execution_mode, params, logger=None, stop_event=None):
+            node_id = parse_qs(urlsplit(node.url).query)['id'][0]
+            self.hits.append(node_id)
+            return True, opml(node_id)
+
+        collector._fetch_opml = fetch_opml
+        self.addCleanup(collector.checkpoints.db.close)
+        return collector
+
+    def crawl(self, collector: TuneInCollector, category: str, root: str, limit: int = None) -> list:
+        """爬取分類，limit 指定時產生 limit 個電台後中斷"""
+        stations = []
+        crawl = collector._crawl_categories([(category, browse_url(root, render=True), 1.2)], 'mixed')
+        for station in crawl:
+            stations.append(station)
+            if limit is not None and len(stations) >= limit:
+                break
+        crawl.close()
+        return stations
+
+    def test_interrupted_crawl_resumes_from_checkpoint(self):
+        # 不中斷的完整爬取作為對照
+        expected = self.crawl(self.make_collector('reference.db', visited_ttl=0), 'taiwan', 'r')
+        expected_hits = Counter(self.hits)
+        self.assertEqual(len(expected), 52)
+        self.hits.clear()
+
+        interrupted = self.crawl(self.make_collector(visited_ttl=0), 'taiwan', 'r', limit=15)
+        first_hits = Counter(self.hits)
+        self.hits.clear()
+
+        # 重新啟動：先重播已收集的電台，再從剩餘的前沿繼續
+        resumed_collector = self.make_collector(visited_ttl=0)
+        resumed = self.crawl(resumed_collector, 'taiwan', 'r')
+
+        self.assertEqual(len(interrupted), 15)
+        self.assertEqual(sorted(station['uuid'] for station in resumed),
+                         sorted(station['uuid'] for station in expected))
+        # 已處理的節點不重新抓取，兩次合計的請求與完整爬取相同
+        self.assertFalse(set(first_hits) & set(self.hits))
+        self.assertEqual(first_hits + Counter(self.hits), expected_hits)
+        self.assertEqual(resumed_collector.request_count, sum(expected_hits.values()))
+
+        with sqlite3.connect(os.path.join(self.tmpdir, 'crawl.db')) as conn:
+            status, stations = conn.execute("SELECT status, stations FROM crawl_runs WHERE category = 'taiwan'").fetchone()
+            frontier = conn.execute('SELECT COUNT(*) FROM crawl_frontier').fetchone()[0]
+        self.assertEqual((status, stations, frontier), ('done', 52, 0))
+
+    def test_recently_fetched_node_returns_cached_children(self):
+        music = self.crawl(self.make_collector(), 'music', 'm')
+        self.assertIn('shared', self.hits)
+        self.assertIn('s-shared.0.1-0', {station['uuid'] for station in music})
+        self.hits.clear()
+
+        # 重新啟動後爬取另一個也連到 shared 的分類：shared 子樹重用保存的內容，不再請求
+        collector = self.make_collector()
+        language = self.crawl(collector, 'language', 'l')
+        self.assertFalse([node_id for node_id in self.hits if node_id.startswith('shared')])
+        self.assertEqual(collector.saved_requests, 13)
+
+        uuids = {station['uuid'] for station in language}
+        shared_uuids = {station['uuid'] for station in music if station['uuid'].startswith('s-shared')}
+        self.assertEqual(len(shared_uuids), 26)
+        self.assertLessEqual(shared_uuids, uuids)
+        self.assertEqual(len(language), 52)
+        # 重用的電台改標為本分類
+        for station in language:
+            self.assertEqual(station['category'], 'language')
+            self.assertTrue(station['tags'].startswith('tunein,language'))
+
+    def test_expired_nodes_are_fetched_again(self):
+        self.crawl(self.make_collector(), 'music', 'm')
+        self.hits.clear()
+
+        language = self.crawl(self.make_collector(visited_ttl=0), 'language', 'l')
+        self.assertEqual(Counter(node_id.startswith('shared') for node_id in self.hits)[True], 13)
+        self.assertEqual(len(language), 52)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TuneIn 爬取檢查點
+將爬取狀態保存在 SQLite（預設 tunein_crawl.db）：每抓取一個節點，就在同一交易中寫入
+該節點的電台、新排入的子分類、預算與請求計數。收集器重新啟動時從最後的檢查點繼續，
+先重播已收集的電台（不需重新請求），再接著抓取前沿中剩餘的節點。
+各節點最近一次抓取的內容（電台與子分類連結）另外保存，近期已抓取的節點由此重用，不必再次請求
+"""
+import json
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from radio_database import RadioDatabase
+from tunein_frontier import CrawlFrontier, DepthBudget, FrontierNode, YieldHistory
+
+
+# 未完成的爬取超過此時間（秒）不再繼續，改為重新開始（同一天內的重新啟動可繼續）
+RESUME_MAX_AGE = 20 * 60 * 60
+
+
+class CrawlRun:
+    """單一分類本次爬取的狀態（前沿、預算、分支失敗數與請求計數）"""
+
+    def __init__(self, category: str, execution_mode: str, frontier: CrawlFrontier, budget: DepthBudget,
+                 branch_failures: Dict[str, int] = None, request_count: int = 0, failed_requests: int = 0,
+                 stations: int = 0, resumed: bool = False):
+        self.category = category
+        self.execution_mode = execution_mode
+        self.frontier = frontier
+        self.budget = budget
+        self.branch_failures = dict(branch_failures or {})
+        self.request_count = request_count
+        self.failed_requests = failed_requests
+        self.stations = stations
+        self.resumed = resumed
+        self.skipped_recent = 0     # 近期已由任一分類抓取過、重用快取內容的節點（省下的請求）
+        self.duplicate_links = 0    # 正規化後與已排入節點相同的連結
+
+    def state_json(self) -> str:
+        return json.dumps({'budget': self.budget.to_dict(), 'branch_failures': self.branch_failures,
+                           'skipped_recent': self.skipped_recent, 'duplicate_links': self.duplicate_links})
+
+
+class TuneInCrawlStore:
+    """TuneIn 爬取檢查點資料庫"""
+
+    def __init__(self, db_path: str = 'tunein_crawl.db', resume_max_age: float = RESUME_MAX_AGE):
+        self.db = RadioDatabase(db_path, pool_size=2)
+        self.resume_max_age = resume_max_age
+        self.init_schema()
+        self.history = self._load_history()
+
+    def init_schema(self):
+        with self.db.writer() as conn:
+            # 各分類最近一次爬取：狀態、預算與分支失敗數 (JSON)、請求計數
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS crawl_runs (
+                    category TEXT PRIMARY KEY,
+                    execution_mode TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    started_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    state TEXT NOT NULL,
+                    request_count INTEGER NOT NULL DEFAULT 0,
+                    failed_requests INTEGER NOT NULL DEFAULT 0,
+                    stations INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            # 待抓取的節點
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS crawl_frontier (
+                    category TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    node TEXT NOT NULL,
+                    PRIMARY KEY (category, url)
+                ) WITHOUT ROWID
+            ''')
+            # 本次爬取已排入過的節點（正規化網址，含已抓取者）
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS crawl_visited (
+                    category TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    PRIMARY KEY (category, url)
+                ) WITHOUT ROWID
+            ''')
+            # 本次爬取各節點收集到的電台（繼續爬取時重播）
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS crawl_node_stations (
+                    category TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    url TEXT NOT NULL,
+                    station TEXT NOT NULL,
+                    PRIMARY KEY (category, seq)
+                ) WITHOUT ROWID
+            ''')
+            # 各節點（正規化網址）最近一次抓取的產出：前沿的優先順序依據，也是不分分類的已訪問索引
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS crawl_nodes (
+                    url TEXT PRIMARY KEY,
+                    category TEXT,
+                    stations INTEGER NOT NULL,
+                    links INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+            ''')
+            # 各節點（正規化網址）最近一次抓取的內容：電台與子分類連結 (JSON)，重用時不必再次請求
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS crawl_node_content (
+                    url TEXT PRIMARY KEY,
+                    stations TEXT NOT NULL,
+                    links TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+            ''')
+
+    def _load_history(self) -> YieldHistory:
+        with self.db.reader() as conn:
+            rows = conn.execute('SELECT url, stations, links, fetched_at FROM crawl_nodes').fetchall()
+        return YieldHistory({url: {'stations': stations, 'links': links, 'fetched_at': fetched_at}
+                             for url, stations, links, fetched_at in rows})
+
+    def start_crawl(self, category: str, execution_mode: str, root: FrontierNode,
+                    allocations: List[int]) -> CrawlRun:
+        """繼續分類未完成的爬取；沒有、已過期或執行模式不同時清除舊狀態並從 root 重新開始"""
+        now = time.time()
+        with self.db.writer() as conn:
+            row = conn.execute('''
+                SELECT execution_mode, started_at, state, request_count, failed_requests, stations
+                FROM crawl_runs WHERE category = ? AND status = 'running'
+            ''', (category,)).fetchone()
+            if row and row[0] == execution_mode and now - row[1] < self.resume_max_age:
+                state = json.loads(row[2])
+                frontier = CrawlFrontier(self.history)
+                for (node,) in conn.execute('SELECT node FROM crawl_frontier WHERE category = ?', (category,)):
+                    frontier.push(FrontierNode.from_dict(json.loads(node)))
+                frontier.queued.update(url for (url,) in conn.execute(
+                    'SELECT url FROM crawl_visited WHERE category = ?', (category,)))
+                run = CrawlRun(category, execution_mode, frontier, DepthBudget.from_dict(state['budget']),
+                               state['branch_failures'], row[3], row[4], row[5], resumed=True)
+                run.skipped_recent = state.get('skipped_recent', 0)
+                run.duplicate_links = state.get('duplicate_links', 0)
+                return run
+
+            self._clear(conn, category)
+            frontier = CrawlFrontier(self.history)
+            frontier.push(root)
+            run = CrawlRun(category, execution_mode, frontier, DepthBudget(allocations))
+            conn.execute('''
+                INSERT INTO crawl_runs (category, execution_mode, status, started_at, updated_at, state)
+                VALUES (?, ?, 'running', ?, ?, ?)
+                ON CONFLICT (category) DO UPDATE SET
+                    execution_mode = excluded.execution_mode, status = 'running',
+                    started_at = excluded.started_at, updated_at = excluded.updated_at, state = excluded.state,
+                    request_count = 0, failed_requests = 0, stations = 0
+            ''', (category, execution_mode, now, now, run.state_json()))
+            self._insert_nodes(conn, category, [root])
+        return run
+
+    def iter_collected_stations(self, category: str, batch_size: int = 500) -> Iterator[Dict]:
+        """依收集順序重播本次爬取已保存的電台"""
+        last_seq = -1
+        while True:
+            with self.db.reader() as conn:
+                rows = conn.execute('''
+                    SELECT seq, station FROM crawl_node_stations
+                    WHERE category = ? AND seq > ? ORDER BY seq LIMIT ?
+                ''', (category, last_seq, batch_size)).fetchall()
+            for seq, station in rows:
+                yield json.loads(station)
+            if len(rows) < batch_size:
+                return
+            last_seq = rows[-1][0]
+
+    def cached_node(self, key: str) -> Optional[Tuple[List[Dict], List[Tuple[str, str]]]]:
+        """節點（正規化網址）最近一次抓取的 (電台, 子分類 (URL, 名稱))；沒有保存內容時回傳 None"""
+        with self.db.reader() as conn:
+            row = conn.execute('SELECT stations, links FROM crawl_node_content WHERE url = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), [tuple(link) for link in json.loads(row[1])]
+
+    def save_node(self, run: CrawlRun, node: FrontierNode, stations: Iterable[Dict] = (),
+                  children: Iterable[FrontierNode] = (), links: List[Tuple[str, str]] = None):
+        """檢查點：節點已處理，寫入其電台、新排入的子分類、預算與計數
+
+        links 為本次抓取解析出的子分類連結，一併更新節點的產出紀錄與保存的內容；
+        為 None 表示沒有抓取（失敗、略過或重用快取內容），不更新產出紀錄
+        """
+        stations = list(stations)
+        now = time.time()
+        with self.db.writer() as conn:
+            conn.execute('DELETE FROM crawl_frontier WHERE category = ? AND url = ?', (run.category, node.url))
+            self._insert_nodes(conn, run.category, children)
+            if stations:
+                conn.executemany('''
+                    INSERT INTO crawl_node_stations (category, seq, url, station) VALUES (?, ?, ?, ?)
+                ''', [(run.category, run.stations + index, node.url, json.dumps(station, ensure_ascii=False))
+                      for index, station in enumerate(stations)])
+            if links is not None:
+                conn.execute('''
+                    INSERT INTO crawl_nodes (url, category, stations, links, fetched_at) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (url) DO UPDATE SET
+                        category = excluded.category, stations = excluded.stations,
+                        links = excluded.links, fetched_at = excluded.fetched_at
+                ''', (node.key, node.category, len(stations), len(links), now))
+                conn.execute('''
+                    INSERT INTO crawl_node_content (url, stations, links, fetched_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (url) DO UPDATE SET
+                        stations = excluded.stations, links = excluded.links, fetched_at = excluded.fetched_at
+                ''', (node.key, json.dumps(stations, ensure_ascii=False), json.dumps(links, ensure_ascii=False), now))
+            run.stations += len(stations)
+            conn.execute('''
+                UPDATE crawl_runs SET updated_at = ?, state = ?, request_count = ?, failed_requests = ?, stations = ?
+                WHERE category = ?
+            ''', (now, run.state_json(), run.request_count, run.failed_requests, run.stations, run.category))
+        if links is not None:
+            self.history.record(node.key, len(stations), len(links), now)
+
+    def finish_crawl(self, run: CrawlRun):
+        """爬取完成：清除前沿與重播資料，保留節點產出紀錄"""
+        with self.db.writer() as conn:
+            self._clear(conn, run.category)
+            conn.execute('''
+                UPDATE crawl_runs SET status = 'done', updated_at = ?, state = ?,
+                    request_count = ?, failed_requests = ?, stations = ?
+                WHERE category = ?
+            ''', (time.time(), run.state_json(), run.request_count, run.failed_requests, run.stations, run.category))
+
+    @staticmethod
+    def _insert_nodes(conn, category: str, nodes: Iterable[FrontierNode]):
+        nodes = list(nodes)
+        conn.executemany('INSERT OR IGNORE INTO crawl_frontier (category, url, node) VALUES (?, ?, ?)',
+                         [(category, node.url, json.dumps(node.to_dict(), ensure_ascii=False)) for node in nodes])
+        conn.executemany('INSERT OR IGNORE INTO crawl_visited (category, url) VALUES (?, ?)',
+                         [(category, node.key) for node in nodes])
+
+    @staticmethod
+    def _clear(conn, category: str):
+        for table in ('crawl_frontier', 'crawl_visited', 'crawl_node_stations'):
+            conn.execute(f'DELETE FROM {table} WHERE category = ?', (category,))
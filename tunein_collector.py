@@ -5,37 +5,113 @@ TuneIn 電台收集器
 
 import xml.etree.ElementTree as ET
 import hashlib
-import random
 import json
-import time
+import threading
 import requests
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
-import calendar
-from typing import List, Dict, Set
+from typing import List, Dict, Iterator, Optional, Tuple
+
+from requests.adapters import HTTPAdapter
 
 # 導入日誌管理器
-from tunein_logger import TuneInLogger
+from tunein_logger import StationTally, TuneInLogger
+from tunein_frontier import FrontierNode
+from tunein_checkpoint import CrawlRun, TuneInCrawlStore
+from rate_limiter import HostRateLimiters
+
+
+# 各深度請求預算 = 每頁子分類配額 × 子分類因子 × 此倍數
+DEPTH_BUDGET_SCALE = 10
+
+# TuneIn OPML 主機的自適應速率（每秒請求數）：從 rate 開始，成功時逐步提高，
+# 403/429/5xx 時減半並暫停（遵守 Retry-After，沒有時暫停 cooldown 秒）
+TUNEIN_HOST = 'opml.radiotime.com'
+TUNEIN_RATE_LIMIT = {
+    'rate': 0.5, 'min_rate': 0.02, 'max_rate': 3.0, 'increase': 0.02, 'decrease': 0.5,
+    'capacity': 1.0, 'cooldown': 30.0,
+}
+
+# 已訪問索引的有效時間（秒）：節點在此時間內已由任一分類抓取過則重用保存的內容、不再請求
+# （短於每日的排程間隔：同一天的分類與重新啟動共用，下一次排程一律重新抓取；分類首頁一律抓取）
+VISITED_TTL = 12 * 60 * 60
+
+# 並行爬取：對 TuneIn 主機同時進行中的請求上限、同時爬取的分類數（實際請求速率仍由速率限制器決定）
+TUNEIN_MAX_IN_FLIGHT = 4
+TUNEIN_PARALLEL_CATEGORIES = 2
+
+
+class CategoryCrawl:
+    """並行排程中單一分類的爬取狀態（檢查點、日誌器、電台統計與進行中的請求數）"""
+    
+    def __init__(self, name: str, logger, run: CrawlRun):
+        self.name = name
+        self.logger = logger
+        self.run = run
+        self.start_time = datetime.now()
+        self.tally = StationTally()
+        self.fetched = 0            # 本次送出抓取的節點數
+        self.in_flight = 0          # 進行中的請求數
+        self.deferred = []          # 其他分類正在抓取的節點，該請求完成後重新排入前沿
+        self.reused = []            # 重用快取內容的節點的電台，待排程迴圈產生
+        self.completed = False      # 前沿已沒有可抓取的節點
+        self.stopped = False        # 失敗過多或發生錯誤而停止（檢查點保留剩餘前沿）
 
 
 class TuneInCollector:
     """TuneIn 電台收集器 - 智能週期調度系統"""
     
-    def __init__(self):
+    def __init__(self, checkpoint_path: str = 'tunein_crawl.db', visited_ttl: float = VISITED_TTL,
+                 rate_limiters: HostRateLimiters = None, max_in_flight: int = TUNEIN_MAX_IN_FLIGHT,
+                 max_parallel_categories: int = TUNEIN_PARALLEL_CATEGORIES):
         # 初始化日誌管理器
         self.tunein_logger = TuneInLogger()
         
+        # 爬取檢查點（未完成的前沿、已收集的電台與各節點的產出紀錄，跨執行保存）
+        self.checkpoints = TuneInCrawlStore(checkpoint_path)
+        self.visited_ttl = visited_ttl
+        
         # 請求統計
         self.request_count = 0
         self.failed_requests = 0
+        self.saved_requests = 0     # 重用近期抓取內容省下的請求（跨分類累計）
+        
+        # 請求節奏由主機的自適應速率限制器決定（同一行程的所有收集器共用），取代固定的隨機延遲
+        self.rate_limiter = (rate_limiters or HostRateLimiters.shared()).get(TUNEIN_HOST, **TUNEIN_RATE_LIMIT)
+        
+        # 並行爬取：同時進行中的請求上限與同時爬取的分類數（皆為 1 時依序爬取）
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_parallel_categories = max(1, max_parallel_categories)
+        
+        # 取消信號（由呼叫端設定，逾時或停止時中斷收集）
+        self.cancel_event = None
         
         # 初始化 HTTP 會話
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        # 工作執行緒共用 Session；連線池大小與同時進行中的請求上限一致
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_in_flight)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
     
-    def collect_from_tunein(self) -> List[Dict]:
-        """從 TuneIn 收集電台 - 智能週期調度系統"""
+    def is_cancelled(self) -> bool:
+        """呼叫端是否已要求停止收集"""
+        return self.cancel_event is not None and self.cancel_event.is_set()
+    
+    def collect_from_tunein(self, mode: str = None, cancel_event=None) -> List[Dict]:
+        """從 TuneIn 收集電台 - 智能週期調度系統
+        
+        mode 僅供記錄，實際執行的分類由本收集器依日期決定；
+        cancel_event 被設定時，會在下一個請求前停止並回傳已收集的電台。
+        """
+        return list(self.iter_tunein(mode=mode, cancel_event=cancel_event))
+    
+    def iter_tunein(self, mode: str = None, cancel_event=None) -> Iterator[Dict]:
+        """逐一產生 TuneIn 電台（串流版本，不在記憶體中累積整份清單）"""
+        self.cancel_event = cancel_event
+        
         # 啟動時清理舊日誌
         self.tunein_logger.cleanup_old_logs()
         self.tunein_logger.print_log_statistics()
@@ -53,7 +129,10 @@ class TuneInCollector:
         first_weekday = first_day_of_month.weekday()
         week_of_month = ((today - 1 + first_weekday) // 7) + 1
         
-        all_stations = []
+        total_count = 0
+        self.request_count = 0
+        self.failed_requests = 0
+        self.saved_requests = 0
         
         try:
             # 超大分類（每月特定週日執行）
@@ -92,7 +171,7 @@ class TuneInCollector:
                 else:
                     # 第4周或第5周週日不執行任何分類
                     print(f"📅 今天是第{week_of_month}周週日，休息日 - 不執行任何分類收集")
-                    return []
+                    return
             elif weekday in weekday_categories:
                 categories = weekday_categories[weekday]
                 weekday_names = ['週一', '週二', '週三', '週四']
@@ -103,134 +182,61 @@ class TuneInCollector:
                 # 週五、週六不執行
                 weekday_names = ['週一', '週二', '週三', '週四', '週五', '週六', '週日']
                 print(f"📅 今天是{weekday_names[weekday]}，休息日 - 不執行任何分類收集")
-                return []
+                return
             
             # 根據執行模式設置參數
             execution_params = self._get_execution_params(execution_mode)
             
-            # 處理每個分類
+            # 各分類的子分類預算因子（混合模式需要區分大小分類）；請求節奏交由速率限制器
+            jobs = []
             for category_name, url in categories.items():
-                # 開始該分類的日誌記錄
-                start_time = datetime.now()
-                logger = self.tunein_logger.start_category_logging(category_name, execution_mode)
-                
-                # 重置統計
-                self.request_count = 0
-                self.failed_requests = 0
-                
-                try:
-                    # 檢查失敗率
-                    if self.failed_requests > execution_params['max_failures']:
-                        logger.warning(f"⚠️ 失敗請求過多 ({self.failed_requests})，停止收集")
-                        break
-                    
-                    # 根據分類類型調整延遲（混合模式需要區分大小分類）
-                    if execution_mode == "mixed":
-                        if category_name in ['talk', 'sports', 'podcast']:
-                            # 大分類
-                            delay = random.uniform(3.0, 6.0)
-                            subcategory_factor = 1.0
-                        else:
-                            # 小分類
-                            delay = random.uniform(1.0, 3.0)
-                            subcategory_factor = 1.2
+                if execution_mode == "mixed":
+                    if category_name in ['talk', 'sports', 'podcast']:
+                        # 大分類
+                        subcategory_factor = 1.0
                     else:
-                        # 超大分類
-                        delay = random.uniform(execution_params['delay_range'][0], execution_params['delay_range'][1])
-                        subcategory_factor = execution_params['subcategory_factor']
-                    
-                    time.sleep(delay)
-                    
-                    logger.info(f"🔍 收集{category_type}: {category_name} (已發送 {self.request_count} 個請求)")
-                    logger.info(f"🌐 URL: {url}")
-                    
-                    # 重置 visited_urls
-                    visited_urls = set()
-                    
-                    # 執行收集
-                    category_stations = self._parse_tunein_opml_recursive_with_schedule(
-                        url, category_name, url, 0, visited_urls, execution_mode, subcategory_factor, logger
-                    )
-                    all_stations.extend(category_stations)
-                    
-                    logger.info(f"📍 TuneIn {category_type} {category_name}: 收集到 {len(category_stations)} 個電台")
-                    
-                    # 超大分類需要額外的休息時間
-                    if execution_mode == "mega":
-                        extra_rest = random.uniform(30.0, 60.0)
-                        logger.info(f"😴 超大分類處理完畢，額外休息 {extra_rest:.1f} 秒...")
-                        time.sleep(extra_rest)
-                    elif execution_mode == "mixed" and category_name in ['talk', 'sports', 'podcast']:
-                        # 混合模式中的大分類也需要休息
-                        extra_rest = random.uniform(10.0, 20.0)
-                        logger.info(f"😴 大分類處理完畢，休息 {extra_rest:.1f} 秒...")
-                        time.sleep(extra_rest)
-                    
-                    # 完成該分類的日誌記錄（添加統計信息）
-                    self.tunein_logger.finish_category_logging(
-                        category_stations, 
-                        self.request_count, 
-                        self.failed_requests, 
-                        start_time, 
-                        execution_mode
-                    )
-                    
-                except Exception as e:
-                    self.failed_requests += 1
-                    logger.error(f"❌ 分類 {category_name} 收集失敗: {e}")
-                    self._handle_request_error(e, category_name, category_type, execution_params, logger)
-                    
-                    # 即使出錯也要記錄統計
-                    self.tunein_logger.finish_category_logging(
-                        [], self.request_count, self.failed_requests, start_time, execution_mode
-                    )
+                        # 小分類
+                        subcategory_factor = 1.2
+                else:
+                    # 超大分類
+                    subcategory_factor = execution_params['subcategory_factor']
+                jobs.append((category_name, url, subcategory_factor))
+            
+            # 執行收集（各分類並行爬取，邊抓取邊產生，統計由各分類的日誌記錄）
+            for station in self._crawl_categories(jobs, execution_mode, category_type):
+                total_count += 1
+                yield station
+            if self.is_cancelled():
+                print("⏹️ TuneIn 收集已取消")
             
             # 記錄總體統計和下次執行計劃
-            print(f"✅ TuneIn {category_type}: 總共收集到 {len(all_stations)} 個電台")
+            print(f"✅ TuneIn {category_type}: 總共收集到 {total_count} 個電台"
+                  f"（{self.request_count} 個請求，失敗 {self.failed_requests} 個）")
+            if self.saved_requests:
+                print(f"🔁 已訪問索引: 重用近期已抓取的節點內容，共省下 {self.saved_requests} 個請求")
             self._log_next_execution_plan_weekly(now)
             
         except Exception as e:
             print(f"❌ TuneIn 收集失敗: {e}")
-        
-        return all_stations
     
     def _get_execution_params(self, execution_mode: str) -> dict:
         """根據執行模式獲取參數"""
         params = {
             "mega": {
-                "delay_range": (10.0, 20.0),
                 "max_failures": 50,
+                "max_branch_failures": 15,
                 "subcategory_factor": 2.0,
                 "timeout": 45,
-                "wait_403": (60.0, 120.0),
-                "wait_429": (90.0, 180.0),
             },
             "mixed": {  # 週一到週四的混合模式
-                "delay_range": (2.0, 5.0),
                 "max_failures": 30,
+                "max_branch_failures": 10,
                 "subcategory_factor": 1.2,
                 "timeout": 30,
-                "wait_403": (20.0, 40.0),
-                "wait_429": (30.0, 60.0),
             }
         }
         return params[execution_mode]
     
-    def _handle_request_error(self, error, category_name: str, category_type: str, params: dict, logger):
-        """統一的錯誤處理"""
-        if "403" in str(error) or "Forbidden" in str(error):
-            logger.error(f"❌ TuneIn {category_type} {category_name} 被禁止訪問 (403)")
-            wait_time = random.uniform(params['wait_403'][0], params['wait_403'][1])
-            logger.info(f"😴 遇到訪問限制，等待 {wait_time:.1f} 秒...")
-            time.sleep(wait_time)
-        elif "429" in str(error) or "Too Many Requests" in str(error):
-            logger.error(f"❌ TuneIn {category_type} {category_name} 請求過於頻繁 (429)")
-            wait_time = random.uniform(params['wait_429'][0], params['wait_429'][1])
-            logger.info(f"😴 請求過於頻繁，等待 {wait_time:.1f} 秒...")
-            time.sleep(wait_time)
-        else:
-            logger.warning(f"⚠️ TuneIn {category_type} {category_name} 收集失敗: {error}")
-    
     def _log_next_execution_plan_weekly(self, current_date):
         """記錄每週執行計劃"""
         from datetime import timedelta
@@ -268,102 +274,316 @@ class TuneInCollector:
         
         print(f"💡 明天 ({tomorrow.strftime('%Y-%m-%d')}) 計劃: {next_plan}")
     
-    def _parse_tunein_opml_recursive_with_schedule(self, current_url: str, category: str, 
-                                                 original_url: str, depth: int = 0, 
-                                                 visited_urls: Set[str] = None, 
-                                                 execution_mode: str = "mixed", 
-                                                 subcategory_factor: float = 1.0,
-                                                 logger = None) -> List[Dict]:
-        """按調度模式的遞歸解析"""
-        stations = []
-        params = self._get_execution_params(execution_mode)
-        
-        # 檢查失敗率
-        if self.failed_requests > params['max_failures']:
-            if logger:
-                logger.debug(f"⚠️ 失敗請求過多，停止深入 (深度 {depth})")
-            return stations
-        
-        if visited_urls is None:
-            visited_urls = set()
+    def _get_depth_budgets(self, category: str, execution_mode: str, factor: float = 1.0) -> List[int]:
+        """各深度的請求預算：深度 0 為分類首頁，深度 d 的預算由原本每頁的子分類配額換算"""
         
-        if current_url in visited_urls:
-            if logger:
-                logger.debug(f"⚠️ 跳過已訪問的 URL (深度 {depth}): {current_url}")
-            return stations
+        # 基礎配額（每頁子分類數），乘上 DEPTH_BUDGET_SCALE 即為整個分類在該深度可發出的請求數
+        base_quotas = {
+            "mega": {
+                'music': [50, 40, 30, 25, 20, 15],
+                'location': [45, 35, 28, 22, 18, 12],
+                'language': [60, 50, 40, 30, 25, 20],
+            },
+            "mixed": {
+                # 大分類
+                'talk': [25, 20, 15, 12, 10, 8],
+                'sports': [20, 15, 12, 10, 8, 6],
+                'podcast': [20, 15, 12, 10, 8, 6],
+                # 小分類
+                'local': [15, 12, 10, 8, 6, 5],
+                'taiwan': [25, 20, 15, 12, 10, 8],
+                'hongkong': [25, 20, 15, 12, 10, 8],
+                'singapore': [25, 20, 15, 12, 10, 8],
+            }
+        }
         
-        visited_urls.add(current_url)
+        # 獲取配額
+        mode_quotas = base_quotas.get(execution_mode, {})
+        quotas = mode_quotas.get(category, [10, 8, 6, 5, 4, 3])
         
+        # 應用因子
+        return [1] + [max(int(quota * factor * DEPTH_BUDGET_SCALE), 1) for quota in quotas]
+    
+    def _crawl_categories(self, jobs: List[Tuple[str, str, float]], execution_mode: str,
+                          category_type: str = "") -> Iterator[Dict]:
+        """以前沿排程並行爬取分類 (名稱, URL, 子分類因子)，逐一產生電台
+        
+        同時爬取最多 max_parallel_categories 個分類：各分類從前沿取出優先分數最高、且所在深度仍有預算的節點，
+        交由執行緒池抓取（同時最多 max_in_flight 個請求，速率由主機的速率限制器決定），不同子樹因此並行抓取。
+        解析、前沿、檢查點與日誌都在呼叫端的執行緒處理：頁面中的電台直接產生，子分類排入前沿；
+        單一分支失敗過多時略過該分支其餘節點。在 visited_ttl 內已由任一分類抓取過的節點不再請求，
+        改為重用保存的內容（電台改標為本分類、子分類照常排入前沿），其電台因此仍計入本分類的同步分組；
+        其他分類正在抓取的節點延後到該請求完成後再處理。
+        每個節點處理完即寫入檢查點，重新啟動時先重播已收集的電台，再從剩餘的前沿繼續。
+        """
+        params = self._get_execution_params(execution_mode)
+        pending = list(jobs)
+        active = []
+        in_flight = {}                      # future → (分類, 節點)
+        fetching = set()                    # 進行中請求的節點（正規化網址），其他分類不重複抓取
+        stop_event = threading.Event()      # 取消或停止迭代時，喚醒等待速率限制的工作執行緒
+        executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='tunein')
         try:
-            # 根據執行模式和深度調整延遲
-            if depth > 0:
-                if execution_mode == "mega":
-                    base_delay = random.uniform(5.0, 12.0)
-                    depth_penalty = depth * 0.8
-                else:  # mixed
-                    # 根據分類類型調整
-                    if category and any(big in category.lower() for big in ['talk', 'sports', 'podcast']):
-                        base_delay = random.uniform(1.5, 4.0)
-                        depth_penalty = depth * 0.3
-                    else:
-                        base_delay = random.uniform(0.5, 2.0)
-                        depth_penalty = depth * 0.2
+            while True:
+                if self.is_cancelled():
+                    stop_event.set()
                 
-                delay = base_delay + depth_penalty
-                time.sleep(delay)
-            
-            # 記錄請求
-            self.request_count += 1
+                # 開始新的分類（繼續未完成的爬取時先重播已收集的電台）
+                while pending and len(active) < self.max_parallel_categories and not stop_event.is_set():
+                    crawl = self._start_category(*pending.pop(0), execution_mode, category_type)
+                    active.append(crawl)
+                    yield from self._replay_category(crawl)
+                
+                # 補滿進行中的請求
+                while len(in_flight) < self.max_in_flight and not stop_event.is_set():
+                    picked = self._next_node(active, params, fetching)
+                    if picked is None:
+                        break
+                    crawl, node = picked
+                    crawl.in_flight += 1
+                    fetching.add(node.key)
+                    future = executor.submit(self._fetch_opml, node, execution_mode, params, crawl.logger, stop_event)
+                    in_flight[future] = (crawl, node)
+                
+                # 重用快取內容的節點的電台
+                for crawl in active:
+                    if crawl.reused:
+                        stations, crawl.reused = crawl.reused, []
+                        yield from stations
+                
+                # 結束已完成或停止、且沒有進行中請求的分類
+                for crawl in [crawl for crawl in active if crawl.in_flight == 0 and (crawl.completed or crawl.stopped)]:
+                    active.remove(crawl)
+                    self._finish_category(crawl, execution_mode, category_type)
+                
+                if not in_flight:
+                    if (active or pending) and not stop_event.is_set():
+                        continue
+                    break
+                
+                done, _ = wait(in_flight, timeout=1.0, return_when=FIRST_COMPLETED)
+                for future in done:
+                    crawl, node = in_flight.pop(future)
+                    crawl.in_flight -= 1
+                    stations = self._process_node(crawl, node, future, execution_mode)
+                    fetching.discard(node.key)
+                    yield from stations
+                
+                # 其他分類的請求已完成的延後節點重新排入前沿（取出時重用其內容，失敗時自行抓取）
+                for crawl in active:
+                    waiting = [node for node in crawl.deferred if node.key in fetching]
+                    for node in crawl.deferred:
+                        if node.key not in fetching:
+                            crawl.run.frontier.requeue(node)
+                    crawl.deferred = waiting
+        finally:
+            stop_event.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+            # 中斷的分類：尚未處理的節點仍在檢查點的前沿中，下次從此繼續
+            for crawl in active:
+                self._finish_category(crawl, execution_mode, category_type)
+    
+    def _start_category(self, category_name: str, url: str, subcategory_factor: float, execution_mode: str,
+                        category_type: str) -> CategoryCrawl:
+        """開始分類的日誌記錄，並從檢查點繼續或重新開始爬取"""
+        logger = self.tunein_logger.start_category_logging(category_name, execution_mode)
+        logger.info(f"🔍 收集{category_type}: {category_name}")
+        logger.info(f"🌐 URL: {url}")
+        
+        run = self.checkpoints.start_crawl(
+            category_name, execution_mode, FrontierNode(category_name, 0, url),
+            self._get_depth_budgets(category_name, execution_mode, subcategory_factor)
+        )
+        if run.resumed:
+            self.request_count += run.request_count
+            self.failed_requests += run.failed_requests
+            logger.info(f"♻️ 從檢查點繼續: 已發送 {run.request_count} 個請求，待抓取 {len(run.frontier)} 個節點，"
+                        f"剩餘預算 {run.budget.remaining()} 個請求")
+        return CategoryCrawl(category_name, logger, run)
+    
+    def _replay_category(self, crawl: CategoryCrawl) -> Iterator[Dict]:
+        """繼續爬取時重播檢查點中已收集的電台（不需重新請求）"""
+        if not crawl.run.resumed:
+            return
+        replayed = 0
+        for station in self.checkpoints.iter_collected_stations(crawl.name):
+            crawl.tally.add(station)
+            replayed += 1
+            yield station
+        crawl.logger.info(f"♻️ 重播檢查點中已收集的 {replayed} 個電台")
+    
+    def _next_node(self, active: List[CategoryCrawl], params: dict,
+                   fetching: set = frozenset()) -> Optional[Tuple[CategoryCrawl, FrontierNode]]:
+        """從進行中請求最少的分類取出下一個要抓取的節點；都沒有可抓取的節點時回傳 None"""
+        for crawl in sorted(active, key=lambda crawl: crawl.in_flight):
+            if crawl.completed or crawl.stopped:
+                continue
+            node = self._pop_node(crawl, params, fetching)
+            if node is not None:
+                return crawl, node
+        return None
+    
+    def _pop_node(self, crawl: CategoryCrawl, params: dict, fetching: set = frozenset()) -> Optional[FrontierNode]:
+        """取出分類前沿中下一個要抓取的節點
+
+        略過失敗過多的分支；近期已抓取的節點（分類首頁除外）重用保存的內容，其他分類正在抓取的節點延後處理。
+        """
+        run = crawl.run
+        while True:
+            # 檢查失敗率
+            if run.failed_requests > params['max_failures']:
+                crawl.logger.warning(f"⚠️ 失敗請求過多 ({run.failed_requests})，停止收集")
+                crawl.stopped = True
+                return None
             
-            if logger:
-                logger.debug(f"📡 {execution_mode.upper()} 請求 #{self.request_count} (深度 {depth}): {current_url}")
+            node = run.frontier.pop(run.budget)
+            if node is None:
+                # 仍有進行中的請求或延後的節點時，可能再有節點排入前沿
+                crawl.completed = crawl.in_flight == 0 and not crawl.deferred
+                return None
+            if run.branch_failures.get(node.branch, 0) >= params['max_branch_failures']:
+                crawl.logger.debug(f"⚠️ 分支 {node.branch} 失敗過多，略過 (深度 {node.depth}): {node.url}")
+                self.checkpoints.save_node(run, node)
+                continue
+            if node.key in fetching:
+                crawl.deferred.append(node)
+                crawl.logger.debug(f"⏳ 其他分類正在抓取，延後 (深度 {node.depth}): {node.url}")
+                continue
+            if node.depth > 0 and self.checkpoints.history.fetched_within(node.key, self.visited_ttl):
+                cached = self.checkpoints.cached_node(node.key)
+                if cached is not None:
+                    self._reuse_node(crawl, node, *cached)
+                    continue
             
-            # 發送請求
-            response = self.session.get(current_url, timeout=params['timeout'])
-            response.raise_for_status()
+            run.budget.spend(node.depth)
+            crawl.fetched += 1
+            return node
+    
+    def _process_node(self, crawl: CategoryCrawl, node: FrontierNode, future, execution_mode: str) -> List[Dict]:
+        """處理抓取結果：解析電台與子分類並寫入檢查點，回傳要產生的電台"""
+        run, logger = crawl.run, crawl.logger
+        try:
+            sent, opml_content = future.result()
+            if not sent:
+                # 取消而未送出的請求：節點仍在檢查點的前沿中
+                return []
+            run.request_count += 1
+            self.request_count += 1
+            if opml_content is None:
+                run.failed_requests += 1
+                self.failed_requests += 1
+                run.branch_failures[node.branch] = run.branch_failures.get(node.branch, 0) + 1
+                self.checkpoints.save_node(run, node)
+                return []
             
-            # 解析 OPML
-            stations = self._parse_tunein_opml_recursive_with_factor(
-                response.text, category, current_url, depth, visited_urls, 
-                subcategory_factor, execution_mode, logger
-            )
+            stations, links = self._parse_opml(opml_content, node, execution_mode, logger)
+            children = self._expand_node(run, node, links)
             
+            # 電台與子分類先寫入檢查點再向下游產生，中途停止時不會遺失
+            self.checkpoints.save_node(run, node, stations, children, links=links)
         except Exception as e:
-            self.failed_requests += 1
-            
-            if "403" in str(e) or "Forbidden" in str(e):
-                if logger:
-                    logger.warning(f"⚠️ 請求被禁止 (深度 {depth}): {current_url}")
-                return []
-            elif "429" in str(e) or "Too Many Requests" in str(e):
-                if logger:
-                    logger.warning(f"⚠️ 請求過於頻繁 (深度 {depth}): {current_url}")
-                wait_time = random.uniform(params['wait_429'][0] * 0.3, params['wait_429'][1] * 0.3)
-                time.sleep(wait_time)
-                return []
-            else:
-                if logger:
-                    logger.warning(f"⚠️ 請求失敗 (深度 {depth}): {e}")
-        
+            crawl.stopped = True
+            logger.error(f"❌ TuneIn 分類 {crawl.name} 收集失敗: {e}")
+            return []
+        
+        if stations and node.depth > 0:
+            logger.info(f"✅ 子分類 {node.category} [深度 {node.depth}]: 收集到 {len(stations)} 個電台")
+        for station in stations:
+            crawl.tally.add(station)
         return stations
     
-    def _parse_tunein_opml_recursive_with_factor(self, opml_content: str, category: str, 
-                                               current_url: str, depth: int = 0, 
-                                               visited_urls: Set[str] = None, 
-                                               subcategory_factor: float = 1.0, 
-                                               execution_mode: str = "mixed",
-                                               logger = None) -> List[Dict]:
-        """帶子分類因子的遞歸解析"""
-        stations = []
+    def _expand_node(self, run: CrawlRun, node: FrontierNode, links: List[Tuple[str, str]]) -> List[FrontierNode]:
+        """將節點的子分類連結排入前沿，回傳新排入的子分類（已排入過的連結計為重複）"""
+        children = []
+        for link_url, link_text in links:
+            child_category = f"{node.category}_{link_text.replace(' ', '_').replace('/', '_').replace('&', '_')}"
+            child = FrontierNode(child_category, node.depth + 1, link_url,
+                                 branch=child_category if node.depth == 0 else node.branch)
+            if run.frontier.push(child):
+                children.append(child)
+            else:
+                run.duplicate_links += 1
+        return children
+    
+    def _reuse_node(self, crawl: CategoryCrawl, node: FrontierNode, stations: List[Dict],
+                    links: List[Tuple[str, str]]):
+        """重用近期抓取的節點內容（不送出請求）：電台改標為本分類，子分類照常排入前沿，並寫入檢查點"""
+        run = crawl.run
+        stations = [self._apply_category(dict(station), node.category) for station in stations]
+        children = self._expand_node(run, node, links)
+        run.skipped_recent += 1
+        self.checkpoints.save_node(run, node, stations, children)
+        
+        crawl.logger.debug(f"🔁 近期已抓取，重用保存的內容 (深度 {node.depth}): {node.url}")
+        if stations:
+            crawl.logger.info(f"♻️ 子分類 {node.category} [深度 {node.depth}]: 重用近期抓取的 {len(stations)} 個電台")
+        for station in stations:
+            crawl.tally.add(station)
+        crawl.reused.extend(stations)
+    
+    def _finish_category(self, crawl: CategoryCrawl, execution_mode: str, category_type: str):
+        """完成分類：爬取完成時清除檢查點，記錄前沿排程與速率摘要並結束分類的日誌"""
+        run, logger = crawl.run, crawl.logger
+        if crawl.completed:
+            self.checkpoints.finish_crawl(run)
+        
+        self.saved_requests += run.skipped_recent
+        status = "完成" if crawl.completed else f"中斷，檢查點保留 {len(run.frontier)} 個待抓取節點"
+        logger.info(f"🧭 前沿排程{status}: 本次抓取 {crawl.fetched} 個節點，剩餘預算 {run.budget.remaining()} 個請求")
+        if run.skipped_recent or run.duplicate_links:
+            logger.info(f"🔁 已訪問索引: 重用 {run.skipped_recent} 個近期已由任一分類抓取的節點內容"
+                        f"（省下 {run.skipped_recent} 個請求），合併 {run.duplicate_links} 個重複連結")
+        
+        logger.info(f"📍 TuneIn {category_type} {crawl.name}: 收集到 {len(crawl.tally)} 個電台")
+        rate_stats = self.rate_limiter.stats()
+        logger.info(f"🚦 速率: 目前 {rate_stats['rate']} 次/秒，累計成功 {rate_stats['successes']}、"
+                    f"被限速 {rate_stats['throttled']}、連線錯誤 {rate_stats['errors']}")
+        
+        # 完成該分類的日誌記錄（添加統計信息）
+        self.tunein_logger.finish_category_logging(
+            crawl.tally, run.request_count, run.failed_requests, crawl.start_time, execution_mode,
+            category=crawl.name
+        )
+    
+    def _fetch_opml(self, node: FrontierNode, execution_mode: str, params: dict, logger = None,
+                    stop_event: threading.Event = None) -> Tuple[bool, Optional[str]]:
+        """經主機速率限制抓取節點的 OPML（在工作執行緒執行），回傳 (是否已送出請求, OPML)，失敗時 OPML 為 None
+        
+        回應狀態回饋給速率限制器：成功時逐步提速，403/429/5xx 時降速並暫停（遵守 Retry-After）。
+        stop_event（未指定時為取消信號）被設定時不送出請求。
+        """
+        depth = node.depth
+        if not self.rate_limiter.acquire(cancel_event=stop_event or self.cancel_event):
+            return False, None
         
-        if visited_urls is None:
-            visited_urls = set()
+        if logger:
+            logger.debug(f"📡 {execution_mode.upper()} 請求 (深度 {depth}): {node.url}")
         
-        if current_url in visited_urls:
-            return stations
+        try:
+            response = self.session.get(node.url, timeout=params['timeout'])
+        except requests.RequestException as e:
+            self.rate_limiter.feedback()
+            if logger:
+                logger.warning(f"⚠️ 請求失敗 (深度 {depth}): {e}")
+            return True, None
         
-        visited_urls.add(current_url)
+        pause = self.rate_limiter.feedback_response(response)
+        if response.ok:
+            return True, response.text
         
+        if logger:
+            if pause or response.status_code in (403, 429):
+                logger.warning(f"⚠️ 請求被限制 ({response.status_code}，深度 {depth}): {node.url}，"
+                               f"速率降至 {self.rate_limiter.rate:.2f} 次/秒，暫停 {pause:.0f} 秒")
+            else:
+                logger.warning(f"⚠️ 請求失敗 ({response.status_code}，深度 {depth}): {node.url}")
+        return True, None
+    
+    def _parse_opml(self, opml_content: str, node: FrontierNode, execution_mode: str,
+                    logger = None) -> Tuple[List[Dict], List[Tuple[str, str]]]:
+        """解析 OPML，回傳 (電台, 子分類 (URL, 名稱))"""
+        stations = []
+        links = []
         try:
             # 清理並解析 XML
             opml_content = opml_content.strip()
@@ -373,98 +593,29 @@ class TuneInCollector:
             root = ET.fromstring(opml_content)
             
             # 調整調試信息顯示
-            show_debug = (depth <= 3) if execution_mode == "mega" else (depth <= 2)
+            show_debug = (node.depth <= 3) if execution_mode == "mega" else (node.depth <= 2)
             
             if show_debug and logger:
-                logger.info(f"🔍 {execution_mode.upper()} - 分析分類 {category} (深度 {depth})")
+                logger.info(f"🔍 {execution_mode.upper()} - 分析分類 {node.category} (深度 {node.depth})")
             
             # 1. 查找電台
-            audio_outlines = root.findall('.//outline[@type="audio"]')
-            if audio_outlines:
-                for outline in audio_outlines:
-                    station = self._create_station_from_outline(outline, category)
-                    if station:
-                        stations.append(station)
+            for outline in root.findall('.//outline[@type="audio"]'):
+                station = self._create_station_from_outline(outline, node.category)
+                if station:
+                    stations.append(station)
             
-            # 2. 處理子分類
-            link_outlines = root.findall('.//outline[@type="link"]')
-            if link_outlines:
-                max_subcategories = self._get_max_subcategories_by_schedule(
-                    category, depth, execution_mode, subcategory_factor
-                )
-                
-                for i, link_outline in enumerate(link_outlines[:max_subcategories]):
-                    link_url = link_outline.get('URL', '')
-                    link_text = link_outline.get('text', '')
-                    
-                    if not link_url or 'opml.radiotime.com' not in link_url:
-                        continue
-                    
-                    if link_url in visited_urls:
-                        continue
-                    
-                    try:
-                        new_visited_urls = visited_urls.copy()
-                        sub_stations = self._parse_tunein_opml_recursive_with_schedule(
-                            link_url,
-                            f"{category}_{link_text.replace(' ', '_').replace('/', '_').replace('&', '_')}",
-                            link_url,
-                            depth + 1,
-                            new_visited_urls,
-                            execution_mode,
-                            subcategory_factor,
-                            logger
-                        )
-                        stations.extend(sub_stations)
-                        
-                        if len(sub_stations) > 0 and logger:
-                            logger.info(f"✅ 子分類 {link_text} [深度 {depth+1}]: 收集到 {len(sub_stations)} 個電台")
-                            
-                    except Exception as e:
-                        if show_debug and logger:
-                            logger.warning(f"⚠️ 子分類失敗 {link_text}: {e}")
+            # 2. 子分類（排入前沿，由排程決定是否抓取）
+            for link_outline in root.findall('.//outline[@type="link"]'):
+                link_url = link_outline.get('URL', '')
+                if not link_url or 'opml.radiotime.com' not in link_url:
+                    continue
+                links.append((link_url, link_outline.get('text', '')))
             
         except Exception as e:
             if logger:
-                logger.error(f"❌ 解析錯誤 (分類: {category}, 深度: {depth}): {e}")
-        
-        return stations
-    
-    def _get_max_subcategories_by_schedule(self, category: str, depth: int, 
-                                         execution_mode: str, factor: float = 1.0) -> int:
-        """根據週期調度模式調整子分類處理數量"""
-        
-        # 基礎配額
-        base_quotas = {
-            "mega": {
-                'music': [50, 40, 30, 25, 20, 15],
-                'location': [45, 35, 28, 22, 18, 12],
-                'language': [60, 50, 40, 30, 25, 20],
-            },
-            "mixed": {
-                # 大分類
-                'talk': [25, 20, 15, 12, 10, 8],
-                'sports': [20, 15, 12, 10, 8, 6],
-                'podcast': [20, 15, 12, 10, 8, 6],
-                # 小分類
-                'local': [15, 12, 10, 8, 6, 5],
-                'taiwan': [25, 20, 15, 12, 10, 8],
-                'hongkong': [25, 20, 15, 12, 10, 8],
-                'singapore': [25, 20, 15, 12, 10, 8],
-            }
-        }
+                logger.error(f"❌ 解析錯誤 (分類: {node.category}, 深度: {node.depth}): {e}")
         
-        # 獲取配額
-        mode_quotas = base_quotas.get(execution_mode, {})
-        quotas = mode_quotas.get(category, [10, 8, 6, 5, 4, 3])
-        
-        depth_index = min(depth, len(quotas) - 1)
-        base_amount = quotas[depth_index]
-        
-        # 應用因子
-        final_amount = int(base_amount * factor)
-        
-        return max(final_amount, 1)
+        return stations, links
     
     def _create_station_from_outline(self, outline, category: str, force_create: bool = False) -> dict:
         """從 outline 元素創建電台數據"""
@@ -490,7 +641,6 @@ class TuneInCollector:
             'url': url,
             'homepage': '',
             'favicon': attrs.get('image', ''),
-            'tags': f"tunein,{category}",
             'country': self._extract_country_from_text(name, attrs.get('subtext', '')),
             'language': self._extract_language_from_tunein_text(name, attrs.get('subtext', '')),
             'codec': attrs.get('formats', 'mp3').split(',')[0],
@@ -504,7 +654,17 @@ class TuneInCollector:
             'metadata': json.dumps(attrs)
         }
         
-        return station_data
+        return self._apply_category(station_data, category)
+    
+    @staticmethod
+    def _apply_category(station: Dict, category: str) -> Dict:
+        """依分類路徑設定電台的標籤、主分類與子分類"""
+        # 分類路徑如 music_Pop_Rock：第一段為主分類，其餘為子分類（同步時以此分組）
+        main_category, _, subcategory = category.partition('_')
+        station['tags'] = f"tunein,{category}"
+        station['category'] = main_category or 'unknown'
+        station['subcategory'] = subcategory or 'unknown'
+        return station
     
     def _extract_language_from_tunein_text(self, name: str, subtext: str) -> str:
         """從 TuneIn 電台名稱和描述中提取語言信息"""
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TuneIn 爬取前沿（frontier）
+以優先佇列保存待抓取的 OPML 節點 (分類, 深度, URL, 預期電台數)，由收集器的排程迴圈逐一取出：
+優先順序依過去的電台產出與資料新鮮度計算，各深度的請求數由預算分配控制，
+節點、預算與產出紀錄可序列化，由 tunein_checkpoint 保存，中斷的爬取可從檢查點繼續
+"""
+import heapq
+import time
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+
+# 沒有歷史紀錄的節點預估的電台數
+DEFAULT_EXPECTED_YIELD = 5.0
+
+# 節點資料視為完全過期的時間（秒）：各分類每週執行一次
+REFRESH_INTERVAL = 7 * 24 * 60 * 60
+
+# 不影響節點內容的 OPML 網址參數（輸出格式、串流格式、合作夥伴識別），比對節點時忽略
+IGNORED_OPML_PARAMS = {'render', 'formats', 'format', 'partnerid', 'serial', 'itemtoken'}
+
+
+def canonical_opml_url(url: str) -> str:
+    """OPML 節點的正規化網址：忽略協定與格式參數，主機與路徑小寫，其餘參數依名稱排序
+
+    同一節點常由不同分類以不同寫法連結（參數順序、render=xml、http/https），正規化後視為同一節點
+    """
+    parts = urlsplit(url.strip())
+    query = sorted((key.lower(), value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if key.lower() not in IGNORED_OPML_PARAMS)
+    base = f"{(parts.hostname or '').lower()}{(parts.path or '/').lower()}"
+    return f'{base}?{urlencode(query)}' if query else base
+
+
+class FrontierNode:
+    """待抓取的 OPML 節點"""
+
+    __slots__ = ('category', 'depth', 'url', 'expected_yield', 'branch')
+
+    def __init__(self, category: str, depth: int, url: str, expected_yield: float = DEFAULT_EXPECTED_YIELD,
+                 branch: str = None):
+        self.category = category                # 分類路徑，如 music_Pop_Rock
+        self.depth = depth
+        self.url = url
+        self.expected_yield = expected_yield    # 沒有歷史紀錄時的預估電台數
+        self.branch = branch or category        # 第一層子分類，用於分支的失敗計數
+
+    @property
+    def key(self) -> str:
+        """正規化網址：前沿去重、已訪問索引與產出紀錄的鍵"""
+        return canonical_opml_url(self.url)
+
+    def to_dict(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'FrontierNode':
+        return cls(**data)
+
+
+class YieldHistory:
+    """各節點（以正規化網址為鍵）最近一次抓取的產出：電台數、子分類數、抓取時間"""
+
+    def __init__(self, records: Dict[str, Dict] = None, refresh_interval: float = REFRESH_INTERVAL):
+        self.records = dict(records or {})
+        self.refresh_interval = refresh_interval
+
+    def record(self, key: str, stations: int, links: int, fetched_at: float = None):
+        self.records[key] = {'stations': stations, 'links': links,
+                             'fetched_at': fetched_at if fetched_at is not None else time.time()}
+
+    def fetched_within(self, key: str, ttl: float, now: float = None) -> bool:
+        """節點是否在 ttl 秒內抓取過（不分分類、跨次執行的已訪問索引）"""
+        record = self.records.get(key)
+        return record is not None and (now if now is not None else time.time()) - record['fetched_at'] < ttl
+
+    def priority(self, node: FrontierNode, now: float = None) -> float:
+        """節點的優先分數（越大越先抓取）
+
+        有紀錄的節點以上次的電台數與子分類數估計產出，並依距上次抓取的時間加權（剛抓過的節點延後）；
+        沒有紀錄的節點使用預估值並視為完全過期。較深的節點略為降低分數。
+        """
+        record = self.records.get(node.key)
+        if record is None:
+            expected = node.expected_yield
+            staleness = 1.0
+        else:
+            expected = record['stations'] + 0.5 * record['links']
+            age = (now if now is not None else time.time()) - record['fetched_at']
+            staleness = min(1.0, max(0.0, age / self.refresh_interval))
+        return (expected + 1.0) * (0.25 + 0.75 * staleness) / (1.0 + 0.1 * node.depth)
+
+    def to_dict(self) -> Dict:
+        return self.records
+
+
+class DepthBudget:
+    """各深度的請求預算（取代每頁固定的子分類配額），用盡的深度不再抓取"""
+
+    def __init__(self, allocations: List[int], spent: Iterable[int] = ()):
+        self.allocations = list(allocations)
+        self.spent = list(spent)
+        self.spent += [0] * (len(self.allocations) - len(self.spent))
+
+    def _index(self, depth: int) -> int:
+        return min(depth, len(self.allocations) - 1)
+
+    def available(self, depth: int) -> bool:
+        index = self._index(depth)
+        return self.spent[index] < self.allocations[index]
+
+    def spend(self, depth: int):
+        self.spent[self._index(depth)] += 1
+
+    def remaining(self) -> int:
+        return sum(max(0, allocation - spent) for allocation, spent in zip(self.allocations, self.spent))
+
+    def to_dict(self) -> Dict:
+        return {'allocations': self.allocations, 'spent': self.spent}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'DepthBudget':
+        return cls(data['allocations'], data['spent'])
+
+
+class CrawlFrontier:
+    """依優先分數排序的待抓取節點佇列（同一正規化網址只排入一次）"""
+
+    def __init__(self, history: YieldHistory = None):
+        self.history = history or YieldHistory()
+        self._heap = []
+        self._seq = 0               # 同分時維持排入順序（即頁面上的出現順序）
+        self.queued = set()         # 曾排入佇列的正規化網址（含已取出者）
+
+    def push(self, node: FrontierNode) -> bool:
+        """排入節點，已排入過的節點（正規化網址相同）回傳 False"""
+        key = node.key
+        if key in self.queued:
+            return False
+        self.queued.add(key)
+        heapq.heappush(self._heap, (-self.history.priority(node), self._seq, node))
+        self._seq += 1
+        return True
+
+    def requeue(self, node: FrontierNode):
+        """重新排入已取出的節點（例如延後處理者），不受同一網址只排入一次的限制"""
+        self.queued.add(node.key)
+        heapq.heappush(self._heap, (-self.history.priority(node), self._seq, node))
+        self._seq += 1
+
+    def pop(self, budget: DepthBudget = None) -> Optional[FrontierNode]:
+        """取出優先分數最高、且所在深度仍有預算的節點；沒有可抓取的節點時回傳 None"""
+        while self._heap:
+            _, _, node = heapq.heappop(self._heap)
+            if budget is None or budget.available(node.depth):
+                return node
+        return None
+
+    def pending(self) -> List[FrontierNode]:
+        """佇列中的節點（依優先順序）"""
+        return [node for _, _, node in sorted(self._heap, key=lambda item: item[:2])]
+
+    def __len__(self) -> int:
+        return len(self._heap)
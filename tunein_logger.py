@@ -7,10 +7,63 @@ import os
 import logging
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterable, Union
 import glob
 
 
+class StationTally:
+    """電台統計累計器 - 串流收集時只保留計數與前幾個樣本，不保留整份電台清單"""
+    
+    def __init__(self, sample_size: int = 5):
+        self.sample_size = sample_size
+        self.count = 0
+        self.language_stats = {}
+        self.country_stats = {}
+        self.codec_stats = {}
+        self.bitrate_stats = {}
+        self.samples = []
+    
+    @classmethod
+    def from_stations(cls, stations: Iterable[Dict]) -> 'StationTally':
+        tally = cls()
+        for station in stations:
+            tally.add(station)
+        return tally
+    
+    def add(self, station: Dict):
+        """累計一個電台"""
+        self.count += 1
+        
+        # 語言統計
+        language = station.get('language', 'unknown')
+        self.language_stats[language] = self.language_stats.get(language, 0) + 1
+        
+        # 國家統計
+        country = station.get('country', 'unknown')
+        self.country_stats[country] = self.country_stats.get(country, 0) + 1
+        
+        # 編碼統計
+        codec = station.get('codec', 'unknown')
+        self.codec_stats[codec] = self.codec_stats.get(codec, 0) + 1
+        
+        # 比特率統計
+        bitrate = station.get('bitrate', 0)
+        if bitrate > 0:
+            bitrate_range = f"{bitrate}kbps"
+            self.bitrate_stats[bitrate_range] = self.bitrate_stats.get(bitrate_range, 0) + 1
+        
+        if len(self.samples) < self.sample_size:
+            self.samples.append({
+                'name': station.get('name', 'Unknown'),
+                'language': language,
+                'country': country,
+                'bitrate': bitrate
+            })
+    
+    def __len__(self) -> int:
+        return self.count
+
+
 class TuneInLogger:
     """TuneIn 收集結果日誌管理器 - 記錄所有 terminal 輸出"""
     
@@ -26,6 +79,9 @@ class TuneInLogger:
         self.current_logger = None
         self.current_log_file = None
         
+        # 進行中的分類 → (日誌器, 日誌文件)；並行爬取時可同時記錄多個分類
+        self.active_sessions = {}
+        
     def start_category_logging(self, category: str, execution_mode: str = "mixed") -> logging.Logger:
         """開始記錄某個分類的所有輸出"""
         # 創建分類資料夾
@@ -70,6 +126,7 @@ class TuneInLogger:
         category_logger.addHandler(console_handler)
         
         self.current_logger = category_logger
+        self.active_sessions[category] = (category_logger, log_file_path)
         
         # 記錄開始信息
         category_logger.info("=" * 80)
@@ -82,91 +139,79 @@ class TuneInLogger:
         
         return category_logger
     
-    def finish_category_logging(self, stations: List[Dict], request_count: int, 
+    def finish_category_logging(self, stations: Union[List[Dict], StationTally], request_count: int, 
                               failed_requests: int, start_time: datetime, 
-                              execution_mode: str):
-        """完成分類記錄並添加統計信息"""
-        if not self.current_logger:
+                              execution_mode: str, category: str = None):
+        """完成分類記錄並添加統計信息（stations 可為電台清單或串流累計的 StationTally）
+        
+        category 指定要結束的分類（並行爬取時），未指定時為最近開始的分類
+        """
+        category = category or self.current_category
+        session = self.active_sessions.pop(category, None)
+        if session is None:
             return
+        category_logger = session[0]
+        
+        tally = stations if isinstance(stations, StationTally) else StationTally.from_stations(stations)
             
         end_time = datetime.now()
         duration = end_time - start_time
         
         # 記錄結束分隔線
-        self.current_logger.info("=" * 80)
-        self.current_logger.info("📋 收集完成 - 統計摘要")
-        self.current_logger.info("=" * 80)
+        category_logger.info("=" * 80)
+        category_logger.info("📋 收集完成 - 統計摘要")
+        category_logger.info("=" * 80)
         
         # 基本統計
-        self.current_logger.info(f"🎯 分類: {self.current_category}")
-        self.current_logger.info(f"📊 執行模式: {execution_mode}")
-        self.current_logger.info(f"⏰ 開始時間: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        self.current_logger.info(f"🏁 結束時間: {end_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        self.current_logger.info(f"⏱️ 執行時長: {str(duration).split('.')[0]}")  # 去掉微秒
-        self.current_logger.info(f"📻 收集電台數: {len(stations)} 個")
-        self.current_logger.info(f"📡 總請求數: {request_count} 次")
-        self.current_logger.info(f"❌ 失敗請求數: {failed_requests} 次")
+        category_logger.info(f"🎯 分類: {category}")
+        category_logger.info(f"📊 執行模式: {execution_mode}")
+        category_logger.info(f"⏰ 開始時間: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        category_logger.info(f"🏁 結束時間: {end_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        category_logger.info(f"⏱️ 執行時長: {str(duration).split('.')[0]}")  # 去掉微秒
+        category_logger.info(f"📻 收集電台數: {tally.count} 個")
+        category_logger.info(f"📡 總請求數: {request_count} 次")
+        category_logger.info(f"❌ 失敗請求數: {failed_requests} 次")
         
         # 計算成功率
         success_rate = ((request_count - failed_requests) / max(request_count, 1) * 100) if request_count > 0 else 0
-        self.current_logger.info(f"✅ 成功率: {success_rate:.1f}%")
-        
-        if stations:
-            # 統計電台信息
-            language_stats = {}
-            country_stats = {}
-            codec_stats = {}
-            bitrate_stats = {}
-            
-            for station in stations:
-                # 語言統計
-                language = station.get('language', 'unknown')
-                language_stats[language] = language_stats.get(language, 0) + 1
-                
-                # 國家統計
-                country = station.get('country', 'unknown')
-                country_stats[country] = country_stats.get(country, 0) + 1
-                
-                # 編碼統計
-                codec = station.get('codec', 'unknown')
-                codec_stats[codec] = codec_stats.get(codec, 0) + 1
-                
-                # 比特率統計
-                bitrate = station.get('bitrate', 0)
-                if bitrate > 0:
-                    bitrate_range = f"{bitrate}kbps"
-                    bitrate_stats[bitrate_range] = bitrate_stats.get(bitrate_range, 0) + 1
+        category_logger.info(f"✅ 成功率: {success_rate:.1f}%")
+        
+        if tally.count:
+            language_stats = tally.language_stats
+            country_stats = tally.country_stats
+            codec_stats = tally.codec_stats
+            bitrate_stats = tally.bitrate_stats
             
             # 輸出統計信息
-            self.current_logger.info("-" * 40)
-            self.current_logger.info("📊 電台詳細統計:")
+            category_logger.info("-" * 40)
+            category_logger.info("📊 電台詳細統計:")
             
             # 語言分布 (按數量排序)
             if language_stats:
                 sorted_languages = sorted(language_stats.items(), key=lambda x: x[1], reverse=True)
-                self.current_logger.info(f"🌐 語言分布:")
+                category_logger.info(f"🌐 語言分布:")
                 for lang, count in sorted_languages:
-                    percentage = (count / len(stations)) * 100
-                    self.current_logger.info(f"   {lang}: {count} 個 ({percentage:.1f}%)")
+                    percentage = (count / tally.count) * 100
+                    category_logger.info(f"   {lang}: {count} 個 ({percentage:.1f}%)")
             
             # 國家分布 (按數量排序)
             if country_stats:
                 sorted_countries = sorted(country_stats.items(), key=lambda x: x[1], reverse=True)
-                self.current_logger.info(f"🏳️ 國家分布:")
+                category_logger.info(f"🏳️ 國家分布:")
                 for country, count in sorted_countries[:10]:  # 只顯示前10個
-                    percentage = (count / len(stations)) * 100
-                    self.current_logger.info(f"   {country}: {count} 個 ({percentage:.1f}%)")
+                    percentage = (count / tally.count) * 100
+                    category_logger.info(f"   {country}: {count} 個 ({percentage:.1f}%)")
                 if len(sorted_countries) > 10:
                     others = sum(count for _, count in sorted_countries[10:])
-                    self.current_logger.info(f"   其他: {others} 個")
+                    category_logger.info(f"   其他: {others} 個")
             
             # 編碼格式分布
             if codec_stats:
                 sorted_codecs = sorted(codec_stats.items(), key=lambda x: x[1], reverse=True)
-                self.current_logger.info(f"🎵 編碼格式:")
+                category_logger.info(f"🎵 編碼格式:")
                 for codec, count in sorted_codecs:
-                    percentage = (count / len(stations)) * 100
-                    self.current_logger.info(f"   {codec}: {count} 個 ({percentage:.1f}%)")
+                    percentage = (count / tally.count) * 100
+                    category_logger.info(f"   {codec}: {count} 個 ({percentage:.1f}%)")
             
             # 比特率分布 (只顯示前5個)
             if bitrate_stats:
@@ -175,30 +220,31 @@ class TuneInLogger:
                     key=lambda x: int(x[0].replace('kbps', '')) if x[0] != 'unknown' else 0, 
                     reverse=True
                 )
-                self.current_logger.info(f"📡 比特率分布:")
+                category_logger.info(f"📡 比特率分布:")
                 for bitrate, count in sorted_bitrates[:5]:
-                    percentage = (count / len(stations)) * 100
-                    self.current_logger.info(f"   {bitrate}: {count} 個 ({percentage:.1f}%)")
+                    percentage = (count / tally.count) * 100
+                    category_logger.info(f"   {bitrate}: {count} 個 ({percentage:.1f}%)")
             
             # 電台樣本 (前5個)
-            self.current_logger.info("-" * 40)
-            self.current_logger.info("🎵 電台樣本 (前5個):")
-            for i, station in enumerate(stations[:5], 1):
+            category_logger.info("-" * 40)
+            category_logger.info("🎵 電台樣本 (前5個):")
+            for i, station in enumerate(tally.samples, 1):
                 name = station.get('name', 'Unknown')[:50]  # 限制名稱長度
                 language = station.get('language', 'unknown')
                 country = station.get('country', 'unknown')
                 bitrate = station.get('bitrate', 0)
-                self.current_logger.info(f"   {i}. {name}")
-                self.current_logger.info(f"      語言: {language} | 國家: {country} | 比特率: {bitrate}kbps")
+                category_logger.info(f"   {i}. {name}")
+                category_logger.info(f"      語言: {language} | 國家: {country} | 比特率: {bitrate}kbps")
         
-        self.current_logger.info("=" * 80)
-        self.current_logger.info(f"✅ 分類 {self.current_category} 收集完成")
-        self.current_logger.info("=" * 80)
+        category_logger.info("=" * 80)
+        category_logger.info(f"✅ 分類 {category} 收集完成")
+        category_logger.info("=" * 80)
         
         # 清理當前狀態
-        self.current_category = None
-        self.current_logger = None
-        self.current_log_file = None
+        if self.current_category == category:
+            self.current_category = None
+            self.current_logger = None
+            self.current_log_file = None
     
     def cleanup_old_logs(self):
         """清理上個月的日誌文件"""
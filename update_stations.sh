@@ -9,8 +9,7 @@ python3 -c "
 from multi_source_radio_collector import MultiSourceRadioCollector
 print('開始收集電台資料...')
 collector = MultiSourceRadioCollector()
-result = collector.collect_all_stations()
-collector.sync_stations_to_db(result)
+result = collector.collect_all_stations(commit_incrementally=True)
 print(f'✅ 更新完成，共收集 {result[\"total_unique\"]} 個電台')
 
 # 顯示統計